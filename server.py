@@ -1,9 +1,17 @@
 # server.py
 import os
 import sys
+import uuid
+import atexit
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify
-from werkzeug.utils import secure_filename
+import orjson
+from flask import Flask, Response, render_template, request, session
+from flask_caching import Cache
+from streaming_form_data import ParseFailedException, StreamingFormDataParser
+from streaming_form_data.targets import FileTarget, SHA256Target
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Ajuste de ruta para poder importar tu src como en la app desktop
 _SRC_PATH = Path(__file__).resolve().parents[0] / "src"
@@ -33,20 +41,58 @@ except Exception as e:
 
 try:
     from src.phishbot.analyzers.phishing_analyzer import analyze_eml_hybrid
+    from src.phishbot.analyzers.eml_feature_extractor import clear_domain_caches
+    from src.phishbot.models.loader import artifact_version
 except Exception:
     analyze_eml_hybrid = None  # Si no existe, el endpoint de análisis responderá con error
+    clear_domain_caches = None
+    artifact_version = None
+
+DEBUG_ENABLED = os.environ.get('FLASK_DEBUG', '0') == '1'
 
 # Flask app
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10 MB
+# Firma la cookie de sesión; en producción debe venir del entorno (compartida entre workers)
+app.secret_key = os.environ.get("SECRET_KEY") or os.urandom(32)
 UPLOAD_FOLDER = Path("uploads")
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 app.config['UPLOAD_FOLDER'] = str(UPLOAD_FOLDER)
+UPLOAD_CHUNK_SIZE = 64 * 1024  # bytes leídos del socket por iteración
+
+# Resultados del análisis por (versión del modelo, sha256 del .eml): re-subir el mismo
+# archivo no reanaliza, salvo que el modelo haya cambiado
+# y contextos de diálogo; CACHE_THRESHOLD acota el número total de entradas
+cache = Cache(app, config={"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": 3600,
+                           "CACHE_THRESHOLD": 2048})
+
+# Pool compartido para el análisis híbrido (parseo + features + modelo).
+# ANALYZE_TIMEOUT solo limita la espera de la petición: una tarea que lo supera no se
+# cancela y sigue ocupando un worker hasta terminar (el .eml se borra entonces).
+ANALYZE_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("ANALYZE_WORKERS", 4)))
+ANALYZE_TIMEOUT = float(os.environ.get("ANALYZE_TIMEOUT", 60))
+atexit.register(ANALYZE_POOL.shutdown, wait=False)
+
+# Contexto de diálogo por sesión (cookie firmada de Flask -> "sid"), guardado en
+# `cache` con caducidad: las sesiones abandonadas (p. ej. clientes sin cookies, que
+# estrenan sid en cada petición) expiran en lugar de acumularse.
+# Vive en memoria del proceso: con varios procesos habría que usar un backend
+# compartido de Flask-Caching (p. ej. Redis).
+CTX_TIMEOUT = int(os.environ.get("CTX_TIMEOUT", 1800))  # segundos sin actividad
+
+def _session_id() -> str:
+    if "sid" not in session:
+        session["sid"] = uuid.uuid4().hex
+    return session["sid"]
+
+def ojson(obj, status: int = 200) -> Response:
+    """Respuesta JSON serializada con orjson (más rápido que jsonify)."""
+    return Response(orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS), status=status, mimetype="application/json")
 
-# Contexto único (para pruebas; en producción mapear por sesión)
-CTX = DialogueContext()
+# Plantilla compilada una sola vez; Jinja escapa razones/enlaces (vienen del correo)
+HYBRID_RESULT_TPL = app.jinja_env.get_template("hybrid_result.html")
 
-# Función para formatear el resultado híbrido (precaución con comillas)
+# Función para formatear el resultado híbrido
 def format_hybrid_result(r: dict) -> str:
     nivel = r.get('nivel', '')
     prediccion = r.get('prediccion', '')
@@ -101,61 +147,43 @@ def format_hybrid_result(r: dict) -> str:
     }
     copy = user_copy.get(nivel, user_copy['amarillo'])
 
-    html = f"""
-    <div style="background-color: #f9fafb; padding: 15px; border-radius: 8px; border-left: 4px solid {color};">
-        <h3 style="margin: 0 0 6px 0; color: {color};">
-            {title_text} · {prediccion}
-        </h3>
-        <p style="margin: 0; color: #1f2937; font-size: 14px;">
-            {copy['headline']}
-        </p>
-    </div>
-    <div style="margin-top: 14px;">
-        <b>Señales</b>
-        <ul style="padding-left: 20px; margin: 6px 0 0 0;">
-    """
-    for razon in razones:
-        html += f"<li>{razon}</li>"
-    html += "</ul></div>"
-
-    html += """
-    <div style="margin-top: 14px;">
-        <b>Enlaces detectados:</b>
-        <ul style="padding-left: 20px; margin: 6px 0 0 0; color: #111827;">
-    """
-    if enlaces_list:
-        for entry in enlaces_list:
-            if isinstance(entry, dict):
-                href = entry.get("href", "—")
-                text = entry.get("text") or href
-            else:
-                href = text = entry
-            display = text if text != href else href
-            html += f'<li style="color: #111827;">{display}</li>'
-    else:
-        html += "<li>No encontramos enlaces.</li>"
-
-    html += f"""
-        </ul>
-    </div>
-    <div style="background-color: #eef2ff; padding: 12px; border-radius: 8px; border-left: 3px solid {color}; margin-top: 14px;">
-        <b>Próximos pasos sugeridos:</b>
-        <ul style="padding-left: 20px; margin: 6px 0 0 0;">
-    """
-    for tip in copy["tips"]:
-        html += f"<li>{tip}</li>"
-    html += "</ul></div>"
+    enlaces_display = []
+    for entry in enlaces_list:
+        if isinstance(entry, dict):
+            href = entry.get("href", "—")
+            text = entry.get("text") or href
+        else:
+            href = text = entry
+        enlaces_display.append(text if text != href else href)
 
-    return html
+    return HYBRID_RESULT_TPL.render(
+        color=color,
+        title_text=title_text,
+        prediccion=prediccion,
+        headline=copy["headline"],
+        razones=razones,
+        enlaces_list=enlaces_display,
+        tips=copy["tips"],
+    )
 
 # --- Rutas ---
-@app.route("/")
-def index():
-    # intenta renderizar templates/index.html; si no existe, devuelve HTML mínimo para pruebas
+# La portada es estática: se renderiza una sola vez al arrancar y se sirve con ETag
+# para que los navegadores revaliden con un 304 en lugar de descargarla otra vez.
+# Si templates/index.html no existe, devuelve HTML mínimo para pruebas.
+with app.app_context():
     try:
-        return render_template("index.html")
+        _INDEX_BODY = render_template("index.html")
     except Exception:
-        return "<h1>ChatBot - servidor Flask activo ✅</h1><p>Crea templates/index.html para la interfaz.</p>"
+        _INDEX_BODY = "<h1>ChatBot - servidor Flask activo ✅</h1><p>Crea templates/index.html para la interfaz.</p>"
+_INDEX_ETAG = hashlib.sha256(_INDEX_BODY.encode("utf-8")).hexdigest()
+
+@app.route("/")
+def index():
+    resp = Response(_INDEX_BODY, mimetype="text/html")
+    resp.set_etag(_INDEX_ETAG)
+    resp.headers["Cache-Control"] = "public, max-age=60"
+    # make_conditional compara If-None-Match en modo débil (RFC 9110): W/"..." también da 304
+    return resp.make_conditional(request)
 
 @app.route("/api/message", methods=["POST"])
 def api_message():
@@ -163,48 +191,102 @@ def api_message():
     data = request.json or {}
     user_text = (data.get("text") or data.get("message") or "").strip()
     if not user_text:
-        return jsonify({"ok": False, "error": "Sin texto"}), 400
+        return ojson({"ok": False, "error": "Sin texto"}, 400)
 
     # Detección de intención y respuesta (usa funciones reales si se importaron)
     nlu = nlu_detect(user_text)
-    global CTX
-    reply, new_ctx = next_response(user_text, CTX)
-    CTX = new_ctx
+    ctx_key = "ctx:" + _session_id()
+    ctx = cache.get(ctx_key) or DialogueContext()
+    reply, new_ctx = next_response(user_text, ctx)
+    cache.set(ctx_key, new_ctx, timeout=CTX_TIMEOUT)
 
     # Formatear respuesta (reemplazar saltos por <br>)
     reply_html = reply.replace("\n", "<br>") if isinstance(reply, str) else str(reply)
 
     # Detectar despedida (usando NLU si es posible)
-    is_goodbye = (getattr(nlu, "intent", None) == Intent.DESPEDIDA)
+    intent = getattr(nlu, "intent", None)
+    is_goodbye = (intent == Intent.DESPEDIDA)
 
-    return jsonify({"ok": True, "reply": reply_html, "is_goodbye": is_goodbye, "intent": getattr(nlu, "intent", None)})
+    # La API expone el nombre textual de la intención (p. ej. "despedida")
+    return ojson({"ok": True, "reply": reply_html, "is_goodbye": is_goodbye, "intent": getattr(intent, "label", intent)})
 
 @app.route("/api/analyze", methods=["POST"])
 def api_analyze():
     """Recibe archivo .eml (form-data) y devuelve HTML formateado con resultado."""
     if analyze_eml_hybrid is None:
-        return jsonify({"ok": False, "error": "El módulo de análisis no está disponible en el servidor."}), 500
+        return ojson({"ok": False, "error": "El módulo de análisis no está disponible en el servidor."}, 500)
+
+    # El nombre en disco es aleatorio: el nombre original no se conoce hasta
+    # parsear el multipart y no debe usarse como ruta.
+    save_path = Path(app.config['UPLOAD_FOLDER']) / f"{uuid.uuid4().hex}.eml"
+    # Dos destinos para el mismo campo: el parser entrega cada bloque a ambos,
+    # así el archivo se hashea mientras se escribe
+    target = FileTarget(str(save_path))
+    digest = SHA256Target()
+    try:
+        # Del socket al disco por bloques, sin bufferizar el .eml completo en memoria
+        parser = StreamingFormDataParser(headers=request.headers)
+        parser.register('file', target)
+        parser.register('file', digest)
+        while chunk := request.stream.read(UPLOAD_CHUNK_SIZE):
+            parser.data_received(chunk)
+    except RequestEntityTooLarge:
+        # Supera MAX_CONTENT_LENGTH: se descarta lo escrito hasta ahora
+        save_path.unlink(missing_ok=True)
+        max_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+        return ojson({"ok": False, "error": f"El archivo supera el tamaño máximo permitido ({max_mb} MB)."}, 413)
+    except ParseFailedException:
+        save_path.unlink(missing_ok=True)
+        return ojson({"ok": False, "error": "No se pudo leer el archivo enviado."}, 400)
+    except Exception:
+        # Cualquier otro fallo (p. ej. disco) no es culpa del cliente: limpiar y propagar
+        save_path.unlink(missing_ok=True)
+        raise
 
-    if 'file' not in request.files:
-        return jsonify({"ok": False, "error": "No se recibió archivo."}), 400
+    if target.multipart_filename is None:
+        save_path.unlink(missing_ok=True)
+        return ojson({"ok": False, "error": "No se recibió archivo."}, 400)
 
-    f = request.files['file']
-    filename = secure_filename(f.filename)
-    save_path = Path(app.config['UPLOAD_FOLDER']) / filename
-    f.save(save_path)
+    content_hash = digest.value
+    try:
+        cache_key = f"eml:{artifact_version()}:{content_hash}"
+    except OSError as exc:  # sin artefacto del modelo no hay análisis posible
+        save_path.unlink(missing_ok=True)
+        return ojson({"ok": False, "error": str(exc)}, 500)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        save_path.unlink(missing_ok=True)
+        return ojson({"ok": True, "html": format_hybrid_result(cached), "raw": cached})
+
+    try:
+        fut = ANALYZE_POOL.submit(analyze_eml_hybrid, str(save_path), batched=True,
+                                  content_hash=content_hash)
+    except RuntimeError as exc:  # pool cerrado (apagado del proceso)
+        save_path.unlink(missing_ok=True)
+        return ojson({"ok": False, "error": str(exc)}, 500)
+    # El archivo se borra cuando la tarea termina, no cuando la petición deja de esperar:
+    # tras un timeout el worker sigue leyéndolo
+    fut.add_done_callback(lambda _: save_path.unlink(missing_ok=True))
 
     try:
-        result = analyze_eml_hybrid(str(save_path))
+        result = fut.result(timeout=ANALYZE_TIMEOUT)
+    except FutureTimeoutError:
+        return ojson({"ok": False, "error": "El análisis tardó demasiado. Intenta de nuevo."}, 504)
     except Exception as exc:
-        return jsonify({"ok": False, "error": str(exc)}), 500
-    finally:
-        try:
-            save_path.unlink()  # opcional: borrar archivo
-        except Exception:
-            pass
+        return ojson({"ok": False, "error": str(exc)}, 500)
+    cache.set(cache_key, result)
 
     html = format_hybrid_result(result)
-    return jsonify({"ok": True, "html": html, "raw": result})
+    return ojson({"ok": True, "html": html, "raw": result})
+
+# Ruta oculta de depuración: solo existe con FLASK_DEBUG=1
+if DEBUG_ENABLED:
+    @app.route("/api/_debug/clear-caches", methods=["POST"])
+    def api_debug_clear_caches():
+        if clear_domain_caches is not None:
+            clear_domain_caches()
+        cache.clear()
+        return ojson({"ok": True})
 
 # Punto de entrada correcto
 if __name__ == "__main__":
@@ -212,5 +294,4 @@ if __name__ == "__main__":
     print("Archivo cargado correctamente ✅")
     print("Iniciando Flask...")
     port = int(os.environ.get('PORT', 5000))
-    debug_enabled = os.environ.get('FLASK_DEBUG', '0') == '1'
-    app.run(debug=debug_enabled, host='0.0.0.0', port=port)
+    app.run(debug=DEBUG_ENABLED, host='0.0.0.0', port=port)
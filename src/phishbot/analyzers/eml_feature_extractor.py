@@ -15,26 +15,30 @@ import json
 import hashlib
 import base64
 import unicodedata
+from functools import lru_cache
 from email import policy
-from email.parser import BytesParser
+from os import PathLike
+from email.feedparser import BytesFeedParser
 from email.message import EmailMessage
 from html.parser import HTMLParser
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union, BinaryIO
 from urllib.parse import urlparse
 
+import tldextract
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # sin lxml se usa el HTMLParser de la stdlib
+    lxml = None
+
 
 # ----------------------------
 # Utilidades
 # ----------------------------
 
-URL_REGEX = re.compile(
-    r'''(?ix)
-    \b(                             # inicio de la URL
-      (?:https?://|ftp://)          # esquema
-      [^\s<>"'()]{2,}               # resto
-    )
-    '''
-)
+# \b( esquema http(s)/ftp + resto de la URL )
+URL_REGEX = re.compile(r'''\b((?:https?://|ftp://)[^\s<>"'()]{2,})''', re.I)
 
 # Palabras de urgencia / ingeniería social (ajusta a tu dominio/lenguaje)
 URGENCY_WORDS = [
@@ -51,14 +55,25 @@ URGENCY_EMPHASIS = [
     "evita la suspensión", "riesgo de bloqueo", "suspenderemos tu cuenta"
 ]
 
-SUSPICIOUS_EXTS = {".exe", ".scr", ".bat", ".cmd", ".js", ".vbs", ".jar", ".ps1",
-                   ".docm", ".xlsm", ".pptm", ".hta", ".iso", ".img", ".lnk", ".msi", ".apk", ".zip", ".rar"}
+# Patrones precompilados para urgency_score: una sola pasada por corpus
+URGENCY_RE = re.compile(r"\b(" + "|".join(re.escape(w) for w in URGENCY_WORDS) + r")\b")
+URGENCY_EMPHASIS_RE = re.compile("|".join(re.escape(p) for p in URGENCY_EMPHASIS))
+UPPER_WORD_RE = re.compile(r"\b[A-ZÁÉÍÓÚ]{4,}\b")
+# Raíz de cada palabra (verifica/verificar cuentan una sola vez)
+URGENCY_STEMS = {w: (re.sub(r"(ar|er|ir|s|es)$", "", w) or w) for w in URGENCY_WORDS}
+
+DANGEROUS_EXTS = frozenset({".exe", ".scr", ".bat", ".cmd", ".js", ".vbs", ".jar", ".ps1",
+                            ".hta", ".lnk", ".msi", ".apk"})
+MACRO_EXTS = frozenset({".docm", ".xlsm", ".pptm"})
+ARCHIVE_EXTS = frozenset({".zip", ".rar", ".iso", ".img"})
+SUSPICIOUS_EXTS = DANGEROUS_EXTS | MACRO_EXTS | ARCHIVE_EXTS
 
 
 def normalize(s: str) -> str:
     return (s or "").strip()
 
 
+@lru_cache(maxsize=2048)
 def domain_of_email(addr: str) -> Optional[str]:
     """
     Extrae dominio de una dirección 'Display Name <user@domain>' o 'user@domain'
@@ -72,6 +87,7 @@ def domain_of_email(addr: str) -> Optional[str]:
     return m2.group(1).lower() if m2 else None
 
 
+@lru_cache(maxsize=2048)
 def domain_of_url(u: str) -> Optional[str]:
     try:
         p = urlparse(u)
@@ -83,10 +99,8 @@ def domain_of_url(u: str) -> Optional[str]:
     return None
 
 
-MULTI_LEVEL_TLDS = {
-    "co.uk", "com.au", "com.br", "com.ar", "com.mx", "com.tr", "com.cn",
-    "com.sa", "com.eg", "com.ve", "com.co", "com.pe", "com.cl"
-}
+# Public Suffix List empaquetada con tldextract: sin descargas ni caché en disco
+TLD_EXTRACT = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
 
 DOMAIN_ALIASES = {
     "c.gle": "google.com",
@@ -103,14 +117,15 @@ DOMAIN_ALIASES = {
     "office365.com": "microsoft.com"
 }
 
-TRUSTED_DOMAIN_GROUPS = [
-    {"google.com", "gmail.com", "googlemail.com", "g.co", "c.gle", "youtube.com", "yt.be", "android.com", "withgoogle.com", "googleapis.com", "1e100.net"},
-    {"facebook.com", "facebookmail.com", "fb.com", "meta.com", "instagram.com", "whatsapp.com"},
-    {"microsoft.com", "outlook.com", "office.com", "office365.com", "microsoftonline.com", "live.com"},
-    {"apple.com", "icloud.com", "me.com"},
-]
+TRUSTED_DOMAIN_GROUPS = (
+    frozenset({"google.com", "gmail.com", "googlemail.com", "g.co", "c.gle", "youtube.com", "yt.be", "android.com", "withgoogle.com", "googleapis.com", "1e100.net"}),
+    frozenset({"facebook.com", "facebookmail.com", "fb.com", "meta.com", "instagram.com", "whatsapp.com"}),
+    frozenset({"microsoft.com", "outlook.com", "office.com", "office365.com", "microsoftonline.com", "live.com"}),
+    frozenset({"apple.com", "icloud.com", "me.com"}),
+)
 
 
+@lru_cache(maxsize=2048)
 def _registrable_domain(domain: str) -> str:
     domain = (domain or "").lower().strip(".")
     if not domain:
@@ -120,13 +135,11 @@ def _registrable_domain(domain: str) -> str:
     labels = domain.split(".")
     if len(labels) < 2:
         return domain
-    suffix = ".".join(labels[-2:])
-    for multi in MULTI_LEVEL_TLDS:
-        if domain.endswith("." + multi):
-            parts_needed = len(multi.split(".")) + 1
-            if len(labels) >= parts_needed:
-                return ".".join(labels[-parts_needed:])
-    return suffix
+    ext = TLD_EXTRACT(domain)
+    if ext.domain and ext.suffix:
+        return f"{ext.domain}.{ext.suffix}"
+    # Sufijo fuera de la PSL (p. ej. .test) o IP: últimas dos etiquetas
+    return ".".join(labels[-2:])
 
 
 def _in_trusted_group(a: str, b: str) -> bool:
@@ -156,23 +169,33 @@ def domains_related(a: Optional[str], b: Optional[str]) -> bool:
     return False
 
 
+def clear_domain_caches() -> None:
+    """Vacía las cachés de las funciones de dominio (útil al depurar)."""
+    for fn in (domain_of_email, domain_of_url, _registrable_domain, guess_domain):
+        fn.cache_clear()
+
+
 def ext_of_filename(fn: str) -> str:
     fn = (fn or "").lower()
     m = re.search(r"(\.[a-z0-9]{1,6})$", fn)
     return m.group(1) if m else ""
 
 def sha256_bytes(b: bytes) -> str:
-    return hashlib.sha256(b).hexdigest()
+    # memoryview: hashlib (OpenSSL) lee el buffer sin copiarlo
+    h = hashlib.sha256()
+    h.update(memoryview(b))
+    return h.hexdigest()
 
 # ----------------------------
 # HTML link extractor
 # ----------------------------
 
 class SimpleHTMLLinkExtractor(HTMLParser):
-    """Extrae hrefs y también el texto visible de cada <a>."""
+    """Extrae hrefs y también el texto visible de cada <a> (sin repetir pares href/texto)."""
     def __init__(self):
         super().__init__()
         self.links: List[Dict[str, str]] = []
+        self._seen: set = set()
         self._current_href: Optional[str] = None
         self._buffer_text: List[str] = []
 
@@ -193,11 +216,45 @@ class SimpleHTMLLinkExtractor(HTMLParser):
     def handle_endtag(self, tag):
         if tag.lower() == "a" and self._current_href is not None:
             text = " ".join([t for t in self._buffer_text if t])
-            self.links.append({"href": self._current_href, "text": text})
+            key = (self._current_href, text)
+            if key not in self._seen:
+                self._seen.add(key)
+                self.links.append({"href": self._current_href, "text": text})
             self._current_href = None
             self._buffer_text = []
 
 
+def extract_links_lxml(html_text: str) -> List[Dict[str, str]]:
+    """
+    Igual que SimpleHTMLLinkExtractor pero con lxml (libxml2, en C).
+    Lanza ValueError/XMLSyntaxError si el HTML no se puede parsear.
+    """
+    root = lxml.html.fromstring(html_text, parser=lxml.html.HTMLParser(recover=True))
+    links: List[Dict[str, str]] = []
+    seen = set()
+    for a in root.iter("a"):
+        href = a.get("href")
+        if href is None:
+            continue
+        text = " ".join(t.strip() for t in a.itertext() if t.strip())
+        if (href, text) not in seen:
+            seen.add((href, text))
+            links.append({"href": href, "text": text})
+    return links
+
+
+def extract_links(html_text: str) -> List[Dict[str, str]]:
+    """Enlaces <a href> del HTML: lxml si está disponible, si no HTMLParser."""
+    if lxml is not None:
+        try:
+            return extract_links_lxml(html_text)
+        except (etree.XMLSyntaxError, etree.ParserError, ValueError):
+            pass
+    parser = SimpleHTMLLinkExtractor()
+    parser.feed(html_text)
+    return parser.links
+
+
 # ----------------------------
 # Extracción de partes MIME
 # ----------------------------
@@ -229,9 +286,23 @@ def text_of_part(part) -> str:
 # Parseo de .eml y extracción
 # ----------------------------
 
-def parse_eml(path: str) -> EmailMessage:
-    with open(path, "rb") as f:
-        return BytesParser(policy=policy.default).parse(f)
+EML_READ_CHUNK = 1 << 16
+
+
+def parse_eml(source: Union[str, BinaryIO]) -> EmailMessage:
+    """
+    Parsea el .eml por bloques con BytesFeedParser. Acepta una ruta o un
+    objeto binario abierto (p. ej. un stream), sin leer el archivo entero.
+    """
+    fp = BytesFeedParser(policy=policy.default)
+    if isinstance(source, (str, bytes, PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(EML_READ_CHUNK), b""):
+                fp.feed(chunk)
+    else:
+        for chunk in iter(lambda: source.read(EML_READ_CHUNK), b""):
+            fp.feed(chunk)
+    return fp.close()
 
 
 def extract_headers(msg: EmailMessage) -> Dict[str, Any]:
@@ -241,6 +312,9 @@ def extract_headers(msg: EmailMessage) -> Dict[str, Any]:
     return hdr
 
 
+AUTH_RESULT_RES = tuple((mech, re.compile(rf"{mech}\s*=\s*([a-zA-Z]+)")) for mech in ("spf", "dkim", "dmarc"))
+
+
 def parse_authentication_results(h: str) -> Dict[str, Optional[str]]:
     """
     Extracción muy sencilla de resultados SPF/DKIM/DMARC desde Authentication-Results.
@@ -248,25 +322,19 @@ def parse_authentication_results(h: str) -> Dict[str, Optional[str]]:
     h = h or ""
     res = {"spf": None, "dkim": None, "dmarc": None}
     # Ej: "Authentication-Results: mx.google.com; spf=pass ...; dkim=pass ...; dmarc=fail ..."
-    for mech in ("spf", "dkim", "dmarc"):
-        m = re.search(rf"{mech}\s*=\s*([a-zA-Z]+)", h)
+    for mech, pattern in AUTH_RESULT_RES:
+        m = pattern.search(h)
         if m:
             res[mech] = m.group(1).lower()
     return res
 
 
-def extract_received_chain(headers: Dict[str, str]) -> List[str]:
+def extract_received_chain(msg: EmailMessage) -> List[str]:
     """
     Extrae todas las cabeceras Received en orden de aparición (arriba->abajo).
+    Se leen del mensaje con get_all: el dict de extract_headers solo guarda una.
     """
-    received = []
-    # policy.default agrupa repeticiones con msg.get_all
-    # aquí tenemos headers como dict plano; para conservar orden podemos reparsear crudos
-    # pero como plantilla, intentamos por claves variantes:
-    for k, v in headers.items():
-        if k.lower() == "received":
-            received.append(v)
-    return received
+    return [normalize(v) for v in (msg.get_all("Received") or [])]
 
 
 def first_origin_ip_from_received(received_list: List[str]) -> Optional[str]:
@@ -284,12 +352,52 @@ def first_origin_ip_from_received(received_list: List[str]) -> Optional[str]:
     return m6.group(1) if m6 else None
 
 
+def _iter_urls(text: str):
+    """URLs de URL_REGEX; si no hay '://' (requerido por el patrón) ni se invoca el regex."""
+    if "://" not in text:
+        return
+    for m in URL_REGEX.finditer(text):
+        yield m.group(1)
+
+
+SNIPPET_MAX_CHARS = 4000  # recorte del texto que se devuelve en extract_all
+
+
 def extract_bodies_and_urls(msg: EmailMessage) -> Dict[str, Any]:
+    """
+    Recorre las partes MIME una sola vez. Cada parte HTML se procesa (enlaces y
+    URLs) en cuanto se decodifica y solo se conservan sus primeros
+    SNIPPET_MAX_CHARS caracteres; el texto plano se conserva entero porque
+    urgency_score lo analiza completo.
+    """
     text_plain_parts: List[str] = []
-    text_html_parts: List[str] = []
+    html_snippet = ""
     attachments: List[Dict[str, Any]] = []
     urls_in_text: List[str] = []
     links_in_html: List[Dict[str, str]] = []
+    seen_hrefs = set()
+
+    def add_plain(text: str) -> None:
+        text_plain_parts.append(text)
+        urls_in_text.extend(_iter_urls(text))
+
+    def add_html(html: str) -> None:
+        nonlocal html_snippet
+        try:
+            links = extract_links(html)
+            links_in_html.extend(links)
+            seen_hrefs.update(link["href"] for link in links)
+        except Exception:
+            pass
+        # URLs 'crudas' incrustadas en el HTML (además de <a href>)
+        for url in _iter_urls(html):
+            # Evita duplicar si ya está en hrefs (heurística simple)
+            if url not in seen_hrefs:
+                seen_hrefs.add(url)
+                links_in_html.append({"href": url, "text": ""})
+        if html.strip() and len(html_snippet) < SNIPPET_MAX_CHARS:
+            sep = "\n\n" if html_snippet else ""
+            html_snippet = (html_snippet + sep + html[:SNIPPET_MAX_CHARS])[:SNIPPET_MAX_CHARS]
 
     if msg.is_multipart():
         for part in msg.walk():
@@ -305,41 +413,22 @@ def extract_bodies_and_urls(msg: EmailMessage) -> Dict[str, Any]:
                     "sha256": sha256_bytes(payload),
                     "ext": ext_of_filename(name)
                 })
+                del payload  # no retener el adjunto decodificado hasta la siguiente parte
             elif ctype == "text/plain":
-                text_plain_parts.append(text_of_part(part))
+                add_plain(text_of_part(part))
             elif ctype == "text/html":
-                text_html_parts.append(text_of_part(part))
+                add_html(text_of_part(part))
     else:
         # Parte única
         ctype = msg.get_content_type()
         if ctype == "text/plain":
-            text_plain_parts.append(text_of_part(msg))
+            add_plain(text_of_part(msg))
         elif ctype == "text/html":
-            text_html_parts.append(text_of_part(msg))
-
-    # URLs desde texto plano
-    for tp in text_plain_parts:
-        for m in URL_REGEX.finditer(tp):
-            urls_in_text.append(m.group(1))
-
-    # Enlaces desde HTML
-    for html in text_html_parts:
-        parser = SimpleHTMLLinkExtractor()
-        try:
-            parser.feed(html)
-            links_in_html.extend(parser.links)
-        except Exception:
-            pass
-        # URLs 'crudas' incrustadas en el HTML (además de <a href>)
-        for m in URL_REGEX.finditer(html):
-            url = m.group(1)
-            # Evita duplicar si ya está en hrefs (heurística simple)
-            if not any(d["href"] == url for d in links_in_html):
-                links_in_html.append({"href": url, "text": ""})
+            add_html(text_of_part(msg))
 
     return {
         "text_plain": "\n\n".join([t for t in text_plain_parts if t.strip()]),
-        "text_html": "\n\n".join([h for h in text_html_parts if h.strip()]),
+        "text_html_snippet": html_snippet,
         "urls_in_text": sorted(set(urls_in_text)),
         "links_in_html": links_in_html,
         "attachments": attachments
@@ -350,37 +439,46 @@ def extract_bodies_and_urls(msg: EmailMessage) -> Dict[str, Any]:
 # Features (lo útil para tu modelo)
 # ----------------------------
 
+# Marcas diacríticas combinantes (U+0300..U+036F) a eliminar tras NFD
+_DIACRITIC_TABLE = dict.fromkeys(range(0x0300, 0x036F + 1))
+
+
 def _normalize_for_match(text: str) -> str:
     text = (text or "").lower()
-    text = unicodedata.normalize("NFD", text)
-    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+    if text.isascii():
+        return text
+    return unicodedata.normalize("NFD", text).translate(_DIACRITIC_TABLE)
+
+
+URGENCY_MAX = 5
 
 
 def urgency_score(subject: str, body_text: str) -> int:
     """
     Puntaje heurístico: se cuentan términos únicos y señales de énfasis.
+    Las señales baratas van primero y el escaneo de palabras se corta en
+    cuanto el puntaje llega al máximo (correos largos y muy urgentes).
     """
     raw = f"{subject or ''}\n{body_text or ''}"
     corpus = _normalize_for_match(raw)
 
-    hits = set()
-    for word in URGENCY_WORDS:
-        pattern = rf"\b{re.escape(word)}\b"
-        if re.search(pattern, corpus):
-            base = re.sub(r"(ar|er|ir|s|es)$", "", word)
-            hits.add(base or word)
-
-    score = len(hits)
-    if any(phrase in corpus for phrase in URGENCY_EMPHASIS):
+    score = 0
+    if UPPER_WORD_RE.search(subject or ""):
         score += 1
 
     if raw.count("!") >= 3:
         score += 1
 
-    if re.search(r"\b[A-ZÁÉÍÓÚ]{4,}\b", subject or ""):
+    if URGENCY_EMPHASIS_RE.search(corpus):
         score += 1
 
-    return min(score, 5)
+    hits = set()
+    for m in URGENCY_RE.finditer(corpus):
+        hits.add(URGENCY_STEMS[m.group(1)])
+        if score + len(hits) >= URGENCY_MAX:
+            return URGENCY_MAX
+
+    return score + len(hits)
 
 
 def link_domain_mismatch(links: List[Dict[str, str]], from_domain: Optional[str]) -> bool:
@@ -397,6 +495,10 @@ def link_domain_mismatch(links: List[Dict[str, str]], from_domain: Optional[str]
     return False
 
 
+LOOKS_LIKE_URL_RE = re.compile(r"https?://")
+LOOKS_LIKE_DOMAIN_RE = re.compile(r"\b[a-z0-9\-]+\.[a-z]{2,}\b", re.I)
+
+
 def visible_vs_href_mismatch(links: List[Dict[str, str]]) -> bool:
     """
     True si el texto visible del enlace parece una URL/dominio que NO coincide con el href real.
@@ -407,7 +509,7 @@ def visible_vs_href_mismatch(links: List[Dict[str, str]]) -> bool:
         if not text or not href:
             continue
         # ¿El texto parece URL?
-        if re.search(r"https?://", text) or re.search(r"\b[a-z0-9\-]+\.[a-z]{2,}\b", text, re.I):
+        if LOOKS_LIKE_URL_RE.search(text) or LOOKS_LIKE_DOMAIN_RE.search(text):
             d_text = domain_of_url(text) or guess_domain(text)
             d_href = domain_of_url(href)
             if d_text and d_href and d_text != d_href:
@@ -415,6 +517,7 @@ def visible_vs_href_mismatch(links: List[Dict[str, str]]) -> bool:
     return False
 
 
+@lru_cache(maxsize=2048)
 def guess_domain(s: str) -> Optional[str]:
     """
     Si 's' no es una URL válida, intenta extraer un dominio 'a mano' del texto.
@@ -425,21 +528,19 @@ def guess_domain(s: str) -> Optional[str]:
 
 def attachment_suspicion_score(att_list: List[Dict[str, Any]]) -> int:
     """
-    +2 por cada extensión marcadamente peligrosa, +1 por cada comprimido o macro. Máx 6.
+    +2 por cada extensión marcadamente peligrosa o con macros, +1 por cada comprimido/imagen de disco. Máx 6.
     """
     score = 0
     for a in att_list:
         ext = (a.get("ext") or "").lower()
-        if ext in {".exe", ".scr", ".bat", ".cmd", ".js", ".vbs", ".jar", ".ps1", ".hta", ".lnk", ".msi", ".apk"}:
-            score += 2
-        elif ext in {".docm", ".xlsm", ".pptm"}:
-            score += 2
-        elif ext in {".zip", ".rar", ".iso", ".img"}:
-            score += 1
+        if ext not in SUSPICIOUS_EXTS:
+            continue
+        score += 1 if ext in ARCHIVE_EXTS else 2
     return min(score, 6)
 
 
-def build_features(headers: Dict[str, str], content: Dict[str, Any]) -> Dict[str, Any]:
+def build_features(headers: Dict[str, str], content: Dict[str, Any],
+                   received_list: Optional[List[str]] = None) -> Dict[str, Any]:
     from_h = headers.get("From")
     reply_to_h = headers.get("Reply-To")
     return_path_h = headers.get("Return-Path")
@@ -457,22 +558,31 @@ def build_features(headers: Dict[str, str], content: Dict[str, Any]) -> Dict[str
     dkim = auth["dkim"]
     dmarc = auth["dmarc"]
 
-    received_list = []
-    # Conserva todas las cabeceras "Received" (algunas librerías colapsan en uno)
-    for k, v in headers.items():
-        if k.lower() == "received":
-            received_list.append(v)
+    # Cadena completa desde extract_received_chain(msg); sin ella, la única del dict
+    if received_list is None:
+        received_list = [headers["Received"]] if headers.get("Received") else []
     origin_ip = first_origin_ip_from_received(received_list)
 
     # URLs y dominios
-    link_domains = sorted({domain_of_url(d.get("href", "")) for d in content["links_in_html"] if domain_of_url(d.get("href", ""))})
-    plain_domains = sorted({domain_of_url(u) for u in content["urls_in_text"] if domain_of_url(u)})
-    all_domains = sorted(set([d for d in link_domains + plain_domains if d]))
+    # Una sola pasada por lista: cada dominio se calcula una vez
+    html_doms, text_doms = set(), set()
+    for d in content["links_in_html"]:
+        dom = domain_of_url(d.get("href", ""))
+        if dom:
+            html_doms.add(dom)
+    for u in content["urls_in_text"]:
+        dom = domain_of_url(u)
+        if dom:
+            text_doms.add(dom)
+    link_domains = sorted(html_doms)
+    plain_domains = sorted(text_doms)
+    all_domains = sorted(html_doms | text_doms)
 
     # Scores
     u_score = urgency_score(subject_h or "", content.get("text_plain", ""))
     att_score = attachment_suspicion_score(content.get("attachments", []))
-    mismatch_from_links = link_domain_mismatch(content["links_in_html"], from_domain)
+    # Equivale a link_domain_mismatch(), reutilizando los dominios ya calculados
+    mismatch_from_links = bool(from_domain) and any(d != from_domain for d in html_doms)
     mismatch_visible_href = visible_vs_href_mismatch(content["links_in_html"])
 
     # Señales booleanas
@@ -537,16 +647,16 @@ def build_features(headers: Dict[str, str], content: Dict[str, Any]) -> Dict[str
     return features
 
 
-def extract_all(path: str) -> Dict[str, Any]:
+def extract_all(path: Union[str, BinaryIO]) -> Dict[str, Any]:
     msg = parse_eml(path)
     headers = extract_headers(msg)
     content = extract_bodies_and_urls(msg)
-    feats = build_features(headers, content)
+    feats = build_features(headers, content, extract_received_chain(msg))
     return {
         "headers": headers,
         "content": {
-            "text_plain": content["text_plain"][:4000],  # evita JSON gigante
-            "text_html_snippet": content["text_html"][:4000],
+            "text_plain": content["text_plain"][:SNIPPET_MAX_CHARS],  # evita JSON gigante
+            "text_html_snippet": content["text_html_snippet"],
             "urls_in_text": content["urls_in_text"],
             "links_in_html": content["links_in_html"],
         },
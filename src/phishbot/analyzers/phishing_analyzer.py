@@ -1,8 +1,64 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-from typing import Dict, Tuple, Any, List
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple, Any, List, Optional
 from .eml_feature_extractor import extract_all
-from ..models.loader import load_artifact
+from ..models.loader import load_artifact, artifact_version
+from ..models.scoring import score_batched
+
+# Extracción por sha256 del contenido del .eml (LRU acotado): el mismo correo se reutiliza
+# aunque llegue con otra ruta (el servidor guarda cada subida con un nombre aleatorio)
+_EXTRACT_CACHE: "OrderedDict[str, Tuple[Dict[str, Any], str]]" = OrderedDict()
+_EXTRACT_CACHE_MAX = 128
+_EXTRACT_LOCK = threading.Lock()
+_HASH_CHUNK_SIZE = 64 * 1024
+
+def _file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _cached_extract(path: str, content_hash: str) -> Tuple[Dict[str, Any], str]:
+    # El texto para el modelo se compone aquí, una vez por contenido distinto.
+    with _EXTRACT_LOCK:
+        cached = _EXTRACT_CACHE.get(content_hash)
+        if cached is not None:
+            _EXTRACT_CACHE.move_to_end(content_hash)
+            return cached
+    eml = extract_all(path)
+    cached = (eml, _compose_text_for_model(eml))
+    with _EXTRACT_LOCK:
+        _EXTRACT_CACHE[content_hash] = cached
+        if len(_EXTRACT_CACHE) > _EXTRACT_CACHE_MAX:
+            _EXTRACT_CACHE.popitem(last=False)
+    return cached
+
+# Probabilidad del modelo por (versión del artefacto, hash del texto compuesto) (LRU acotado):
+# al recargarse otro .pkl cambia la versión y no se devuelven probabilidades del modelo anterior
+_PROB_CACHE: "OrderedDict[Tuple[str, bytes], float]" = OrderedDict()
+_PROB_CACHE_MAX = 1024
+_PROB_LOCK = threading.Lock()
+
+def _model_prob(pipeline: Any, version: str, text: str, batched: bool) -> float:
+    key = (version, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+    with _PROB_LOCK:
+        prob = _PROB_CACHE.get(key)
+        if prob is not None:
+            _PROB_CACHE.move_to_end(key)
+            return prob
+    if batched:
+        prob = score_batched(text)
+    else:
+        prob = float(pipeline.predict_proba([text])[0, 1])
+    with _PROB_LOCK:
+        _PROB_CACHE[key] = prob
+        if len(_PROB_CACHE) > _PROB_CACHE_MAX:
+            _PROB_CACHE.popitem(last=False)
+    return prob
 
 def _compose_text_for_model(eml: Dict[str, Any]) -> str:
     feats = eml.get("features", {}) or {}
@@ -11,20 +67,25 @@ def _compose_text_for_model(eml: Dict[str, Any]) -> str:
     body = content.get("text_plain") or content.get("text_html_snippet") or ""
     return f"{subject}\n\n{body}".strip()
 
+# Flags "duros": (clave de feature, explicación), en el orden en que se reportan
+_FLAG_TABLE: Tuple[Tuple[str, str], ...] = (
+    ("visible_vs_href_mismatch", "El texto del enlace no coincide con el destino real."),
+    ("from_vs_returnpath_mismatch", "Return-Path diferente al dominio del remitente."),
+    ("from_vs_replyto_mismatch", "Reply-To diferente al remitente."),
+)
+_AUTH_KEYS = ("spf_result", "dkim_result", "dmarc_result")
+
+# Semáforo: (nivel, predicción) por número de umbrales (green_max, yellow_max) alcanzados
+_LEVELS: Tuple[Tuple[str, str], ...] = (
+    ("verde", "Legítimo"),
+    ("amarillo", "Sospechoso"),
+    ("rojo", "Phishing"),
+)
+
 def _collect_flags(feats: Dict[str, Any]) -> Tuple[int, List[str]]:
-    exp: List[str] = []
-    flags = 0
-    if feats.get("visible_vs_href_mismatch"):
-        exp.append("El texto del enlace no coincide con el destino real.")
-        flags += 1
-    if feats.get("from_vs_returnpath_mismatch"):
-        exp.append("Return-Path diferente al dominio del remitente.")
-        flags += 1
-    if feats.get("from_vs_replyto_mismatch"):
-        exp.append("Reply-To diferente al remitente.")
-        flags += 1
-    auth_fail = (feats.get("spf_result") == "fail") or (feats.get("dkim_result") == "fail") or (feats.get("dmarc_result") == "fail")
-    if auth_fail:
+    exp: List[str] = [msg for key, msg in _FLAG_TABLE if feats.get(key)]
+    flags = len(exp)
+    if any(feats.get(k) == "fail" for k in _AUTH_KEYS):
         exp.append("Autenticación (SPF/DKIM/DMARC) fallida.")
         flags += 1
     if (feats.get("urgency_score") or 0) >= 3:
@@ -36,21 +97,28 @@ def _collect_flags(feats: Dict[str, Any]) -> Tuple[int, List[str]]:
 def analyze_eml_hybrid(path_eml: str,
                        weights: Tuple[float, float, float] = (0.7, 0.2, 0.1),
                        green_max: float = 0.30,
-                       yellow_max: float = 0.70) -> Dict[str, Any]:
+                       yellow_max: float = 0.70,
+                       batched: bool = False,
+                       content_hash: Optional[str] = None) -> Dict[str, Any]:
     """
     Ensamble híbrido (Opción B):
       final_score = w1 * p_model + w2 * norm(risk_score_v1) + w3 * norm(flags)
     Devuelve un dict con: prediccion, prob_modelo, score_final, umbral_modelo, nivel, explicacion, resumen.
+    batched=True agrupa la predicción con la de otros hilos concurrentes (ver models/scoring.py).
+    content_hash: sha256 hexadecimal del archivo si el llamador ya lo calculó; si no, se calcula aquí.
     """
     # 1) Extrae todo del .eml
-    eml = extract_all(path_eml)
+    # (re-analizar el mismo contenido reutiliza la extracción anterior)
+    eml, text = _cached_extract(path_eml, content_hash or _file_sha256(path_eml))
     feats = eml.get("features", {}) or {}
     # 2) Carga modelo y umbral
+    # (la versión se lee antes de cargar: si el .pkl cambia entre medias, la probabilidad
+    # nueva queda bajo la clave antigua, nunca al revés)
+    version = artifact_version()
     pipeline, thr, _meta = load_artifact()
-    # 3) Texto para el modelo y probabilidad
-    text = _compose_text_for_model(eml)
+    # 3) Probabilidad para el texto compuesto (ya viene de _cached_extract)
     # Importante: si tu pipeline NO incluye preprocesado dentro, asegúrate de aplicar el mismo preprocesado del entrenamiento aquí.
-    prob = float(pipeline.predict_proba([text])[0, 1])
+    prob = _model_prob(pipeline, version, text, batched)
     # 4) Señales del extractor
     risk = float(feats.get("risk_score_v1", 0.0))
     flags_count, explanation = _collect_flags(feats)
@@ -62,16 +130,8 @@ def analyze_eml_hybrid(path_eml: str,
     final_score = float(min(max(final_score, 0.0), 1.0))
     # 6) Predicción y semáforo
     # pred = int(final_score >= thr)
-    prediccion = ""
-    if final_score < green_max:
-        nivel = "verde"
-        prediccion = "Legítimo"
-    elif final_score < yellow_max:
-        nivel = "amarillo"
-        prediccion = "Sospechoso"
-    else:
-        nivel = "rojo"
-        prediccion = "Phishing"
+    # (asume green_max <= yellow_max: el índice cuenta los umbrales superados)
+    nivel, prediccion = _LEVELS[(final_score >= green_max) + (final_score >= yellow_max)]
     # 7) Resumen técnico breve
     resumen = {
         "dominios_enlaces": feats.get("all_link_domains", []) or [],
@@ -1,9 +1,15 @@
 from __future__ import annotations
 from pathlib import Path
 import os
-import joblib
+import threading
 from typing import Tuple, Any, Dict
 
+# Artefactos ya deserializados, por (ruta resuelta, mtime): si el .pkl se
+# reemplaza en disco, cambia el mtime y se vuelve a cargar. Se guarda como mucho
+# una versión por ruta.
+_ARTIFACT_CACHE: Dict[Tuple[str, float], Tuple[Any, float, Dict]] = {}
+_ARTIFACT_LOCK = threading.Lock()
+
 def _default_model_path() -> Path:
     """
     Devuelve la ruta por defecto del artefacto del modelo.
@@ -17,18 +23,53 @@ def _default_model_path() -> Path:
     project_root = Path(__file__).resolve().parents[3]
     return project_root / "models" / "artifacts" / "phishing_detector_pipeline.pkl"
 
+def _artifact_key(path: Path | None = None) -> Tuple[str, float]:
+    model_path = Path(path).resolve() if path else _default_model_path()
+    return str(model_path), model_path.stat().st_mtime
+
+def artifact_version(path: Path | None = None) -> str:
+    """
+    Identidad del artefacto vigente (ruta resuelta + mtime), la misma que decide
+    cuándo load_artifact recarga. Sirve para que las cachés de resultados del
+    modelo no sobrevivan a un cambio de .pkl.
+    """
+    model_path, mtime = _artifact_key(path)
+    return f"{model_path}@{mtime!r}"
+
 def load_artifact(path: Path | None = None) -> Tuple[Any, float, Dict]:
     """
     Carga el artefacto del modelo (.pkl) y devuelve:
         - pipeline (scikit-learn)
         - optimal_threshold (float, por defecto 0.5 si no está presente)
         - metadata (dict opcional)
+    El resultado se memoriza por proceso: las llamadas siguientes devuelven los
+    mismos objetos sin volver a leer el .pkl mientras no cambie su mtime.
     """
-    model_path = Path(path) if path else _default_model_path()
-    data = joblib.load(model_path)
-    pipeline = data["pipeline"]
-    thr = float(data.get("optimal_threshold", 0.5))
-    meta = data.get("metadata", {})
-    return pipeline, thr, meta
+    key = _artifact_key(path)
+    model_path = Path(key[0])
+    cached = _ARTIFACT_CACHE.get(key)
+    if cached is not None:
+        return cached
+    with _ARTIFACT_LOCK:
+        # Otro hilo pudo haberlo cargado mientras esperábamos el lock
+        cached = _ARTIFACT_CACHE.get(key)
+        if cached is not None:
+            return cached
+        # joblib (y con él numpy/scipy/sklearn) se importa en la primera carga,
+        # no al importar el paquete
+        import joblib
+        # Sin mmap_mode: joblib.dump reescribe el .pkl en el sitio (lo trunca), y un
+        # mapeo vivo de un archivo truncado provoca SIGBUS al leerlo desde otro hilo.
+        # Cargado en memoria, el pipeline anterior sigue siendo válido tras el reemplazo.
+        data = joblib.load(model_path)
+        pipeline = data["pipeline"]
+        thr = float(data.get("optimal_threshold", 0.5))
+        meta = data.get("metadata", {})
+        # Descarta solo versiones anteriores de esta misma ruta: quien alterne entre
+        # varios artefactos no los recarga en cada llamada
+        for stale in [k for k in _ARTIFACT_CACHE if k[0] == key[0]]:
+            del _ARTIFACT_CACHE[stale]
+        _ARTIFACT_CACHE[key] = (pipeline, thr, meta)
+        return _ARTIFACT_CACHE[key]
 
-__all__ = ["load_artifact"]
+__all__ = ["load_artifact", "artifact_version"]
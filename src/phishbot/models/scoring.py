@@ -0,0 +1,70 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+from .loader import load_artifact
+
+class BatchScorer:
+    """
+    Agrupa las predicciones de hilos concurrentes en una sola llamada a
+    pipeline.predict_proba: un hilo de fondo junta hasta max_batch textos
+    (o los que lleguen en max_wait_ms) y reparte cada probabilidad a su Future.
+    """
+
+    def __init__(self, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def score(self, text: str) -> float:
+        """Probabilidad de phishing (clase 1) para un texto; bloquea hasta tener el lote."""
+        fut: Future = Future()
+        self._ensure_worker()
+        self._queue.put((text, fut))
+        return fut.result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="batch-scorer", daemon=True)
+                self._worker.start()
+
+    def _next_batch(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                pipeline, _thr, _meta = load_artifact()
+                probs = pipeline.predict_proba([text for text, _ in batch])[:, 1]
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            for (_, fut), prob in zip(batch, probs):
+                fut.set_result(float(prob))
+
+# Instancia compartida por el proceso
+SCORER = BatchScorer()
+
+def score_batched(text: str) -> float:
+    return SCORER.score(text)
+
+__all__ = ["BatchScorer", "score_batched"]
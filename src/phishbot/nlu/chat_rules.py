@@ -11,44 +11,126 @@ Mejoras en esta versión:
 
 from __future__ import annotations
 import re
-import unicodedata
+from collections import Counter
 from dataclasses import dataclass
-from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from enum import IntEnum
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import ahocorasick
+except ImportError:  # sin pyahocorasick se recorre la tabla de palabras clave con `in`
+    ahocorasick = None
+
+
+# ========== Cachés ==========
+# Longitud máxima de los textos que se memorizan: los mensajes llegan del cliente sin
+# límite propio (solo MAX_CONTENT_LENGTH), y cada entrada de caché retiene clave y valor
+CACHE_MAX_TEXT_LEN = 256
+
+
+def lru_cache_short_text(maxsize: Optional[int]):
+    """
+    lru_cache que solo memoriza llamadas cuyos argumentos str miden como mucho
+    CACHE_MAX_TEXT_LEN; las demás se calculan sin pasar por la caché.
+    """
+    def decorator(fn):
+        cached = lru_cache(maxsize=maxsize)(fn)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            for a in (*args, *kwargs.values()):
+                if isinstance(a, str) and len(a) > CACHE_MAX_TEXT_LEN:
+                    return fn(*args, **kwargs)
+            return cached(*args, **kwargs)
+
+        wrapper.cache_info = cached.cache_info
+        wrapper.cache_clear = cached.cache_clear
+        return wrapper
+    return decorator
 
 
 # ========== Normalización ==========
+NON_WORD_RE = re.compile(r"[^\w\s]")
+TRAILING_PUNCT_RE = re.compile(r"[\?\.\!]+$")
+TOKEN_RE = re.compile(r"[a-z0-9\-\._]+")
+# Vocales con tilde/diéresis y eñe (ya en minúscula): mismo resultado que NFD sin marcas
+SPANISH_ACCENTS = str.maketrans("áéíóúüñ", "aeiouun")
+# Lo que queda fuera de ASCII y de ¿/¡ (que no llevan marcas) sí necesita NFD
+NEEDS_NFD_RE = re.compile(r"[^\x00-\x7f¿¡]")
+
+
+@lru_cache_short_text(maxsize=4096)
 def normalize(text: str) -> str:
     text = text.lower().strip()
-    text = "".join(
-        c for c in unicodedata.normalize("NFD", text)
-        if unicodedata.category(c) != "Mn"
-    )
-    text = re.sub(r"\s+", " ", text)
-    return text
+    if not text.isascii():
+        # ASCII no tiene marcas diacríticas; el español se resuelve con la tabla
+        # y solo el resto de caracteres pasa por la descomposición NFD
+        text = text.translate(SPANISH_ACCENTS)
+        if NEEDS_NFD_RE.search(text):
+            import unicodedata  # solo se carga si llega texto fuera del español básico
+            text = "".join(
+                c for c in unicodedata.normalize("NFD", text)
+                if unicodedata.category(c) != "Mn"
+            )
+    # str.split() corta en los mismos blancos que \s y descarta los extremos
+    return " ".join(text.split())
 
 
 # ========== Intenciones/Estados ==========
-class Intent(str, Enum):
-    DEFINICION = "definicion_concepto"
-    SENALES = "senales_comunes"
-    BP_GENERALES = "buenas_practicas_generales"
-    BP_ESPECIFICAS = "buenas_practicas_especificas"
-    TERMINOLOGIA = "terminologia_email_segura"
-    SALUDO_MENU = "saludo_menu_educativo"
-    DESPEDIDA = "despedida"
-    DESAMBIG = "desambiguacion"
-    FUERA = "fuera_de_ambito"
-    ANALISIS_PETICION = "analisis_pase_externo"
-
-
-class State(str, Enum):
-    INICIO = "inicio"
-    MENU_EDU = "menu_educativo"
-    EXPLICACION = "explicacion_concepto"
-    CHECKLIST = "checklist_consejos"
-    DESAMBIG = "desambiguacion"
-    FINALIZADO = "finalizado"
+# IntEnum: las comparaciones y los dicts por intención usan enteros; el nombre
+# textual (el que ve la API/JSON) está en .label
+class Intent(IntEnum):
+    DEFINICION = 1
+    SENALES = 2
+    BP_GENERALES = 3
+    BP_ESPECIFICAS = 4
+    TERMINOLOGIA = 5
+    SALUDO_MENU = 6
+    DESPEDIDA = 7
+    DESAMBIG = 8
+    FUERA = 9
+    ANALISIS_PETICION = 10
+
+    @property
+    def label(self) -> str:
+        return INTENT_LABELS[self]
+
+
+class State(IntEnum):
+    INICIO = 1
+    MENU_EDU = 2
+    EXPLICACION = 3
+    CHECKLIST = 4
+    DESAMBIG = 5
+    FINALIZADO = 6
+
+    @property
+    def label(self) -> str:
+        return STATE_LABELS[self]
+
+
+INTENT_LABELS: Dict[Intent, str] = {
+    Intent.DEFINICION: "definicion_concepto",
+    Intent.SENALES: "senales_comunes",
+    Intent.BP_GENERALES: "buenas_practicas_generales",
+    Intent.BP_ESPECIFICAS: "buenas_practicas_especificas",
+    Intent.TERMINOLOGIA: "terminologia_email_segura",
+    Intent.SALUDO_MENU: "saludo_menu_educativo",
+    Intent.DESPEDIDA: "despedida",
+    Intent.DESAMBIG: "desambiguacion",
+    Intent.FUERA: "fuera_de_ambito",
+    Intent.ANALISIS_PETICION: "analisis_pase_externo",
+}
+
+STATE_LABELS: Dict[State, str] = {
+    State.INICIO: "inicio",
+    State.MENU_EDU: "menu_educativo",
+    State.EXPLICACION: "explicacion_concepto",
+    State.CHECKLIST: "checklist_consejos",
+    State.DESAMBIG: "desambiguacion",
+    State.FINALIZADO: "finalizado",
+}
 
 
 # ========== Prioridades ==========
@@ -64,6 +146,10 @@ INTENT_PRIORITY: Dict[Intent, int] = {
     Intent.ANALISIS_PETICION: 6,
 }
 DESAMBIG_MARGIN = 0.15
+# Multiplicador de score por intención, precalculado a partir de la prioridad
+INTENT_WEIGHT: Dict[Intent, float] = {
+    it: 1.0 + (INTENT_PRIORITY.get(it, 1) - 3) * 0.1 for it in Intent
+}
 
 # ========== Disparadores ==========
 ANALISIS_KEYWORDS = [
@@ -83,11 +169,18 @@ DESPEDIDA_KEYWORDS = [
     "gracias adios", "cerrar", "terminar"
 ]
 
+# Una sola alternancia compilada: una pasada sobre el texto en vez de N búsquedas
+DESPEDIDA_RE = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, DESPEDIDA_KEYWORDS)) + r")\b"
+)
+
 CONTINUE_KEYWORDS = [
     "mas informacion", "mas detalles", "sigue", "continuar",
     "explica mas", "no entendi", "otro ejemplo", "dame mas",
     "ver mas", "profundizar"
 ]
+# Como subcadenas (igual que count_hits): basta saber si aparece alguna
+CONTINUE_RE = re.compile("|".join(map(re.escape, CONTINUE_KEYWORDS)))
 
 SENALES_KEYWORDS = [
     "senales phishing", "senales", "senales comunes",
@@ -134,9 +227,67 @@ DEFINICION_PATTERNS = [
     r"comparacion (?P<term>.+?) vs (?P<term2>.+)"
 ]
 
+# Términos con definición propia, en orden de prioridad y sin repetidos (tupla construida una vez)
+DEFINABLE_TERMS: Tuple[str, ...] = tuple(dict.fromkeys(TERMINOLOGIA_TERMS + CONCEPT_KEYWORDS))
+# Los mismos términos como subcadenas en una sola alternancia (más largos primero)
+DEFINABLE_TERMS_RE = re.compile(
+    "|".join(re.escape(t) for t in sorted(DEFINABLE_TERMS, key=len, reverse=True))
+)
+
+# Patrones compilados una sola vez al importar (se evalúan en cada turno)
+ANALISIS_RES = tuple(re.compile(p) for p in ANALISIS_KEYWORDS)
+DEFINICION_RES = tuple(re.compile(p) for p in DEFINICION_PATTERNS)
+CONCEPT_RES = tuple((c, re.compile(rf"\b{re.escape(c)}\b")) for c in CONCEPT_KEYWORDS)
+# Palabras de cada concepto, partidas una sola vez
+CONCEPT_WORDS = tuple((c, tuple(c.split())) for c in CONCEPT_KEYWORDS)
+# Todos los conceptos en una alternancia (más largos primero): una sola pasada
+# para saber si hay alguno antes de elegir cuál según el orden de CONCEPT_KEYWORDS
+CONCEPTS_UNION_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(c) for c in sorted(CONCEPT_KEYWORDS, key=len, reverse=True)) + r")\b"
+)
+
+# Listas que nlu_detect cuenta en cada turno, por categoría ("bp_<subtema>" para BP_SUBTOPICS)
+KEYWORD_CATEGORIES: Dict[str, List[str]] = {
+    "terminologia": TERMINOLOGIA_TERMS,
+    "senales": SENALES_KEYWORDS,
+    "bp_generales": BP_GENERALES_KEYWORDS,
+    "saludo": SALUDO_KEYWORDS,
+    "continuar": CONTINUE_KEYWORDS,
+    **{f"bp_{sub}": kws for sub, kws in BP_SUBTOPICS.items()},
+}
+
+# palabra clave -> categorías a las que pertenece
+KEYWORD_INDEX: Dict[str, Tuple[str, ...]] = {}
+for _cat, _kws in KEYWORD_CATEGORIES.items():
+    for _kw in _kws:
+        KEYWORD_INDEX[_kw] = KEYWORD_INDEX.get(_kw, ()) + (_cat,)
+
+# Autómata Aho-Corasick: todas las palabras clave en una sola pasada sobre el texto
+if ahocorasick is not None:
+    KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _kw in KEYWORD_INDEX:
+        KEYWORD_AUTOMATON.add_word(_kw, _kw)
+    KEYWORD_AUTOMATON.make_automaton()
+    # Términos definibles con su prioridad (posición en DEFINABLE_TERMS)
+    TERMS_AUTOMATON = ahocorasick.Automaton()
+    for _prio, _term in enumerate(DEFINABLE_TERMS):
+        TERMS_AUTOMATON.add_word(_term, (_prio, _term))
+    TERMS_AUTOMATON.make_automaton()
+    TERMS_TRIE = None
+else:
+    KEYWORD_AUTOMATON = None
+    TERMS_AUTOMATON = None
+    # Sin pyahocorasick: trie de caracteres (dicts anidados); "" marca el fin de un término
+    TERMS_TRIE: Optional[Dict[str, Any]] = {}
+    for _prio, _term in enumerate(DEFINABLE_TERMS):
+        _node = TERMS_TRIE
+        for _ch in _term:
+            _node = _node.setdefault(_ch, {})
+        _node[""] = (_prio, _term)
+
 
 # ========== Estructuras ==========
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NLUResult:
     intent: Intent
     score: float
@@ -145,42 +296,78 @@ class NLUResult:
 
 
 # ========== Utilidades NLU ==========
-def any_regex_match(text: str, patterns: List[str]) -> bool:
-    return any(re.search(p, text) for p in patterns)
+def any_regex_match(text: str, patterns: Iterable[re.Pattern]) -> bool:
+    return any(p.search(text) for p in patterns)
 
 
 def count_hits(text: str, keywords: List[str]) -> int:
     return sum(1 for kw in keywords if kw in text)
 
 
-def detect_bp_subtopic(text: str) -> Optional[str]:
-    for sub, kws in BP_SUBTOPICS.items():
-        if count_hits(text, kws) > 0:
-            return sub
-    return None
+def keyword_hits(text: str) -> Counter:
+    """
+    Por categoría de KEYWORD_CATEGORIES, cuántas palabras clave distintas
+    aparecen en el texto (mismo conteo que count_hits).
+    """
+    if KEYWORD_AUTOMATON is not None:
+        found = {kw for _, kw in KEYWORD_AUTOMATON.iter(text)}
+    else:
+        found = {kw for kw in KEYWORD_INDEX if kw in text}
+    hits: Counter = Counter()
+    for kw in found:
+        for cat in KEYWORD_INDEX[kw]:
+            hits[cat] += 1
+    return hits
+
+
+def detect_bp_subtopic(text: str, hits: Optional[Counter] = None) -> Optional[str]:
+    """Primer subtema de BP_SUBTOPICS (en orden) con alguna palabra clave en el texto."""
+    if hits is None:
+        hits = keyword_hits(text)
+    return next((sub for sub in BP_SUBTOPICS if hits[f"bp_{sub}"]), None)
 
 
 def extract_definition_term(text: str) -> Dict[str, str]:
-    for pat in DEFINICION_PATTERNS:
-        m = re.search(pat, text)
+    for pat in DEFINICION_RES:
+        m = pat.search(text)
         if m:
             d = {k: v.strip() for k, v in m.groupdict().items() if v}
             for k in list(d.keys()):
-                d[k] = re.sub(r"[\?\.\!]+$", "", d[k])
+                d[k] = TRAILING_PUNCT_RE.sub("", d[k])
             return d
     return {}
 
 
 # ========== Motor NLU ==========
 def nlu_detect(text_raw: str) -> NLUResult:
+    """
+    Detecta la intención del texto. Es una función pura: el resultado se memoriza
+    por texto crudo (saludos, menús y términos sueltos se repiten mucho) y se
+    devuelve con una copia de slots para que el llamador pueda modificarla.
+    """
+    r = _nlu_detect_cached(text_raw)
+    return NLUResult(r.intent, r.score, dict(r.slots), r.alt)
+
+
+@lru_cache_short_text(maxsize=1024)
+def _nlu_detect_cached(text_raw: str) -> NLUResult:
     text = normalize(text_raw)
+    # Mensajes cortos frecuentes ("hola", "2fa", "adios"...): resultado ya calculado
+    exact = EXACT_INTENT.get(text)
+    if exact is not None:
+        return exact
+    return _nlu_pipeline(text)
+
+
+def _nlu_pipeline(text: str) -> NLUResult:
+    """Detección completa sobre el texto ya normalizado."""
 
     # 0) Despedida
-    if count_hits(text, DESPEDIDA_KEYWORDS) > 0:
+    if DESPEDIDA_RE.search(text):
         return NLUResult(Intent.DESPEDIDA, 1.0, {})
 
     # 1) Puente a análisis
-    if any_regex_match(text, ANALISIS_KEYWORDS):
+    if any_regex_match(text, ANALISIS_RES):
         return NLUResult(Intent.ANALISIS_PETICION, 1.0, {})
 
     candidates: List[Tuple[Intent, float, Dict[str, str]]] = []
@@ -196,167 +383,210 @@ def nlu_detect(text_raw: str) -> NLUResult:
     if slots:
         score = 0.6
         term_norm = normalize(slots.get("term", "") + " " + slots.get("term2", ""))
-        if any(t in term_norm for t in TERMINOLOGIA_TERMS + CONCEPT_KEYWORDS):
+        # Una sola pasada del regex en vez de probar cada término con `in`
+        if DEFINABLE_TERMS_RE.search(term_norm):
             score += 0.2
         candidates.append((Intent.DEFINICION, score, slots))
 
     # 3) \U0001F525 Definición al escribir SOLO el término (mejorado)
     # Verifica si el texto es prácticamente solo un concepto
-    text_clean = re.sub(r'[^\w\s]', '', text).strip()
+    text_clean = NON_WORD_RE.sub('', text).strip()
     words = text_clean.split()
 
     # Si es 1-3 palabras, buscar coincidencia exacta con conceptos
     if len(words) <= 3:
-        for concept in CONCEPT_KEYWORDS:
-            concept_words = concept.split()
+        for concept, concept_words in CONCEPT_WORDS:
             # Coincidencia exacta o muy cercana
             if text_clean == concept or all(w in text_clean for w in concept_words):
                 candidates.append((Intent.DEFINICION, 0.85, {"term": concept}))
                 break
+        # El texto es exactamente un concepto: los pasos 4-8 no pueden superar esta
+        # definición ni quedar dentro del margen de desambiguación, se responde ya
+        if len(candidates) == 1 and text_clean == candidates[0][2].get("term"):
+            slots = {"term": text_clean}
+            matched = _find_definable_term(text)
+            if matched:
+                slots["matched_term"] = matched
+            return NLUResult(Intent.DEFINICION, 0.85 * INTENT_WEIGHT[Intent.DEFINICION], slots)
 
     # También buscar conceptos clave dentro de texto más largo
-    for concept in CONCEPT_KEYWORDS:
-        # Buscar el concepto como palabra completa
-        if re.search(rf'\b{re.escape(concept)}\b', text):
-            # Solo si no detectamos otros patrones fuertes
-            if len(candidates) == 0 or candidates[0][1] < 0.7:
+    # (solo si no detectamos otros patrones fuertes y hay algún concepto en el texto)
+    if (len(candidates) == 0 or candidates[0][1] < 0.7) and CONCEPTS_UNION_RE.search(text):
+        for concept, concept_re in CONCEPT_RES:
+            # Buscar el concepto como palabra completa
+            if concept_re.search(text):
                 candidates.append((Intent.DEFINICION, 0.65, {"term": concept}))
                 break
 
+    hits = keyword_hits(text)
+
     # 4) Terminología técnica
-    term_hits = count_hits(text, TERMINOLOGIA_TERMS)
+    term_hits = hits["terminologia"]
     if term_hits > 0:
         candidates.append((Intent.TERMINOLOGIA, 0.55 + 0.05 * min(term_hits, 3), {}))
 
     # 5) Señales comunes
-    s_hits = count_hits(text, SENALES_KEYWORDS)
+    s_hits = hits["senales"]
     if s_hits > 0:
         candidates.append((Intent.SENALES, 0.5 + 0.1 * min(s_hits, 3), {}))
 
     # 6) Buenas prácticas específicas
-    sub = detect_bp_subtopic(text)
+    sub = detect_bp_subtopic(text, hits)
     if sub:
         candidates.append((Intent.BP_ESPECIFICAS, 0.65, {"subtema": sub}))
 
     # 7) Buenas prácticas generales
-    bp_hits = count_hits(text, BP_GENERALES_KEYWORDS)
+    bp_hits = hits["bp_generales"]
     if bp_hits > 0:
         candidates.append((Intent.BP_GENERALES, 0.5 + 0.1 * min(bp_hits, 3), {}))
 
     # 8) Saludo / menú
-    sal_hits = count_hits(text, SALUDO_KEYWORDS)
+    sal_hits = hits["saludo"]
     if sal_hits > 0:
         candidates.append((Intent.SALUDO_MENU, 0.46 + 0.05 * min(sal_hits, 2), {}))
 
     if not candidates:
         return NLUResult(Intent.FUERA, 0.3, {})
 
-    # Ponderación ligera por prioridad
-    weighted = []
+    # Ponderación ligera por prioridad; una pasada guardando el mejor y el segundo
+    # (en empate gana el candidato anterior, igual que un sort estable)
+    best: Optional[Tuple[Intent, float, Dict[str, str]]] = None
+    second: Optional[Tuple[Intent, float]] = None
     for it, sc, sl in candidates:
-        weight = 1.0 + (INTENT_PRIORITY.get(it, 1) - 3) * 0.1
-        weighted.append((it, sc * weight, sl))
-
-    weighted.sort(key=lambda x: x[1], reverse=True)
-    top_intent, top_score, top_slots = weighted[0]
+        score = sc * INTENT_WEIGHT[it]
+        if best is None or score > best[1]:
+            if best is not None:
+                second = (best[0], best[1])
+            best = (it, score, sl)
+        elif second is None or score > second[1]:
+            second = (it, score)
+
+    top_intent, top_score, top_slots = best
     alt: Optional[Tuple[Intent, float]] = None
-    if len(weighted) > 1:
-        second_intent, second_score, _ = weighted[1]
+    if second is not None:
+        second_intent, second_score = second
         if top_intent != second_intent:
             delta = max(1e-6, top_score) - second_score
             rel_gap = delta / max(top_score, 1e-6)
             if rel_gap < DESAMBIG_MARGIN:
                 alt = (second_intent, second_score)
 
+    # Para definición/terminología se adjunta el término ya encontrado en el texto,
+    # así next_response no vuelve a recorrerlo
+    if top_intent in (Intent.DEFINICION, Intent.TERMINOLOGIA):
+        matched = _find_definable_term(text)
+        if matched:
+            top_slots = {**top_slots, "matched_term": matched}
+
     return NLUResult(top_intent, float(top_score), top_slots, alt)
 
 
+nlu_detect.cache_info = _nlu_detect_cached.cache_info  # diagnóstico
+
+
 # ========== Plantillas (NLG) ==========
+# Las plantillas fijas son constantes del módulo; las funciones tpl_* las devuelven
+SALUDO_MENU_TPL = (
+    "👋 <b>¡Hola! Soy tu asistente de seguridad.</b><br>"
+    "Puedo ayudarte a detectar y prevenir el phishing. ¿Qué te gustaría hacer?\n\n"
+    "🔎 <b>Ver señales comunes</b> de estafas\n"
+    "📘 <b>Consultar definiciones</b> (Phishing, DKIM, 2FA, Homógrafos, etc.)\n"
+    "🛡️ <b>Aprender buenas prácticas</b> para protegerte\n"
+    "📧 <b>Analizar un correo</b> sospechoso\n\n"
+    "<i>Escribe tu duda o elige una opción.</i>"
+)
+
+
 def tpl_saludo_menu() -> str:
-    return (
-        "👋 <b>¡Hola! Soy tu asistente de seguridad.</b><br>"
-        "Puedo ayudarte a detectar y prevenir el phishing. ¿Qué te gustaría hacer?\n\n"
-        "🔎 <b>Ver señales comunes</b> de estafas\n"
-        "📘 <b>Consultar definiciones</b> (Phishing, DKIM, 2FA, Homógrafos, etc.)\n"
-        "🛡️ <b>Aprender buenas prácticas</b> para protegerte\n"
-        "📧 <b>Analizar un correo</b> sospechoso\n\n"
-        "<i>Escribe tu duda o elige una opción.</i>"
-    )
+    return SALUDO_MENU_TPL
+
+
+DESPEDIDA_TPL = (
+    "👋 ¡Hasta luego! Fue un placer ayudarte.\n"
+    "Recuerda siempre:\n"
+    "🔗 Verifica los enlaces antes de hacer clic\n"
+    "🔐 Usa autenticación de dos factores (2FA/MFA)\n"
+    "📞 Ante la duda, contacta directamente con la organización\n"
+    "🛡️ ¡Mantente seguro!"
+)
 
 
 def tpl_despedida() -> str:
-    return (
-        "👋 ¡Hasta luego! Fue un placer ayudarte.\n"
-        "Recuerda siempre:\n"
-        "🔗 Verifica los enlaces antes de hacer clic\n"
-        "🔐 Usa autenticación de dos factores (2FA/MFA)\n"
-        "📞 Ante la duda, contacta directamente con la organización\n"
-        "🛡️ ¡Mantente seguro!"
-    )
+    return DESPEDIDA_TPL
+
+
+SENALES_COMUNES_TPL = (
+    "<b>Señales típicas de phishing por correo</b>\n"
+    "⚠️ Urgencia o amenazas inusuales.\n"
+    "🕵️ Remitente o <b>display name</b> que no coincide con el email real.\n"
+    "🌐 Enlaces cuyo dominio difiere de la marca esperada.\n"
+    "💳 Solicitud de credenciales, pagos o datos sensibles.\n"
+    "📎 Adjuntos inesperados o uso de acortadores/QR sin contexto.\n"
+    "*Idea práctica:* pasa el cursor por el enlace y verifica el <b>dominio</b> antes de hacer clic.\n"
+)
 
 
 def tpl_senales_comunes() -> str:
-    return (
-        "<b>Señales típicas de phishing por correo</b>\n"
-        "⚠️ Urgencia o amenazas inusuales.\n"
-        "🕵️ Remitente o <b>display name</b> que no coincide con el email real.\n"
-        "🌐 Enlaces cuyo dominio difiere de la marca esperada.\n"
-        "💳 Solicitud de credenciales, pagos o datos sensibles.\n"
-        "📎 Adjuntos inesperados o uso de acortadores/QR sin contexto.\n"
-        "*Idea práctica:* pasa el cursor por el enlace y verifica el <b>dominio</b> antes de hacer clic.\n"
-    )
+    return SENALES_COMUNES_TPL
+
+
+BP_GENERALES_TPL = (
+    "<b>Buenas prácticas esenciales (correo)</b>\n"
+    "1) Verifica remitente y dominio real antes de interactuar.\n"
+    "2) No ingreses credenciales desde enlaces recibidos.\n"
+    "3) Usa <b>2FA/MFA</b> en tus cuentas importantes.\n"
+    "4) Desconfía de urgencias y premios.\n"
+    "5) Reporta sospechas por el canal oficial.\n"
+    "¿Profundizamos en <b>enlaces</b>, <b>contraseñas/gestores</b>, <b>2FA</b>, <b>adjuntos</b> o <b>QR</b>?"
+)
 
 
 def tpl_bp_generales() -> str:
-    return (
-        "<b>Buenas prácticas esenciales (correo)</b>\n"
-        "1) Verifica remitente y dominio real antes de interactuar.\n"
-        "2) No ingreses credenciales desde enlaces recibidos.\n"
-        "3) Usa <b>2FA/MFA</b> en tus cuentas importantes.\n"
-        "4) Desconfía de urgencias y premios.\n"
-        "5) Reporta sospechas por el canal oficial.\n"
-        "¿Profundizamos en <b>enlaces</b>, <b>contraseñas/gestores</b>, <b>2FA</b>, <b>adjuntos</b> o <b>QR</b>?"
-    )
+    return BP_GENERALES_TPL
+
+
+# Texto por subtema de BP_SUBTOPICS
+BP_ESPECIFICAS_TPL: Dict[str, str] = {
+    "enlaces": (
+        "<b>Recomendaciones al ver un enlace o link</b>\n"
+        "1) Pasa el cursor y compara el dominio con la marca esperada.\n"
+        "2) Evita acortadores sin contexto; entra por marcador propio.\n"
+        "3) Revisa subdominios engañosos (p. ej., `seguridad.tu-banco.com` ≠ `tu-banco.seguridad.com`).\n"
+        "4) Si dudas, <b>no hagas click</b>. Abre el sitio manualmente.\n"
+    ),
+    "contrasenas": (
+        "<b>Contraseñas y gestores</b>\n"
+        "• Usa un <b>gestor</b> para crear y guardar claves únicas.\n"
+        "• Activa <b>2FA</b> donde sea posible.\n"
+        "• Desconfía de correos que pidan verificar tu contraseña.\n"
+        "¿Quieres ver <b>señales comunes</b> o una <b>definición</b> (p. ej., ingeniería social)?"
+    ),
+    "2fa": (
+        "<b>2FA: ¿Por qué te protege?</b>\n"
+        "• Bloquea accesos incluso si adivinan tu contraseña.\n"
+        "• Usa app de autenticación sobre SMS cuando puedas.\n"
+    ),
+    "adjuntos": (
+        "<b>Adjuntos seguros</b>\n"
+        "• Desconfía de `.zip`, `.exe`.\n"
+        "• Si no esperabas el archivo, confirma por otro canal.\n"
+    ),
+    "qr": (
+        "<b>Códigos QR con cabeza</b>\n"
+        "• Evita escanear QR de correos inesperados.\n"
+        "• Si debes, verifica a qué dominio apunta antes de iniciar sesión.\n"
+    ),
+}
 
 
 def tpl_bp_especificas(subtema: str) -> str:
-    if subtema == "enlaces":
-        return (
-            "<b>Recomendaciones al ver un enlace o link</b>\n"
-            "1) Pasa el cursor y compara el dominio con la marca esperada.\n"
-            "2) Evita acortadores sin contexto; entra por marcador propio.\n"
-            "3) Revisa subdominios engañosos (p. ej., `seguridad.tu-banco.com` ≠ `tu-banco.seguridad.com`).\n"
-            "4) Si dudas, <b>no hagas click</b>. Abre el sitio manualmente.\n"
-        )
-    if subtema == "contrasenas":
-        return (
-            "<b>Contraseñas y gestores</b>\n"
-            "• Usa un <b>gestor</b> para crear y guardar claves únicas.\n"
-            "• Activa <b>2FA</b> donde sea posible.\n"
-            "• Desconfía de correos que pidan verificar tu contraseña.\n"
-            "¿Quieres ver <b>señales comunes</b> o una <b>definición</b> (p. ej., ingeniería social)?"
-        )
-    if subtema == "2fa":
-        return (
-            "<b>2FA: ¿Por qué te protege?</b>\n"
-            "• Bloquea accesos incluso si adivinan tu contraseña.\n"
-            "• Usa app de autenticación sobre SMS cuando puedas.\n"
-        )
-    if subtema == "adjuntos":
-        return (
-            "<b>Adjuntos seguros</b>\n"
-            "• Desconfía de `.zip`, `.exe`.\n"
-            "• Si no esperabas el archivo, confirma por otro canal.\n"
-        )
-    if subtema == "qr":
-        return (
-            "<b>Códigos QR con cabeza</b>\n"
-            "• Evita escanear QR de correos inesperados.\n"
-            "• Si debes, verifica a qué dominio apunta antes de iniciar sesión.\n"
-        )
-    return tpl_bp_generales()
+    return BP_ESPECIFICAS_TPL.get(subtema, BP_GENERALES_TPL)
 
 
+# Las plantillas con término son funciones puras de sus argumentos: se memoriza el
+# HTML ya compuesto (el término aparece tal cual lo escribió el usuario, así que
+# no se puede precomponer por término clasificado; los términos largos no se memorizan)
+@lru_cache_short_text(maxsize=512)
 def tpl_terminologia(termino: str) -> str:
     termino_norm = termino.strip() if termino else "el término"
     return (
@@ -365,6 +595,7 @@ def tpl_terminologia(termino: str) -> str:
     )
 
 
+@lru_cache_short_text(maxsize=512)
 def tpl_definicion(termino: str, detalle: str = "estandar") -> str:
     # Si no hay término específico, mostrar lista
     if not termino or termino == "phishing":
@@ -398,14 +629,19 @@ def tpl_definicion(termino: str, detalle: str = "estandar") -> str:
     )
 
 
+PUENTE_ANALISIS_TPL = (
+    "<b>Analizar correo sospechoso</b><br>"
+    "Sube el archivo <b>.eml</b> para que nuestro modelo híbrido lo revise.<br><br>"
+    "<button class='chat-upload-btn' style='background-color:#10b981;color:white;border:none;padding:8px 16px;border-radius:4px;cursor:pointer;'>📂 Subir archivo .eml</button>"
+)
+
+
 def tpl_puente_analisis() -> str:
-    return (
-        "<b>Analizar correo sospechoso</b><br>"
-        "Sube el archivo <b>.eml</b> para que nuestro modelo híbrido lo revise.<br><br>"
-        "<button class='chat-upload-btn' style='background-color:#10b981;color:white;border:none;padding:8px 16px;border-radius:4px;cursor:pointer;'>📂 Subir archivo .eml</button>"
-    )
+    return PUENTE_ANALISIS_TPL
 
 
+# Pares de intenciones: conjunto finito, se memoriza el texto completo
+@lru_cache(maxsize=None)
 def tpl_desambiguacion(o1: Intent, o2: Intent) -> str:
     return (
         f"Puedo ayudarte con <b>{_intent_label(o1)}</b> o <b>{_intent_label(o2)}</b>.\n"
@@ -413,16 +649,19 @@ def tpl_desambiguacion(o1: Intent, o2: Intent) -> str:
     )
 
 
+FUERA_DE_AMBITO_TPL = (
+    "🤔 No estoy seguro de haber entendido eso.<br>"
+    "Puedo explicarte sobre <b>phishing</b>, <b>seguridad en correos</b> o <b>analizar mensajes</b>.\n\n"
+    "Prueba con:\n"
+    "• \"¿Qué es el phishing?\"\n"
+    "• \"Señales de alerta\"\n"
+    "• \"Buenas prácticas\"\n"
+    "• \"Analizar correo\""
+)
+
+
 def tpl_fuera_de_ambito() -> str:
-    return (
-        "🤔 No estoy seguro de haber entendido eso.<br>"
-        "Puedo explicarte sobre <b>phishing</b>, <b>seguridad en correos</b> o <b>analizar mensajes</b>.\n\n"
-        "Prueba con:\n"
-        "• \"¿Qué es el phishing?\"\n"
-        "• \"Señales de alerta\"\n"
-        "• \"Buenas prácticas\"\n"
-        "• \"Analizar correo\""
-    )
+    return FUERA_DE_AMBITO_TPL
 
 
 # ========== Contenido pedagógico ==========
@@ -434,327 +673,496 @@ def _intent_label(intent: Intent) -> str:
         Intent.BP_ESPECIFICAS: "buenas prácticas específicas",
         Intent.TERMINOLOGIA: "terminología",
     }
-    return mapping.get(intent, intent.value)
-
+    return mapping.get(intent, intent.label)
+
+
+# Término -> fragmentos que lo identifican dentro del término normalizado.
+# reply_to y return_path se buscan con los guiones convertidos en espacios.
+_TERM_KEYS: Dict[str, Tuple[str, ...]] = {
+    "spf": ("spf",),
+    "dkim": ("dkim",),
+    "dmarc": ("dmarc",),
+    "2fa": ("2fa", "mfa", "autenticacion"),
+    "doble_factor": ("doble factor",),
+    "homograf": ("homograf",),
+    "display_name": ("display name",),
+    "reply_to": ("reply to",),
+    "return_path": ("return path",),
+    "smishing": ("smishing",),
+    "vishing": ("vishing",),
+    "bec": ("bec",),
+    "ingenieria": ("ingenieria",),
+    "phishing": ("phishing",),
+}
+_DEHYPHENATED_KEYS = frozenset({"reply_to", "return_path"})
+
+# Prioridad por tipo de respuesta: gana el primer término presente
+_TERM_FIELD_ORDER: Dict[str, Tuple[str, ...]] = {
+    "breve": ("spf", "dkim", "dmarc", "2fa", "doble_factor", "homograf", "display_name",
+              "reply_to", "return_path", "smishing", "vishing", "bec", "ingenieria", "phishing"),
+    "estandar": ("2fa", "doble_factor", "phishing", "smishing", "vishing", "bec", "ingenieria"),
+    "ejemplo": ("phishing", "2fa", "smishing", "vishing", "bec", "ingenieria"),
+    "como": ("dmarc", "2fa"),
+    "senales": ("homograf", "ingenieria"),
+    "beneficio": ("spf", "dkim", "dmarc", "2fa", "reply_to", "return_path"),
+    "limitacion": ("spf", "dkim", "dmarc", "2fa", "reply_to", "return_path"),
+}
 
-def _def_breve_termino(termino: str) -> str:
-    t = normalize(termino)
-    t_clean = t.replace("-", " ")
-    if "spf" in t:
-        return (
+_TERM_INFO: Dict[str, Dict[str, str]] = {
+    "spf": {
+        "breve": (
             "SPF es un mecanismo que permite a un dominio indicar qué servidores están autorizados para enviar correos en su nombre.\n\n"
             "<b>Para qué sirve:</b>\n"
             "Ayuda a detectar si un mensaje fue enviado desde un servidor legítimo o desde uno no autorizado, lo que permite identificar intentos de suplantación o phishing.\n\n"
             "<b>Recomendación:</b>\n"
             "Si un correo falla SPF o proviene de un servidor no autorizado, trátalo como sospechoso; es una señal común en correos falsificados."
-        )
-    if "dkim" in t:
-        return (
+        ),
+        "beneficio": "Ayuda a los receptores a rechazar orígenes no autorizados.",
+        "limitacion": "No protege bien el reenvío; puede fallar con forwarders si no se ajusta.",
+    },
+    "dkim": {
+        "breve": (
             "DKIM es un método que permite a un servidor de correo firmar digitalmente los mensajes para demostrar que realmente fueron enviados por ese dominio y que no fueron alterados durante el envío\n\n"
             "<b>Ejemplo: </b>"
             "Un correo de empresa.com lleva una firma DKIM que el sistema del destinatario verifica como auténtica. Si al firmar no coincide , el mensaje podría haber sido manipulado o falsificado.\n\n"
             "<b>Recomendación:</b> Antes de confiar en un correo, valida la verificación DKIM; los mensajes sin DKIM o con fallos en la firma pueden ser señales de phishing."
-        )
-    if "dmarc" in t:
-        return (
+        ),
+        "beneficio": "Aporta integridad y autenticidad al contenido del correo.",
+        "limitacion": "Firmas mal configuradas pueden fallar; no evita suplantación por sí sola.",
+    },
+    "dmarc": {
+        "breve": (
             "DMARC es una política que los dominios usan para indicar cómo deben manejarse los correos que no pasan las validaciones de autenticación como SPF o DKIM, ayudando a prevenir suplantaciones.\n\n"
             "<b>Ejemplo: </b>"
             "Si empresa.com configura DMARC con una política de 'reject', cualquier correo que no pase las validaciones SPF o DKIM será rechazado.\n\n"
             "<b>Recomendación:</b> Confía más en correos de dominios que tienen DMARC correctamente configurado; si un mensaje falla DMARC; trátalo como sospechoso de phishing."
-        )
-    if "2fa" in t or "mfa" in t or "doble factor" in t or "autenticacion" in t:
-        return "2FA/MFA añade una verificación adicional (código/app/llave física) además de la contraseña para proteger tu cuenta."
-    if "homograf" in t:
-        return (
+        ),
+        "como": ("DMARC se apoya en SPF y DKIM; define políticas (none/quarantine/reject) y reportes para "
+                 "ayudar a controlar la suplantación de dominio."),
+        "beneficio": "Permite políticas anti-suplantación y visibilidad mediante reportes.",
+        "limitacion": "Requiere SPF/DKIM y alineación correctos; no cubre todos los casos.",
+    },
+    "2fa": {
+        "breve": "2FA/MFA añade una verificación adicional (código/app/llave física) además de la contraseña para proteger tu cuenta.",
+        "estandar": (
+            "La autenticación en dos pasos (2FA) es un método de seguridad que requiere dos formas diferentes de identificación para acceder a una cuenta. "
+            "Normalmente requiere una contraseña y un código de verificación que recibes en tu teléfono o en una app. "
+            "Esto hace mucho más difícil que alguien entre a tus cuentas sin permiso.\n\n"
+            "<b>Recomendación:</b> Activa 2FA en todas tus cuentas, especialmente en cuentas bancarias y de correo."
+        ),
+        "ejemplo": "Inicio de sesión que, además de clave, pide un código de una app autenticadora.",
+        "como": ("Añade un factor 'algo que tienes' (app, token) o 'algo que eres' a 'algo que sabes' (contraseña), "
+                 "bloqueando accesos aunque la clave se filtre."),
+        "beneficio": "Reduce drásticamente el riesgo aunque la contraseña se filtre.",
+        "limitacion": "El phishing puede intentar robar códigos; evita introducirlos en sitios no verificados.",
+    },
+    "homograf": {
+        "breve": (
             "Un ataque homógrafo consiste en crear direcciones o enlaces que parecen idénticos a los legítimos usando caracteres visualmente similares, como letras de otro alfabeto. Esto para engañar al usuario y llevarlo a sitios falsos.\n\n"
             "<b>Ejemplo: </b>"
             "El dominio 'apple.com' puede ser imitado como 'аррle.com' aquí a simple vista lucen iguales, pero en la segunda se usaron algunas letras que provienen del alfabeto cirílico.\n\n"
             "<b>Recomendación:</b> Antes de hacer clic o ingresar datos, revisa cuidadosamente la dirección del enlace; si es posible, escribelo manualmente el sitio o utiliza marcadores oficiales para evitar caer en imitaciones."
-        )
-    if "display name" in t:
-        return ("El <b>display name</b> es el nombre que aparece como remitente cuando recibes un correo, antes de ver la dirección completa."
-        "Sirve para que el destinatario pueda identificar quién envía el mensaje más fácil.\n\n"
-        "<b>Ejemplo: </b> \n"
-        "Si el display name es 'María López - Ventas' y la dirección es mlopez@empresa.com, el destinatario verá:\n"
-        "De: María López - Ventas mlopez@empresa.com\n\n"
-        "<b>Recomendación:</b> No confíes solo en el nombre que aparece como remitente; revisa siempre la dirección de correo completa."
-        )
-    if "reply to" in t_clean:
-        return ( "Reply-To es la dirección de correo a la que se enviarán las respuestas, aunque el mensaje original haya sido enviado desde otra dirección.\n"
-        "Sirve para dirigir las respuestas a una cuenta distinta, por gestión o conveniencia.\n\n"
-        "<b>Ejemplo: </b> \n"
-        "Un correo llega desde notificaciones@servicio.com, pero el reply-to es soporte@servicio.com.\n"
-        "Si respondes, tu mensaje irá a soporte@servicio.com, no a notificaciones@servicio.com.\n\n"
-        "<b>Recomendación:</b> Antes de responder, revisa si el reply-to coincide con la dirección legítima; los atacantes suelen usar direcciones diferentes para desviar respuestas."
-        )
-    if "return path" in t_clean:
-        return ("Return-Path es la dirección a la que se devuelven los correos que no pudieron entregarse (por ejemplo "
-        "cuando la dirección del destinatario no existe). Sirve para gestionar los 'rebotes' y saber qué mensajes fallaron."
-        "<b>Ejemplo: </b> \n"
-        "Un correo se envía desde boletines@empresa.com, pero el return-path es rebotes@empresa.com.\n"
-        "Si el mensaje no llega, el aviso de error se enviará a rebotes@empresa.com.\n\n"
-        "<b>Recomendación:</b> Si notas discrepancias entre el remitente y el return-path, considera el mensaje sospechoso; es una señal frecuente en correos falsificados"
-        )
-    if "smishing" in t:
-        return (
+        ),
+        "senales": "dominios parecidos (app1e), enlaces con letras sustituidas, subdominios engañosos.",
+    },
+    "display_name": {
+        "breve": (
+            "El <b>display name</b> es el nombre que aparece como remitente cuando recibes un correo, antes de ver la dirección completa."
+            "Sirve para que el destinatario pueda identificar quién envía el mensaje más fácil.\n\n"
+            "<b>Ejemplo: </b> \n"
+            "Si el display name es 'María López - Ventas' y la dirección es mlopez@empresa.com, el destinatario verá:\n"
+            "De: María López - Ventas mlopez@empresa.com\n\n"
+            "<b>Recomendación:</b> No confíes solo en el nombre que aparece como remitente; revisa siempre la dirección de correo completa."
+        ),
+    },
+    "reply_to": {
+        "breve": (
+            "Reply-To es la dirección de correo a la que se enviarán las respuestas, aunque el mensaje original haya sido enviado desde otra dirección.\n"
+            "Sirve para dirigir las respuestas a una cuenta distinta, por gestión o conveniencia.\n\n"
+            "<b>Ejemplo: </b> \n"
+            "Un correo llega desde notificaciones@servicio.com, pero el reply-to es soporte@servicio.com.\n"
+            "Si respondes, tu mensaje irá a soporte@servicio.com, no a notificaciones@servicio.com.\n\n"
+            "<b>Recomendación:</b> Antes de responder, revisa si el reply-to coincide con la dirección legítima; los atacantes suelen usar direcciones diferentes para desviar respuestas."
+        ),
+        "beneficio": "Permite dirigir respuestas a una bandeja controlada (soporte, ticketing) sin exponer la cuenta principal.",
+        "limitacion": "Puede apuntar a un actor distinto al remitente real; siempre verifica el dominio antes de responder.",
+    },
+    "return_path": {
+        "breve": (
+            "Return-Path es la dirección a la que se devuelven los correos que no pudieron entregarse (por ejemplo "
+            "cuando la dirección del destinatario no existe). Sirve para gestionar los 'rebotes' y saber qué mensajes fallaron."
+            "<b>Ejemplo: </b> \n"
+            "Un correo se envía desde boletines@empresa.com, pero el return-path es rebotes@empresa.com.\n"
+            "Si el mensaje no llega, el aviso de error se enviará a rebotes@empresa.com.\n\n"
+            "<b>Recomendación:</b> Si notas discrepancias entre el remitente y el return-path, considera el mensaje sospechoso; es una señal frecuente en correos falsificados"
+        ),
+        "beneficio": "Facilita gestionar rebotes y verificar qué dominio controla realmente el envío.",
+        "limitacion": "Los atacantes pueden definir un Return-Path propio aunque el From parezca legítimo.",
+    },
+    "smishing": {
+        "breve": (
             "El smishing es una variante del phishing en el que los atacantes envían mensajes de texto (SMS) para engañarte y hacer que entregues datos personales, claves o dinero.\n\n"
             "<b>Ejemplo: </b> \n"
             '"Tu banco ha bloqueado tu tarjeta. Verifica tu identidad en este enlace: http://seguridad-banco-123.com”\n\n'
             "<b>Recomendación:</b> No abras enlaces ni compartas datos desde SMS inesperados; verifica siempre directamente con la entidad u organización usando canales o medios oficiales."
-        )
-    if "vishing" in t:
-        return (
+        ),
+        "ejemplo": 'SMS: "Paquete retenido, paga tarifas aquí: bit.ly/..."',
+    },
+    "vishing": {
+        "breve": (
             "El vishing es una variante del phishing en el que los atacantes usan llamadas telefónicas para hacerse pasar por una entidad confiable y obtener información personal, claves o pagos.\n\n"
             "<b>Ejemplo: </b> \n"
             '"Le llamamos del departamento de seguridad de su banco. Necesitamos que nos confirme el código que acaba de recibir para evitar un bloqueo"\n\n'
             "<b>Recomendación:</b> No compartas información sensible por teléfono; si sospechas, cuelga y contacta tú mismo a la entidad usando números oficiales."
-        )
-    if "bec" in t:
-        return "Business Email Compromise: suplantación/manejo de hilos para desviar pagos o robar info."
-    if "ingenieria" in t:
-        return "Ingeniería social: manipulación psicológica para influir en decisiones y obtener información o acción."
-    if "phishing" in t:
-        return "Intento de obtener datos o dinero mediante engaño por correo haciéndose pasar por otro."
-    return (
-        "Los encabezados de un correo son la información técnica que muestra de dónde salió realmente un mensaje, por dónde pasó y cómo fue autenticado."
-    )
-
-
-def _def_estandar_termino(termino: str) -> str:
-    t = normalize(termino)
-    if "2fa" in t or "mfa" in t or "doble factor" in t or "autenticacion" in t:
-        return (
-            "La autenticación en dos pasos (2FA) es un método de seguridad que requiere dos formas diferentes de identificación para acceder a una cuenta. "
-            "Normalmente requiere una contraseña y un código de verificación que recibes en tu teléfono o en una app. "
-            "Esto hace mucho más difícil que alguien entre a tus cuentas sin permiso.\n\n"
-            "<b>Recomendación:</b> Activa 2FA en todas tus cuentas, especialmente en cuentas bancarias y de correo."
-        )
-    if "phishing" in t:
-        return (
-            "El <b>phishing</b> es un tipo de engaño en el que un atacante se hace pasar por una entidad confiable para que la víctima entregue información personal, "
-            "contraseñas o datos financieros, normalmente a través de correos electrónicos, mensajes o sitios falsos.\n\n"
-            "<b>Ejemplo: </b> \n"
-            '"Actualiza tu cuenta bancaria haciendo clic aquí: http://seguridad-banco-123.com”\n\n'
-            "<b>Recomendación:</b> No hagas clic en enlaces inesperados ni entregues datos sensibles; verifica siempre la dirección del sitio y contacta a la entidad por canales oficiales antes de actuar."
-        )
-    if "smishing" in t:
-        return (
-            "El smishing es una variante del phishing en el que los atacantes envían mensajes de texto (SMS) para engañarte y hacer que entregues datos personales, claves o dinero.\n\n"
-            "<b>Ejemplo: </b> \n"
-            '"Tu banco ha bloqueado tu tarjeta. Verifica tu identidad en este enlace: http://seguridad-banco-123.com”\n\n'
-            "<b>Recomendación:</b> No abras enlaces ni compartas datos desde SMS inesperados; verifica siempre directamente con la entidad u organización usando canales o medios oficiales."
-        )
-    if "vishing" in t:
-        return (
+        ),
+        "estandar": (
             "El vishing es una variante del phishing en el que los atacantes usan llamadas telefónicas para hacerse pasar por una entidad confiable y obtener información personal, claves o pagos.\n\n"
             "<b>Ejemplo: </b> \n"
             '"Le llamamos del departamento de seguridad de su banco. Necesitamos que nos confirme el código que acaba de recibir para evitar un bloqueo"\n\n'
             "<b>Recomendación:</b> No compartas información sensible por teléfono, si sospechas cuelga y contacta tú mismo a la entidad usando números oficiales."
-        )   
-    if "bec" in t:
-        return (
+        ),
+        "ejemplo": "Llamada 'del banco' pidiendo códigos de un solo uso para 'verificar identidad'.",
+    },
+    "bec": {
+        "breve": "Business Email Compromise: suplantación/manejo de hilos para desviar pagos o robar info.",
+        "estandar": (
             "BEC (Business Email Comromise) es un tipo de phishing empresarial que se hace pasar por una persona de confianza.\n"
             "<b>Ejemplo: </b>"
             "Un jefe o un proveedor que pide cambios urgentes en una cuenta bancaria.\n"
             "Consiste en engañar a la víctima y lograr que envíe dinero o información sensible. Es una estafa basada en la suplantación y el engaño, no en romper sistemas técnicos.\n\n"
             "<b>Recomendación:</b> Desconfía de solicitudes de pagos o cambios urgentes hechas por correo; verifica siempre por otro canal o antes de actuar."
-            )
-    if "ingenieria" in t:
-        return (
+        ),
+        "ejemplo": "Correo 'del CFO' solicitando cambio urgente de cuenta bancaria para un pago.",
+    },
+    "ingenieria": {
+        "breve": "Ingeniería social: manipulación psicológica para influir en decisiones y obtener información o acción.",
+        "estandar": (
             "La ingenería social es una técnica de manipulación en la que un atacante aprovecha la confianza o el descuido de una persona para obtener información sensible, acceso o hacer que realice una acción perjudicial.\n\n"
             "<b>Ejemplo: </b>"
             "Alguien se hace pasar por soporte técnico y pide tu contraseña 'para arreglar un problema urgente'.\n\n"
             "<b>Recomendación:</b> Verifica siempre la identidad de quien solicita información o acceso; no compartas datos sensibles sin confirmar por canales o medios oficiales."
-        )
-    return _def_breve_termino(termino)
+        ),
+        "ejemplo": "Correo urgente de 'IT' solicitando cambiar contraseña por enlace sospechoso.",
+        "senales": "urgencia excesiva, solicitudes inusuales, apelar a autoridad o miedo.",
+    },
+    "phishing": {
+        "breve": "Intento de obtener datos o dinero mediante engaño por correo haciéndose pasar por otro.",
+        "estandar": (
+            "El <b>phishing</b> es un tipo de engaño en el que un atacante se hace pasar por una entidad confiable para que la víctima entregue información personal, "
+            "contraseñas o datos financieros, normalmente a través de correos electrónicos, mensajes o sitios falsos.\n\n"
+            "<b>Ejemplo: </b> \n"
+            '"Actualiza tu cuenta bancaria haciendo clic aquí: http://seguridad-banco-123.com”\n\n'
+            "<b>Recomendación:</b> No hagas clic en enlaces inesperados ni entregues datos sensibles; verifica siempre la dirección del sitio y contacta a la entidad por canales oficiales antes de actuar."
+        ),
+        "ejemplo": "Correo de 'Soporte' que pide 'verificar tu contraseña' en un enlace no oficial.",
+    },
+}
+_TERM_INFO["smishing"]["estandar"] = _TERM_INFO["smishing"]["breve"]
+# "doble factor" comparte textos con 2fa, pero solo en la definición breve y estándar
+_TERM_INFO["doble_factor"] = {k: _TERM_INFO["2fa"][k] for k in ("breve", "estandar")}
 
 
-def _ejemplo_breve_termino(termino: str) -> str:
+@lru_cache_short_text(maxsize=256)
+def _term_keys(termino: str) -> frozenset:
+    """Normaliza el término una vez y devuelve las claves de _TERM_KEYS presentes."""
     t = normalize(termino)
-    if "phishing" in t:
-        return "Correo de 'Soporte' que pide 'verificar tu contraseña' en un enlace no oficial."
-    if "2fa" in t or "mfa" in t or "autenticacion" in t:
-        return "Inicio de sesión que, además de clave, pide un código de una app autenticadora."
-    if "smishing" in t:
-        return "SMS: "
-        Paquete
-        retenido, paga
-        tarifas
-        aquí: bit.ly / ...
-        "."
-    if "vishing" in t:
-        return "Llamada 'del banco' pidiendo códigos de un solo uso para 'verificar identidad'."
-    if "bec" in t:
-        return "Correo 'del CFO' solicitando cambio urgente de cuenta bancaria para un pago."
-    if "ingenieria" in t:
-        return "Correo urgente de 'IT' solicitando cambiar contraseña por enlace sospechoso."
-    return "Mensaje que pide acción urgente y enlaza a un dominio que no coincide con la marca."
+    t_clean = t.replace("-", " ")
+    return frozenset(
+        key for key, needles in _TERM_KEYS.items()
+        if any(n in (t_clean if key in _DEHYPHENATED_KEYS else t) for n in needles)
+    )
+
+
+# Textos por defecto cuando ningún término conocido aparece
+_FIELD_DEFAULTS: Dict[str, str] = {
+    "breve": "Los encabezados de un correo son la información técnica que muestra de dónde salió realmente un mensaje, por dónde pasó y cómo fue autenticado.",
+    "ejemplo": "Mensaje que pide acción urgente y enlaza a un dominio que no coincide con la marca.",
+    "senales": "urgencia, enlaces no coincidentes, remitente dudoso, petición de datos.",
+    "beneficio": "Mejora la comprensión y la detección de señales de phishing.",
+    "limitacion": "Ningún control es perfecto; combina medidas técnicas y educación.",
+}
+
+
+def _materialize_fields(keys: frozenset) -> Dict[str, str]:
+    """Resuelve todos los campos (prioridad y respaldos) para un conjunto de claves."""
+    fields = {
+        field: next((_TERM_INFO[k][field] for k in order if k in keys), None)
+        for field, order in _TERM_FIELD_ORDER.items()
+    }
+    fields["breve"] = fields["breve"] or _FIELD_DEFAULTS["breve"]
+    fields["estandar"] = fields["estandar"] or fields["breve"]
+    fields["como"] = fields["como"] or fields["estandar"]
+    for field in ("ejemplo", "senales", "beneficio", "limitacion"):
+        fields[field] = fields[field] or _FIELD_DEFAULTS[field]
+    return fields
+
+
+# Tablas ya resueltas para cada término canónico (y para ninguno), generadas al importar;
+# las combinaciones de varios términos se resuelven bajo demanda
+_FIELDS_BY_KEYS: Dict[frozenset, Dict[str, str]] = {
+    keys: _materialize_fields(keys)
+    for keys in (frozenset(), *(frozenset((k,)) for k in _TERM_KEYS))
+}
+
+
+@lru_cache_short_text(maxsize=256)
+def _term_fields(termino: str) -> Dict[str, str]:
+    keys = _term_keys(termino)
+    return _FIELDS_BY_KEYS.get(keys) or _materialize_fields(keys)
+
+
+def _def_breve_termino(termino: str) -> str:
+    return _term_fields(termino)["breve"]
+
+
+def _def_estandar_termino(termino: str) -> str:
+    return _term_fields(termino)["estandar"]
+
+
+def _ejemplo_breve_termino(termino: str) -> str:
+    return _term_fields(termino)["ejemplo"]
 
 
 def _como_funciona_termino(termino: str) -> str:
-    t = normalize(termino)
-    if "dmarc" in t:
-        return ("DMARC se apoya en SPF y DKIM; define políticas (none/quarantine/reject) y reportes para "
-                "ayudar a controlar la suplantación de dominio.")
-    if "2fa" in t or "mfa" in t or "autenticacion" in t:
-        return ("Añade un factor 'algo que tienes' (app, token) o 'algo que eres' a 'algo que sabes' (contraseña), "
-                "bloqueando accesos aunque la clave se filtre.")
-    return _def_estandar_termino(termino)
+    return _term_fields(termino)["como"]
 
 
 def _senales_termino(termino: str) -> str:
-    t = normalize(termino)
-    if "homograf" in t:
-        return "dominios parecidos (app1e), enlaces con letras sustituidas, subdominios engañosos."
-    if "ingenieria" in t:
-        return "urgencia excesiva, solicitudes inusuales, apelar a autoridad o miedo."
-    return "urgencia, enlaces no coincidentes, remitente dudoso, petición de datos."
+    return _term_fields(termino)["senales"]
 
 
 def _beneficio_termino(termino: str) -> str:
-    t = normalize(termino)
-    t_clean = t.replace("-", " ")
-    if "spf" in t:
-        return "Ayuda a los receptores a rechazar orígenes no autorizados."
-    if "dkim" in t:
-        return "Aporta integridad y autenticidad al contenido del correo."
-    if "dmarc" in t:
-        return "Permite políticas anti-suplantación y visibilidad mediante reportes."
-    if "2fa" in t or "mfa" in t or "autenticacion" in t:
-        return "Reduce drásticamente el riesgo aunque la contraseña se filtre."
-    if "reply to" in t_clean:
-        return "Permite dirigir respuestas a una bandeja controlada (soporte, ticketing) sin exponer la cuenta principal."
-    if "return path" in t_clean:
-        return "Facilita gestionar rebotes y verificar qué dominio controla realmente el envío."
-    return "Mejora la comprensión y la detección de señales de phishing."
+    return _term_fields(termino)["beneficio"]
 
 
 def _limitacion_termino(termino: str) -> str:
-    t = normalize(termino)
-    t_clean = t.replace("-", " ")
-    if "spf" in t:
-        return "No protege bien el reenvío; puede fallar con forwarders si no se ajusta."
-    if "dkim" in t:
-        return "Firmas mal configuradas pueden fallar; no evita suplantación por sí sola."
-    if "dmarc" in t:
-        return "Requiere SPF/DKIM y alineación correctos; no cubre todos los casos."
-    if "2fa" in t or "mfa" in t or "autenticacion" in t:
-        return "El phishing puede intentar robar códigos; evita introducirlos en sitios no verificados."
-    if "reply to" in t_clean:
-        return "Puede apuntar a un actor distinto al remitente real; siempre verifica el dominio antes de responder."
-    if "return path" in t_clean:
-        return "Los atacantes pueden definir un Return-Path propio aunque el From parezca legítimo."
-    return "Ningún control es perfecto; combina medidas técnicas y educación."
+    return _term_fields(termino)["limitacion"]
 
 
 # ========== FSM mínima ==========
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DialogueContext:
     state: State = State.INICIO
     ultimo_tema: Optional[str] = None
     preferencia_formato: str = "estandar"
 
 
+@lru_cache_short_text(maxsize=256)
+def _context_for(state: State, ultimo_tema: Optional[str] = None) -> DialogueContext:
+    # Inmutable: un único contexto por transición, compartido entre turnos y sesiones
+    return DialogueContext(state=state, ultimo_tema=ultimo_tema)
+
+
 def next_response(user_text: str, ctx: DialogueContext) -> Tuple[str, DialogueContext]:
-    nlu = nlu_detect(user_text)
+    """
+    Devuelve (respuesta, contexto). Si el turno no cambia el contexto se devuelve
+    el mismo objeto; si no, el contexto (inmutable) de la transición.
+    """
+    text = normalize(user_text)
+    quick = QUICK_REPLIES.get(text)
+    reply, move = quick if quick is not None else _resolve(text, ctx.ultimo_tema)
+    if move is None:
+        return reply, ctx
+    return reply, _context_for(*move)
 
-    if nlu.intent == Intent.DESPEDIDA:
-        return tpl_despedida(), DialogueContext(state=State.FINALIZADO)
 
-    if nlu.intent == Intent.ANALISIS_PETICION:
-        return tpl_puente_analisis(), ctx
+# Transición: None deja el contexto como está; si no, (estado, último tema)
+_Move = Optional[Tuple[State, Optional[str]]]
 
-    if nlu.alt and nlu.intent not in (Intent.SALUDO_MENU,):
-        return tpl_desambiguacion(nlu.intent, nlu.alt[0]), DialogueContext(state=State.DESAMBIG)
 
-    if nlu.intent == Intent.SALUDO_MENU:
-        return tpl_saludo_menu(), DialogueContext(state=State.MENU_EDU)
+def _h_despedida(nlu: NLUResult, text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    return tpl_despedida(), (State.FINALIZADO, None)
 
-    if nlu.intent == Intent.SENALES:
-        return tpl_senales_comunes(), DialogueContext(state=State.MENU_EDU, ultimo_tema="senales")
 
-    if nlu.intent == Intent.BP_GENERALES:
-        return tpl_bp_generales(), DialogueContext(state=State.CHECKLIST, ultimo_tema="bp_generales")
+def _h_analisis(nlu: NLUResult, text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    return tpl_puente_analisis(), None
 
-    if nlu.intent == Intent.BP_ESPECIFICAS:
-        sub = nlu.slots.get("subtema", "enlaces")
-        return tpl_bp_especificas(sub), DialogueContext(state=State.CHECKLIST, ultimo_tema=f"bp_{sub}")
 
-    if nlu.intent == Intent.TERMINOLOGIA:
-        term = _guess_term_from_text(user_text)
-        return tpl_terminologia(term), DialogueContext(state=State.EXPLICACION, ultimo_tema=term)
+def _h_saludo_menu(nlu: NLUResult, text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    return tpl_saludo_menu(), (State.MENU_EDU, None)
 
-    if nlu.intent == Intent.DEFINICION:
-        # Si no hay slots, intentamos adivinar. Si no hay nada claro, pasamos None para mostrar lista.
-        term = nlu.slots.get("term") or nlu.slots.get("term2")
-        if not term:
-            # Si el usuario dijo "definicion" a secas, term es None -> lista
-            # Si dijo "que es phishing", term es "phishing"
-            guessed = _guess_term_from_text(user_text)
-            # Hack: si _guess devuelve "phishing" (default) pero el usuario NO escribió phishing,
-            # asumimos que quiere la lista general.
-            if "phishing" not in normalize(user_text) and guessed == "phishing":
-                term = None
-            else:
-                term = guessed
 
-        return tpl_definicion(term, "estandar"), DialogueContext(state=State.EXPLICACION, ultimo_tema=term)
+def _h_senales(nlu: NLUResult, text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    return tpl_senales_comunes(), (State.MENU_EDU, "senales")
 
-    # Manejo de continuación / contexto simple
-    if count_hits(normalize(user_text), CONTINUE_KEYWORDS) > 0 and ctx.ultimo_tema:
-        # Si pide más info y tenemos un tema previo
-        if ctx.ultimo_tema.startswith("bp_"):
-            return tpl_bp_generales(), ctx
-        return tpl_definicion(ctx.ultimo_tema, "detalle"), ctx
 
-    return tpl_fuera_de_ambito(), DialogueContext(state=State.MENU_EDU)
+def _h_bp_generales(nlu: NLUResult, text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    return tpl_bp_generales(), (State.CHECKLIST, "bp_generales")
+
+
+def _h_bp_especificas(nlu: NLUResult, text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    sub = nlu.slots.get("subtema", "enlaces")
+    return tpl_bp_especificas(sub), (State.CHECKLIST, f"bp_{sub}")
+
+
+def _h_terminologia(nlu: NLUResult, text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    term = nlu.slots.get("matched_term") or _guess_term_from_text(text, norm=text)
+    return tpl_terminologia(term), (State.EXPLICACION, term)
+
 
+def _h_definicion(nlu: NLUResult, text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    # Si no hay slots, intentamos adivinar. Si no hay nada claro, pasamos None para mostrar lista.
+    term = nlu.slots.get("term") or nlu.slots.get("term2")
+    if not term:
+        # Si el usuario dijo "definicion" a secas, term es None -> lista
+        # Si dijo "que es phishing", term es "phishing"
+        guessed = nlu.slots.get("matched_term") or _guess_term_from_text(text, norm=text)
+        # Hack: si _guess devuelve "phishing" (default) pero el usuario NO escribió phishing,
+        # asumimos que quiere la lista general.
+        if guessed == "phishing" and "phishing" not in text:
+            term = None
+        else:
+            term = guessed
 
-def _guess_term_from_text(text: str) -> str:
-    t = normalize(text)
-    for term in (TERMINOLOGIA_TERMS + CONCEPT_KEYWORDS):
-        if term in t:
-            return term
-    tokens = [w for w in re.findall(r"[a-z0-9\-\._]+", t) if len(w) > 2]
-    return tokens[-1] if tokens else "phishing"
+    return tpl_definicion(term, "estandar"), (State.EXPLICACION, term)
+
+
+def _h_otro(nlu: NLUResult, text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    # Manejo de continuación / contexto simple
+    if ultimo_tema and CONTINUE_RE.search(text):
+        # Si pide más info y tenemos un tema previo
+        if ultimo_tema.startswith("bp_"):
+            return tpl_bp_generales(), None
+        return tpl_definicion(ultimo_tema, "detalle"), None
+
+    return tpl_fuera_de_ambito(), (State.MENU_EDU, None)
+
+
+# Intención -> manejador; las que no están (FUERA, DESAMBIG) van a _h_otro
+_INTENT_HANDLERS: Dict[Intent, Callable[[NLUResult, str, Optional[str]], Tuple[str, _Move]]] = {
+    Intent.DESPEDIDA: _h_despedida,
+    Intent.ANALISIS_PETICION: _h_analisis,
+    Intent.SALUDO_MENU: _h_saludo_menu,
+    Intent.SENALES: _h_senales,
+    Intent.BP_GENERALES: _h_bp_generales,
+    Intent.BP_ESPECIFICAS: _h_bp_especificas,
+    Intent.TERMINOLOGIA: _h_terminologia,
+    Intent.DEFINICION: _h_definicion,
+}
+# Intenciones que se responden aunque haya una alternativa cercana
+_NO_DISAMBIG = frozenset({Intent.DESPEDIDA, Intent.ANALISIS_PETICION, Intent.SALUDO_MENU})
+
+
+@lru_cache_short_text(maxsize=128)
+def _resolve(text: str, ultimo_tema: Optional[str]) -> Tuple[str, _Move]:
+    """
+    Respuesta y transición para un texto ya normalizado. Solo depende del texto y
+    del último tema (el estado no cambia la respuesta), así que los mensajes
+    repetidos ("hola", "definiciones", "salir"...) salen de la caché.
+    """
+    # Los manejadores solo leen los slots: no hace falta la copia de nlu_detect
+    nlu = _nlu_detect_cached(text)
+    if nlu.alt and nlu.intent not in _NO_DISAMBIG:
+        return tpl_desambiguacion(nlu.intent, nlu.alt[0]), (State.DESAMBIG, None)
+    return _INTENT_HANDLERS.get(nlu.intent, _h_otro)(nlu, text, ultimo_tema)
+
+
+def _find_definable_term(t_norm: str) -> Optional[str]:
+    """Primer término de DEFINABLE_TERMS contenido en el texto ya normalizado."""
+    if TERMS_AUTOMATON is not None:
+        # Una pasada encuentra todas las apariciones; gana la de menor prioridad
+        best = min(TERMS_AUTOMATON.iter(t_norm), key=lambda m: m[1][0], default=None)
+        return best[1][1] if best else None
+    # Desde cada posición se baja por el trie; el coste no depende del tamaño del vocabulario
+    best = None
+    n = len(t_norm)
+    for i in range(n):
+        node = TERMS_TRIE
+        for j in range(i, n):
+            node = node.get(t_norm[j])
+            if node is None:
+                break
+            hit = node.get("")
+            if hit is not None and (best is None or hit < best):
+                best = hit
+    return best[1] if best else None
+
+
+def _guess_term_from_text(text: str, norm: Optional[str] = None) -> str:
+    # norm: el texto ya normalizado, si el llamador lo tiene
+    t = norm if norm is not None else normalize(text)
+    # Vía rápida: mensajes cortos habituales con el término ya adivinado
+    guess = EXACT_GUESS.get(t)
+    if guess is not None:
+        return guess
+    return _guess_term_norm(t)
+
+
+def _guess_term_norm(t: str) -> str:
+    term = _find_definable_term(t)
+    if term:
+        return term
+    # Solo interesa el último token de más de 2 caracteres: se recorre desde el final
+    return next((w for w in reversed(TOKEN_RE.findall(t)) if len(w) > 2), "phishing")
+
+
+# Lista curada de conceptos para mostrar al usuario (sin duplicados/sinónimos)
+# Formato: "Término a mostrar" (que el usuario puede escribir)
+DEFINITIONS_DISPLAY_TERMS: Tuple[str, ...] = (
+    "Phishing",
+    "Smishing",
+    "Vishing",
+    "Ingeniería Social",
+    "BEC (Business Email Compromise)",
+    "2FA / MFA",
+    "SPF",
+    "DKIM",
+    "DMARC",
+    "Return-Path",
+    "Reply-To",
+    "Display Name",
+    "Homógrafos",
+    "Cabeceras",
+)
+
+# La lista no cambia: el HTML se arma una sola vez al importar
+DEFINITIONS_HTML = (
+    "<b>📚 Definiciones y conceptos útiles:</b><br><ul>"
+    + "".join(f"<li>{t}</li>" for t in sorted(DEFINITIONS_DISPLAY_TERMS))
+    + "</ul><br><i>Escribe 'que es [término]' para ver detalles.</i>"
+)
 
 
 def _get_all_definitions() -> str:
-    # Lista curada de conceptos para mostrar al usuario (sin duplicados/sinónimos)
-    # Formato: "Término a mostrar" (que el usuario puede escribir)
-    display_terms = [
-        "Phishing",
-        "Smishing",
-        "Vishing",
-        "Ingeniería Social",
-        "BEC (Business Email Compromise)",
-        "2FA / MFA",
-        "SPF",
-        "DKIM",
-        "DMARC",
-        "Return-Path",
-        "Reply-To",
-        "Display Name",
-        "Homógrafos",
-        "Cabeceras"
-    ]
-    
-    html = "<b>📚 Definiciones y conceptos útiles:</b><br><ul>"
-    for t in sorted(display_terms):
-        # Usamos el primer término para el ejemplo de comando si es compuesto
-        cmd_term = t.split("/")[0].split("(")[0].strip().lower()
-        html += f"<li>{t}</li>"
-    html += "</ul><br><i>Escribe 'que es [término]' para ver detalles.</i>"
-    return html
+    return DEFINITIONS_HTML
+
+
+# Resultados precalculados (con el mismo pipeline) para los mensajes cortos más
+# habituales, indexados por texto normalizado
+EXACT_UTTERANCES: Tuple[str, ...] = tuple(dict.fromkeys(
+    SALUDO_KEYWORDS + DESPEDIDA_KEYWORDS + CONCEPT_KEYWORDS + TERMINOLOGIA_TERMS
+    + ["definicion", "definiciones", "conceptos", "senales", "consejos", "buenas practicas", "si", "no", "ok", "gracias"]
+))
+EXACT_INTENT: Dict[str, NLUResult] = {u: _nlu_pipeline(normalize(u)) for u in EXACT_UTTERANCES}
+EXACT_GUESS: Dict[str, str] = {
+    t: _guess_term_norm(t) for t in map(normalize, EXACT_UTTERANCES + DEFINABLE_TERMS)
+}
+# Respuesta y transición de esos mismos mensajes cuando no dependen del último tema
+# (todo salvo lo que cae en _h_otro): next_response los sirve sin pasar por _resolve
+QUICK_REPLIES: Dict[str, Tuple[str, _Move]] = {
+    u: _resolve(u, None) for u, r in EXACT_INTENT.items()
+    if (r.alt and r.intent not in _NO_DISAMBIG) or r.intent in _INTENT_HANDLERS
+}
 
 
 # ========== Demo CLI ==========
 if __name__ == "__main__":
+    import sys
+
     print("ChatBot educativo (reglas) — escribe 'salir' para terminar.\n")
+    # Con stdin redirigido (transcripciones en lote) se leen líneas del buffer sin prompt
+    if sys.stdin.isatty():
+        read_line = lambda: input("Tú: ")
+    else:
+        def read_line() -> str:
+            line = sys.stdin.buffer.readline()
+            if not line:
+                raise EOFError
+            return line.decode("utf-8", errors="replace")
     ctx = DialogueContext()
     while True:
         try:
-            user = input("Tú: ").strip()
+            user = read_line().strip()
         except (EOFError, KeyboardInterrupt):
             print("\nHasta luego.")
             break
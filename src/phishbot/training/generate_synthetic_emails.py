@@ -3,672 +3,799 @@ Generador de correos electrónicos sintéticos en español para entrenamiento de
 Crea correos de phishing y legítimos con alta diversidad y realismo.
 """
 
+import numpy as np
 import pandas as pd
 import random
 import argparse
+import csv
+import gzip
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from itertools import chain, product
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Callable, Iterator, List, Dict, Tuple, Union
 import logging
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
 
-class SyntheticEmailGenerator:
-    """Generador de correos electrónicos sintéticos."""
-
-    def __init__(self, seed: int = 42):
-        """
-        Inicializar el generador.
-
-        Args:
-            seed: Semilla para reproducibilidad
-        """
-        random.seed(seed)
-
-        # Configurar logging
-        logging.basicConfig(level=logging.INFO)
-        self.logger = logging.getLogger(__name__)
-
-        # Dominios ficticios para phishing (sospechosos)
-        self.phishing_domains = [
-            'mi-banco-seguro.test',
-            'verificacion-cuenta.test',
-            'seguridad-bancaria.test',
-            'actualizar-datos.test',
-            'premio-ganador.test',
-            'ofertas-exclusivas.test',
-            'alerta-seguridad.test',
-            'confirmar-identidad.test',
-            'reembolso-fiscal.test',
-            'sorteo-oficial.test',
-            'banco-virtual.test',
-            'pago-pendiente.test',
-            'cuenta-bloqueada.test',
-            'verificar-ahora.test',
-            'soporte-tecnico.test'
-        ]
-
-        # Dominios ficticios legítimos
-        self.legitimate_domains = [
-            'mi-empresa.test',
-            'universidad-ejemplo.test',
-            'tienda-online.test',
-            'newsletter-tech.test',
-            'correo-personal.test',
-            'oficina-virtual.test',
-            'equipo-proyecto.test',
-            'comunidad-usuarios.test',
-            'plataforma-cursos.test',
-            'servicio-cliente.test',
-            'empresa-ejemplo.test',
-            'corporativo-test.test',
-            'organizacion-demo.test',
-            'compania-ficticia.test',
-            'proveedor-ejemplo.test'
-        ]
-
-        # Nombres ficticios
-        self.nombres = [
-            'Carlos', 'María', 'Juan', 'Ana', 'Pedro', 'Laura', 'Miguel', 'Carmen',
-            'José', 'Isabel', 'Antonio', 'Rosa', 'Francisco', 'Marta', 'Luis', 'Elena',
-            'Javier', 'Patricia', 'Manuel', 'Lucía', 'David', 'Sara', 'Jorge', 'Paula'
-        ]
-
-        self.apellidos = [
-            'García', 'Rodríguez', 'Martínez', 'López', 'González', 'Pérez', 'Sánchez',
-            'Ramírez', 'Torres', 'Flores', 'Rivera', 'Gómez', 'Díaz', 'Cruz', 'Morales',
-            'Reyes', 'Ortiz', 'Gutiérrez', 'Chávez', 'Ruiz', 'Hernández', 'Jiménez'
-        ]
-
-        # Montos comunes
-        self.montos = [
-            '50', '100', '250', '500', '1,000', '2,500', '5,000',
-            '10,000', '25,000', '50,000', '100,000'
-        ]
-
-        # Números de orden/cuenta/referencia
-        self.generate_random_numbers()
-
-    def generate_random_numbers(self):
-        """Generar números aleatorios para usar en correos."""
-        self.numeros_orden = [f"{random.randint(100000, 999999)}" for _ in range(100)]
-        self.numeros_cuenta = [f"****{random.randint(1000, 9999)}" for _ in range(50)]
-        self.numeros_referencia = [f"REF-{random.randint(10000, 99999)}" for _ in range(100)]
-
-    def get_random_name(self) -> str:
-        """Obtener nombre completo aleatorio."""
-        return f"{random.choice(self.nombres)} {random.choice(self.apellidos)}"
-
-    def get_random_email(self, domain: str) -> str:
-        """Generar email aleatorio con dominio dado."""
-        prefixes = ['soporte', 'info', 'contacto', 'admin', 'noreply',
-                    'servicio', 'ayuda', 'notificaciones', 'alertas', 'equipo']
-        return f"{random.choice(prefixes)}@{domain}"
-
-    def add_typos(self, text: str, probability: float = 0.15) -> str:
-        """
-        Añadir errores ortográficos ocasionales.
-
-        Args:
-            text: Texto original
-            probability: Probabilidad de error por palabra
-
-        Returns:
-            Texto con posibles errores
-        """
-        if random.random() > 0.3:  # Solo 30% de correos tendrán errores
-            return text
-
-        # Errores comunes en español
-        replacements = {
-            'verificar': 'berificar',
-            'cuenta': 'quenta',
-            'banco': 'vanco',
-            'hacer': 'acer',
-            'haber': 'aver',
-            'hola': 'ola',
-            'urgente': 'urjente',
-            'inmediatamente': 'inmediatamnte',
-            'confirmación': 'confirmacion',
-            'transacción': 'transaccion',
-            'información': 'informacion',
-            'atención': 'atencion',
-        }
-
-        words = text.split()
-        for i, word in enumerate(words):
-            if random.random() < probability:
-                word_lower = word.lower()
-                for original, typo in replacements.items():
-                    if original in word_lower:
-                        words[i] = word.replace(original, typo)
-                        break
-
-        return ' '.join(words)
-
-    def generate_phishing_email(self) -> Dict[str, str]:
-        """Generar un correo de phishing sintético."""
-
-        # Seleccionar tipo de phishing
-        phishing_type = random.choice([
-            'password_reset',
-            'fake_payment',
-            'security_alert',
-            'prize_winner',
-            'account_suspended',
-            'urgent_action',
-            'fake_invoice',
-            'tax_refund',
-            'delivery_problem',
-            'too_good_offer'
-        ])
-
-        domain = random.choice(self.phishing_domains)
-        sender = self.get_random_email(domain)
-
-        # Generar contenido según tipo
-        if phishing_type == 'password_reset':
-            subject, body = self._generate_password_reset_phishing()
-        elif phishing_type == 'fake_payment':
-            subject, body = self._generate_fake_payment_phishing()
-        elif phishing_type == 'security_alert':
-            subject, body = self._generate_security_alert_phishing()
-        elif phishing_type == 'prize_winner':
-            subject, body = self._generate_prize_winner_phishing()
-        elif phishing_type == 'account_suspended':
-            subject, body = self._generate_account_suspended_phishing()
-        elif phishing_type == 'urgent_action':
-            subject, body = self._generate_urgent_action_phishing()
-        elif phishing_type == 'fake_invoice':
-            subject, body = self._generate_fake_invoice_phishing()
-        elif phishing_type == 'tax_refund':
-            subject, body = self._generate_tax_refund_phishing()
-        elif phishing_type == 'delivery_problem':
-            subject, body = self._generate_delivery_problem_phishing()
-        else:  # too_good_offer
-            subject, body = self._generate_too_good_offer_phishing()
-
-        # Decidir si añadir errores ortográficos
-        if random.random() < 0.4:  # 40% con errores
-            subject = self.add_typos(subject)
-            body = self.add_typos(body)
-
-        # Crear email completo
-        full_text = f"{subject}\n\n{body}"
-
-        return {
-            'text': full_text,
-            'subject': subject,
-            'body': body,
-            'from': sender,
-            'label': 'phishing',
-            'type': phishing_type
-        }
-
-    def _generate_password_reset_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de restablecimiento de contraseña."""
-        subjects = [
-            "URGENTE: Restablece tu contraseña ahora",
-            "Solicitud de cambio de contraseña - Acción requerida",
-            "Tu contraseña expirará en 24 horas",
-            "Confirma tu identidad - Cambio de contraseña",
-            "Alerta: Intento de acceso no autorizado a tu cuenta"
-        ]
-
-        bodies = [
-            f"Estimado usuario,\n\nHemos detectado actividad sospechosa en tu cuenta. Por tu seguridad, debes restablecer tu contraseña inmediatamente.\n\nHaz clic aquí para restablecer: http://{random.choice(self.phishing_domains)}/reset\n\nSi no lo haces en las próximas 24 horas, tu cuenta será suspendida.\n\nAtentamente,\nEquipo de Seguridad",
+    # Esquema de los correos generados; label y type como diccionario sobre sus códigos
+    EMAIL_SCHEMA = pa.schema([
+        ('text', pa.large_string()),
+        ('subject', pa.large_string()),
+        ('body', pa.large_string()),
+        ('from', pa.string()),
+        ('label', pa.dictionary(pa.int8(), pa.string())),
+        ('type', pa.dictionary(pa.int8(), pa.string())),
+    ])
+except ImportError:  # sin pyarrow solo se puede exportar a CSV
+    pa = None
 
-            f"Hola,\n\nTu contraseña está a punto de expirar. Para mantener el acceso a tu cuenta, actualízala ahora.\n\nActualizar contraseña: http://{random.choice(self.phishing_domains)}/update\n\nEste enlace expira en 12 horas.\n\nGracias,\nSoporte Técnico",
+# Correos en columnas: asuntos, cuerpos y remitentes como listas; label y type como
+# arrays de códigos int8 (índices en LABELS y TYPE_NAMES)
+EmailColumns = Dict[str, Union[List[str], np.ndarray]]
 
-            f"ATENCIÓN URGENTE\n\nAlguien intentó acceder a tu cuenta desde una ubicación desconocida. Por tu seguridad, cambia tu contraseña de inmediato.\n\nCambiar ahora: http://{random.choice(self.phishing_domains)}/secure\n\nNo ignores este mensaje.\n\nEquipo de Seguridad",
-        ]
+# Valores sorteados de una vez (con NumPy) para cada campo de las plantillas
+FIELD_DRAW_CHUNK = 4096
 
-        return random.choice(subjects), random.choice(bodies)
+# Mensajes de progreso, como mucho, por generación (en datasets grandes hay cientos de lotes)
+PROGRESS_LOG_STEPS = 20
 
-    def _generate_fake_payment_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de pago falso."""
-        monto = random.choice(self.montos)
-        orden = random.choice(self.numeros_orden)
+# Correos por bloque al generar en paralelo (cada bloque usa su propia semilla)
+PARALLEL_CHUNK_SIZE = 2000
 
-        subjects = [
-            f"Confirmación de pago: ${monto} MXN",
-            f"Pago rechazado - Orden #{orden}",
-            f"Actualiza tu método de pago - ${monto}",
-            f"Cargo pendiente de ${monto} - Acción requerida",
-            f"Problema con tu pago de ${monto}"
-        ]
+# Filas por lote al escribir en streaming (Parquet o CSV)
+STREAM_BATCH_SIZE = 10_000
 
-        bodies = [
-            f"Hola,\n\nTu pago de ${monto} MXN ha sido rechazado. Actualiza tu información de pago para completar la transacción.\n\nOrden: {orden}\nMonto: ${monto} MXN\n\nActualizar método de pago: http://{random.choice(self.phishing_domains)}/pago\n\nSi no actualizas en 48 horas, tu pedido será cancelado.\n\nGracias.",
+# Búfer de escritura del CSV en streaming
+CSV_BUFFER_SIZE = 1 << 20
 
-            f"Estimado cliente,\n\nHemos intentado procesar tu pago de ${monto} sin éxito. Tu tarjeta fue rechazada.\n\nPara evitar cargos adicionales, confirma tus datos aquí: http://{random.choice(self.phishing_domains)}/confirmar\n\nReferencia: {orden}\n\nEquipo de Pagos",
+# Nivel de gzip para salidas .csv.gz: el texto de plantillas comprime bien incluso al mínimo
+CSV_GZIP_LEVEL = 1
 
-            f"CARGO PENDIENTE\n\nTienes un cargo pendiente de ${monto} MXN. Completa el pago ahora para evitar intereses.\n\nPagar ahora: http://{random.choice(self.phishing_domains)}/pagar\n\nTransacción: {orden}\n\nDepartamento de Cobranza",
-        ]
 
-        return random.choice(subjects), random.choice(bodies)
+class _LazyFields(dict):
+    """Campos de una plantilla: cada uno se sortea la primera vez que se pide."""
 
-    def _generate_security_alert_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de alerta de seguridad."""
-        cuenta = random.choice(self.numeros_cuenta)
+    __slots__ = ('factories',)
 
-        subjects = [
-            "ALERTA: Actividad sospechosa detectada",
-            "Tu cuenta ha sido comprometida",
-            "Inicio de sesión desde dispositivo desconocido",
-            "Verifica tu identidad inmediatamente",
-            "URGENTE: Posible fraude en tu cuenta"
-        ]
+    def __init__(self, factories: Dict[str, Callable[[], str]]):
+        super().__init__()
+        self.factories = factories
 
-        bodies = [
-            f"¡ALERTA DE SEGURIDAD!\n\nDetectamos un inicio de sesión sospechoso en tu cuenta {cuenta}.\n\nUbicación: Ciudad desconocida\nDispositivo: Desconocido\nFecha: {datetime.now().strftime('%d/%m/%Y')}\n\nSi no fuiste tú, verifica tu cuenta ahora: http://{random.choice(self.phishing_domains)}/verificar\n\nActúa inmediatamente.\n\nEquipo de Seguridad",
+    def __missing__(self, key: str) -> str:
+        value = self[key] = self.factories[key]()
+        return value
 
-            f"Estimado usuario,\n\nHemos bloqueado tu cuenta {cuenta} por actividad inusual. Para desbloquearla, confirma tu identidad.\n\nConfirmar identidad: http://{random.choice(self.phishing_domains)}/desbloquear\n\nTienes 24 horas o tu cuenta será suspendida permanentemente.\n\nAtentamente,\nDepartamento de Seguridad",
 
-            f"ATENCIÓN INMEDIATA REQUERIDA\n\nIntento de acceso no autorizado a tu cuenta. Detectamos actividad de múltiples ubicaciones simultáneamente.\n\nProtege tu cuenta: http://{random.choice(self.phishing_domains)}/proteger\n\nCuenta afectada: {cuenta}\n\nNo demores esta acción.\n\nCentro de Seguridad",
-        ]
+def _open_csv(output_file: str):
+    """Abrir el CSV de salida para escritura; con extensión .gz se comprime con gzip."""
+    if output_file.endswith('.gz'):
+        return gzip.open(output_file, 'wt', compresslevel=CSV_GZIP_LEVEL, encoding='utf-8', newline='')
+    return open(output_file, 'w', encoding='utf-8', newline='', buffering=CSV_BUFFER_SIZE)
 
-        return random.choice(subjects), random.choice(bodies)
 
-    def _generate_prize_winner_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de premio ganador."""
-        premio = random.choice(['100,000', '250,000', '500,000', '1,000,000'])
+def _concat_columns(parts: List[EmailColumns]) -> EmailColumns:
+    """Unir varios bloques de columnas en uno."""
+    return {
+        key: (np.concatenate([part[key] for part in parts]) if isinstance(parts[0][key], np.ndarray)
+              else list(chain.from_iterable(part[key] for part in parts)))
+        for key in parts[0]
+    }
 
-        subjects = [
-            f"¡FELICIDADES! Ganaste ${premio} MXN",
-            f"Eres el ganador de nuestro sorteo - ${premio}",
-            f"Premio especial para ti: ${premio} MXN",
-            f"Has sido seleccionado - Premio de ${premio}",
-            f"SORTEO GANADOR: ${premio} te esperan"
-        ]
 
-        bodies = [
-            f"¡FELICIDADES {self.get_random_name().split()[0].upper()}!\n\nHas sido seleccionado como GANADOR de nuestro sorteo anual.\n\nPREMIO: ${premio} MXN\n\nPara reclamar tu premio, ingresa tus datos aquí: http://{random.choice(self.phishing_domains)}/premio\n\nTienes 72 horas para reclamar o se asignará a otro participante.\n\n¡Enhorabuena!\nComité de Sorteos",
+def _index_templates(types: Tuple[str, ...], templates: Dict) -> Tuple:
+    """(asuntos, cuerpos, nº de asuntos, nº de cuerpos) por índice de tipo."""
+    subjects = tuple(templates[t][0] for t in types)
+    bodies = tuple(templates[t][1] for t in types)
+    return (subjects, bodies,
+            np.array([len(x) for x in subjects]), np.array([len(x) for x in bodies]))
 
-            f"Estimado participante,\n\n¡GANASTE! Tu número fue seleccionado en nuestro sorteo mensual.\n\nPremio: ${premio} MXN\nFolio: {random.choice(self.numeros_referencia)}\n\nReclama tu premio: http://{random.choice(self.phishing_domains)}/reclamar\n\nSolo necesitas confirmar tu identidad y el dinero será transferido.\n\nFelicidades,\nLotería Nacional Ficticia",
 
-            f"¡INCREÍBLE NOTICIA!\n\nFuiste elegido entre miles de participantes para recibir ${premio} MXN.\n\nNo es broma. Es real. Confirma tus datos y recibe tu premio: http://{random.choice(self.phishing_domains)}/ganador\n\nOFERTA LIMITADA: Solo por 48 horas.\n\nSorteo Internacional",
-        ]
+def _build_senders(domains: Tuple[str, ...], prefixes: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Direcciones 'prefijo@dominio' para todas las combinaciones."""
+    return tuple(sys.intern(f"{prefix}@{domain}") for domain in domains for prefix in prefixes)
 
-        return random.choice(subjects), random.choice(bodies)
 
-    def _generate_account_suspended_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de cuenta suspendida."""
-        subjects = [
-            "URGENTE: Tu cuenta será suspendida",
-            "Cuenta bloqueada - Acción inmediata requerida",
-            "Suspensión de cuenta en 24 horas",
-            "Tu cuenta ha sido desactivada temporalmente",
-            "AVISO: Cuenta pendiente de cierre"
-        ]
-
-        bodies = [
-            f"Estimado usuario,\n\nTu cuenta será suspendida en 24 horas por falta de verificación.\n\nPara evitar la suspensión, verifica tu información ahora: http://{random.choice(self.phishing_domains)}/evitar-suspension\n\nSi no actúas, perderás acceso permanente.\n\nAtentamente,\nAdministración de Cuentas",
-
-            f"AVISO IMPORTANTE\n\nTu cuenta ha sido marcada para cierre debido a inactividad. Para mantenerla activa, confirma tus datos.\n\nConfirmar cuenta: http://{random.choice(self.phishing_domains)}/mantener-activa\n\nTiempo restante: 12 horas\n\nDepartamento de Administración",
-
-            f"Tu cuenta está en riesgo de suspensión permanente.\n\nMotivo: Información desactualizada\nAcción requerida: Actualizar datos\nPlazo: 24 horas\n\nActualizar ahora: http://{random.choice(self.phishing_domains)}/actualizar\n\nNo pierdas tu cuenta.\n\nSoporte",
-        ]
-
-        return random.choice(subjects), random.choice(bodies)
-
-    def _generate_urgent_action_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de acción urgente."""
-        subjects = [
-            "ACCIÓN INMEDIATA REQUERIDA",
-            "URGENTE: Responde en las próximas 2 horas",
-            "ÚLTIMA OPORTUNIDAD - No ignores esto",
-            "TIEMPO LIMITADO: Actúa ahora o pierde acceso",
-            "CRÍTICO: Confirmación necesaria HOY"
-        ]
-
-        bodies = [
-            f"ATENCIÓN URGENTE\n\nEsta es tu ÚLTIMA oportunidad para actualizar tu información. Si no respondes en 2 horas, tu cuenta será cerrada permanentemente.\n\nACTÚA AHORA: http://{random.choice(self.phishing_domains)}/urgente\n\nNo esperes más.\n\nEquipo de Emergencias",
-
-            f"¡¡¡TIEMPO LIMITADO!!!\n\nSOLO TIENES HOY para completar la verificación de seguridad. Después de hoy, tu cuenta será ELIMINADA.\n\nVerificar AHORA: http://{random.choice(self.phishing_domains)}/hoy\n\nNo dejes pasar esta oportunidad.\n\nAdministración",
-
-            f"ÚLTIMA ADVERTENCIA\n\nHas ignorado nuestros avisos previos. Esta es la ÚLTIMA vez que te contactamos.\n\nConfirma tu identidad en las próximas 3 horas: http://{random.choice(self.phishing_domains)}/ultima-oportunidad\n\nDespués de esto, no habrá más chances.\n\nDepartamento Legal",
-        ]
+class SyntheticEmailGenerator:
+    """Generador de correos electrónicos sintéticos."""
 
-        return random.choice(subjects), random.choice(bodies)
+    # Atributos de instancia fijos: cada worker crea su propio generador. Las tablas
+    # de solo lectura (dominios, nombres, plantillas...) son de clase y se comparten
+    __slots__ = (
+        'seed', '_rnd', 'np_rng', 'logger',
+        'numeros_orden', 'numeros_cuenta', 'numeros_referencia',
+        'dates', 'field_factories', 'last_stats',
+    )
 
-    def _generate_fake_invoice_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de factura falsa."""
-        monto = random.choice(self.montos)
-        factura = random.choice(self.numeros_referencia)
+    PHISHING_TYPES = (
+        'password_reset',
+        'fake_payment',
+        'security_alert',
+        'prize_winner',
+        'account_suspended',
+        'urgent_action',
+        'fake_invoice',
+        'tax_refund',
+        'delivery_problem',
+        'too_good_offer'
+    )
 
-        subjects = [
-            f"Factura #{factura} - ${monto} MXN",
-            f"Pago vencido: Factura {factura}",
-            f"Recibo de pago - ${monto}",
-            f"Cargo automático procesado: ${monto}",
-            f"Comprobante de transacción #{factura}"
-        ]
+    LEGITIMATE_TYPES = (
+        'order_confirmation',
+        'newsletter',
+        'personal_email',
+        'receipt',
+        'meeting_reminder',
+        'project_update',
+        'welcome_message',
+        'subscription_renewal',
+        'support_response',
+        'educational_content'
+    )
 
-        bodies = [
-            f"Estimado cliente,\n\nSe ha generado una nueva factura a tu nombre:\n\nFactura: {factura}\nMonto: ${monto} MXN\nFecha de vencimiento: {(datetime.now() + timedelta(days=3)).strftime('%d/%m/%Y')}\n\nVer factura completa: http://{random.choice(self.phishing_domains)}/factura\n\nSi no reconoces este cargo, repórtalo inmediatamente.\n\nDepartamento de Facturación",
+    # Códigos enteros de las columnas 'label' y 'type' (índice en estas tuplas)
+    LABELS = ('legitimate', 'phishing')
+    TYPE_NAMES = PHISHING_TYPES + LEGITIMATE_TYPES
+
+    SENDER_PREFIXES = ('soporte', 'info', 'contacto', 'admin', 'noreply',
+                       'servicio', 'ayuda', 'notificaciones', 'alertas', 'equipo')
+
+    # Dominios ficticios para phishing (sospechosos)
+    PHISHING_DOMAINS = (
+        'mi-banco-seguro.test',
+        'verificacion-cuenta.test',
+        'seguridad-bancaria.test',
+        'actualizar-datos.test',
+        'premio-ganador.test',
+        'ofertas-exclusivas.test',
+        'alerta-seguridad.test',
+        'confirmar-identidad.test',
+        'reembolso-fiscal.test',
+        'sorteo-oficial.test',
+        'banco-virtual.test',
+        'pago-pendiente.test',
+        'cuenta-bloqueada.test',
+        'verificar-ahora.test',
+        'soporte-tecnico.test'
+    )
 
-            f"Se ha procesado un cargo a tu tarjeta:\n\nMonto: ${monto} MXN\nConcepto: Renovación automática\nReferencia: {factura}\n\nSi no autorizaste este cargo, cancélalo aquí: http://{random.choice(self.phishing_domains)}/cancelar\n\nTienes 48 horas para disputar.\n\nEquipo de Pagos",
+    # Dominios ficticios legítimos
+    LEGITIMATE_DOMAINS = (
+        'mi-empresa.test',
+        'universidad-ejemplo.test',
+        'tienda-online.test',
+        'newsletter-tech.test',
+        'correo-personal.test',
+        'oficina-virtual.test',
+        'equipo-proyecto.test',
+        'comunidad-usuarios.test',
+        'plataforma-cursos.test',
+        'servicio-cliente.test',
+        'empresa-ejemplo.test',
+        'corporativo-test.test',
+        'organizacion-demo.test',
+        'compania-ficticia.test',
+        'proveedor-ejemplo.test'
+    )
 
-            f"AVISO DE COBRO\n\nFactura pendiente de pago:\n• Número: {factura}\n• Monto: ${monto} MXN\n• Estado: VENCIDA\n\nPagar ahora para evitar recargos: http://{random.choice(self.phishing_domains)}/pagar-factura\n\nInterés por mora: 5% mensual\n\nCobranza",
-        ]
+    # Nombres ficticios
+    NOMBRES = (
+        'Carlos', 'María', 'Juan', 'Ana', 'Pedro', 'Laura', 'Miguel', 'Carmen',
+        'José', 'Isabel', 'Antonio', 'Rosa', 'Francisco', 'Marta', 'Luis', 'Elena',
+        'Javier', 'Patricia', 'Manuel', 'Lucía', 'David', 'Sara', 'Jorge', 'Paula'
+    )
 
-        return random.choice(subjects), random.choice(bodies)
+    APELLIDOS = (
+        'García', 'Rodríguez', 'Martínez', 'López', 'González', 'Pérez', 'Sánchez',
+        'Ramírez', 'Torres', 'Flores', 'Rivera', 'Gómez', 'Díaz', 'Cruz', 'Morales',
+        'Reyes', 'Ortiz', 'Gutiérrez', 'Chávez', 'Ruiz', 'Hernández', 'Jiménez'
+    )
 
-    def _generate_tax_refund_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de reembolso fiscal."""
-        monto = random.choice(['5,230', '8,450', '12,680', '15,900', '23,150'])
+    # Nombres completos y en mayúsculas (avisos de premio), ya construidos
+    NOMBRES_COMPLETOS = tuple(map(' '.join, product(NOMBRES, APELLIDOS)))
+    NOMBRES_UPPER = tuple(nombre.upper() for nombre in NOMBRES)
 
-        subjects = [
-            f"Reembolso de impuestos aprobado: ${monto} MXN",
-            "Tienes un reembolso fiscal pendiente",
-            f"Devolución de impuestos - ${monto}",
-            "Solicitud de reembolso procesada exitosamente",
-            f"Crédito fiscal disponible: ${monto} MXN"
-        ]
+    # Piezas de los nombres de usuario: nombre en minúsculas + sufijo de 3 cifras
+    NOMBRES_LOWER = tuple(nombre.lower() for nombre in NOMBRES)
+    SUFIJOS_USUARIO = tuple(map(str, range(100, 1000)))
 
-        bodies = [
-            f"Estimado contribuyente,\n\nSu declaración anual ha sido procesada y tiene derecho a un reembolso de ${monto} MXN.\n\nPara recibir su reembolso, confirme sus datos bancarios: http://{random.choice(self.phishing_domains)}/reembolso\n\nEl proceso toma 48 horas una vez confirmados los datos.\n\nServicio de Administración Tributaria Ficticia",
+    # Montos comunes
+    MONTOS = (
+        '50', '100', '250', '500', '1,000', '2,500', '5,000',
+        '10,000', '25,000', '50,000', '100,000'
+    )
 
-            f"REEMBOLSO APROBADO\n\nFelicidades, califica para un reembolso fiscal de ${monto} MXN.\n\nFolio: {random.choice(self.numeros_referencia)}\n\nReclamar reembolso: http://{random.choice(self.phishing_domains)}/reclamar-reembolso\n\nEste derecho expira en 30 días.\n\nHacienda Nacional Ficticia",
+    PREMIOS = ('100,000', '250,000', '500,000', '1,000,000')
+    MONTOS_REEMBOLSO = ('5,230', '8,450', '12,680', '15,900', '23,150')
+    DESCUENTOS = ('70%', '80%', '90%', '95%')
+
+    # Errores comunes en español
+    TYPO_REPLACEMENTS = {
+        'verificar': 'berificar',
+        'cuenta': 'quenta',
+        'banco': 'vanco',
+        'hacer': 'acer',
+        'haber': 'aver',
+        'hola': 'ola',
+        'urgente': 'urjente',
+        'inmediatamente': 'inmediatamnte',
+        'confirmación': 'confirmacion',
+        'transacción': 'transaccion',
+        'información': 'informacion',
+        'atención': 'atencion',
+    }
+    TYPO_RE = re.compile('|'.join(map(re.escape, TYPO_REPLACEMENTS)))
+    # Fracción de textos a los que add_typos llega a aplicar errores
+    TYPO_TEXT_RATE = 0.3
+
+    # Plantillas por tipo: (asuntos, cuerpos). Los campos {nombre} se rellenan con
+    # str.format_map al generar cada correo (ver _render)
+    PHISHING_TEMPLATES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+        # Phishing de restablecimiento de contraseña
+        'password_reset': (
+            (
+                "URGENTE: Restablece tu contraseña ahora",
+                "Solicitud de cambio de contraseña - Acción requerida",
+                "Tu contraseña expirará en 24 horas",
+                "Confirma tu identidad - Cambio de contraseña",
+                "Alerta: Intento de acceso no autorizado a tu cuenta",
+            ),
+            (
+                "Estimado usuario,\n\nHemos detectado actividad sospechosa en tu cuenta. Por tu seguridad, debes restablecer tu contraseña inmediatamente.\n\nHaz clic aquí para restablecer: http://{dominio}/reset\n\nSi no lo haces en las próximas 24 horas, tu cuenta será suspendida.\n\nAtentamente,\nEquipo de Seguridad",
+                "Hola,\n\nTu contraseña está a punto de expirar. Para mantener el acceso a tu cuenta, actualízala ahora.\n\nActualizar contraseña: http://{dominio}/update\n\nEste enlace expira en 12 horas.\n\nGracias,\nSoporte Técnico",
+                "ATENCIÓN URGENTE\n\nAlguien intentó acceder a tu cuenta desde una ubicación desconocida. Por tu seguridad, cambia tu contraseña de inmediato.\n\nCambiar ahora: http://{dominio}/secure\n\nNo ignores este mensaje.\n\nEquipo de Seguridad",
+            ),
+        ),
+        # Phishing de pago falso
+        'fake_payment': (
+            (
+                "Confirmación de pago: ${monto} MXN",
+                "Pago rechazado - Orden #{orden}",
+                "Actualiza tu método de pago - ${monto}",
+                "Cargo pendiente de ${monto} - Acción requerida",
+                "Problema con tu pago de ${monto}",
+            ),
+            (
+                "Hola,\n\nTu pago de ${monto} MXN ha sido rechazado. Actualiza tu información de pago para completar la transacción.\n\nOrden: {orden}\nMonto: ${monto} MXN\n\nActualizar método de pago: http://{dominio}/pago\n\nSi no actualizas en 48 horas, tu pedido será cancelado.\n\nGracias.",
+                "Estimado cliente,\n\nHemos intentado procesar tu pago de ${monto} sin éxito. Tu tarjeta fue rechazada.\n\nPara evitar cargos adicionales, confirma tus datos aquí: http://{dominio}/confirmar\n\nReferencia: {orden}\n\nEquipo de Pagos",
+                "CARGO PENDIENTE\n\nTienes un cargo pendiente de ${monto} MXN. Completa el pago ahora para evitar intereses.\n\nPagar ahora: http://{dominio}/pagar\n\nTransacción: {orden}\n\nDepartamento de Cobranza",
+            ),
+        ),
+        # Phishing de alerta de seguridad
+        'security_alert': (
+            (
+                "ALERTA: Actividad sospechosa detectada",
+                "Tu cuenta ha sido comprometida",
+                "Inicio de sesión desde dispositivo desconocido",
+                "Verifica tu identidad inmediatamente",
+                "URGENTE: Posible fraude en tu cuenta",
+            ),
+            (
+                "¡ALERTA DE SEGURIDAD!\n\nDetectamos un inicio de sesión sospechoso en tu cuenta {cuenta}.\n\nUbicación: Ciudad desconocida\nDispositivo: Desconocido\nFecha: {fecha_hoy}\n\nSi no fuiste tú, verifica tu cuenta ahora: http://{dominio}/verificar\n\nActúa inmediatamente.\n\nEquipo de Seguridad",
+                "Estimado usuario,\n\nHemos bloqueado tu cuenta {cuenta} por actividad inusual. Para desbloquearla, confirma tu identidad.\n\nConfirmar identidad: http://{dominio}/desbloquear\n\nTienes 24 horas o tu cuenta será suspendida permanentemente.\n\nAtentamente,\nDepartamento de Seguridad",
+                "ATENCIÓN INMEDIATA REQUERIDA\n\nIntento de acceso no autorizado a tu cuenta. Detectamos actividad de múltiples ubicaciones simultáneamente.\n\nProtege tu cuenta: http://{dominio}/proteger\n\nCuenta afectada: {cuenta}\n\nNo demores esta acción.\n\nCentro de Seguridad",
+            ),
+        ),
+        # Phishing de premio ganador
+        'prize_winner': (
+            (
+                "¡FELICIDADES! Ganaste ${premio} MXN",
+                "Eres el ganador de nuestro sorteo - ${premio}",
+                "Premio especial para ti: ${premio} MXN",
+                "Has sido seleccionado - Premio de ${premio}",
+                "SORTEO GANADOR: ${premio} te esperan",
+            ),
+            (
+                "¡FELICIDADES {ganador}!\n\nHas sido seleccionado como GANADOR de nuestro sorteo anual.\n\nPREMIO: ${premio} MXN\n\nPara reclamar tu premio, ingresa tus datos aquí: http://{dominio}/premio\n\nTienes 72 horas para reclamar o se asignará a otro participante.\n\n¡Enhorabuena!\nComité de Sorteos",
+                "Estimado participante,\n\n¡GANASTE! Tu número fue seleccionado en nuestro sorteo mensual.\n\nPremio: ${premio} MXN\nFolio: {folio}\n\nReclama tu premio: http://{dominio}/reclamar\n\nSolo necesitas confirmar tu identidad y el dinero será transferido.\n\nFelicidades,\nLotería Nacional Ficticia",
+                "¡INCREÍBLE NOTICIA!\n\nFuiste elegido entre miles de participantes para recibir ${premio} MXN.\n\nNo es broma. Es real. Confirma tus datos y recibe tu premio: http://{dominio}/ganador\n\nOFERTA LIMITADA: Solo por 48 horas.\n\nSorteo Internacional",
+            ),
+        ),
+        # Phishing de cuenta suspendida
+        'account_suspended': (
+            (
+                "URGENTE: Tu cuenta será suspendida",
+                "Cuenta bloqueada - Acción inmediata requerida",
+                "Suspensión de cuenta en 24 horas",
+                "Tu cuenta ha sido desactivada temporalmente",
+                "AVISO: Cuenta pendiente de cierre",
+            ),
+            (
+                "Estimado usuario,\n\nTu cuenta será suspendida en 24 horas por falta de verificación.\n\nPara evitar la suspensión, verifica tu información ahora: http://{dominio}/evitar-suspension\n\nSi no actúas, perderás acceso permanente.\n\nAtentamente,\nAdministración de Cuentas",
+                "AVISO IMPORTANTE\n\nTu cuenta ha sido marcada para cierre debido a inactividad. Para mantenerla activa, confirma tus datos.\n\nConfirmar cuenta: http://{dominio}/mantener-activa\n\nTiempo restante: 12 horas\n\nDepartamento de Administración",
+                "Tu cuenta está en riesgo de suspensión permanente.\n\nMotivo: Información desactualizada\nAcción requerida: Actualizar datos\nPlazo: 24 horas\n\nActualizar ahora: http://{dominio}/actualizar\n\nNo pierdas tu cuenta.\n\nSoporte",
+            ),
+        ),
+        # Phishing de acción urgente
+        'urgent_action': (
+            (
+                "ACCIÓN INMEDIATA REQUERIDA",
+                "URGENTE: Responde en las próximas 2 horas",
+                "ÚLTIMA OPORTUNIDAD - No ignores esto",
+                "TIEMPO LIMITADO: Actúa ahora o pierde acceso",
+                "CRÍTICO: Confirmación necesaria HOY",
+            ),
+            (
+                "ATENCIÓN URGENTE\n\nEsta es tu ÚLTIMA oportunidad para actualizar tu información. Si no respondes en 2 horas, tu cuenta será cerrada permanentemente.\n\nACTÚA AHORA: http://{dominio}/urgente\n\nNo esperes más.\n\nEquipo de Emergencias",
+                "¡¡¡TIEMPO LIMITADO!!!\n\nSOLO TIENES HOY para completar la verificación de seguridad. Después de hoy, tu cuenta será ELIMINADA.\n\nVerificar AHORA: http://{dominio}/hoy\n\nNo dejes pasar esta oportunidad.\n\nAdministración",
+                "ÚLTIMA ADVERTENCIA\n\nHas ignorado nuestros avisos previos. Esta es la ÚLTIMA vez que te contactamos.\n\nConfirma tu identidad en las próximas 3 horas: http://{dominio}/ultima-oportunidad\n\nDespués de esto, no habrá más chances.\n\nDepartamento Legal",
+            ),
+        ),
+        # Phishing de factura falsa
+        'fake_invoice': (
+            (
+                "Factura #{factura} - ${monto} MXN",
+                "Pago vencido: Factura {factura}",
+                "Recibo de pago - ${monto}",
+                "Cargo automático procesado: ${monto}",
+                "Comprobante de transacción #{factura}",
+            ),
+            (
+                "Estimado cliente,\n\nSe ha generado una nueva factura a tu nombre:\n\nFactura: {factura}\nMonto: ${monto} MXN\nFecha de vencimiento: {fecha_3d}\n\nVer factura completa: http://{dominio}/factura\n\nSi no reconoces este cargo, repórtalo inmediatamente.\n\nDepartamento de Facturación",
+                "Se ha procesado un cargo a tu tarjeta:\n\nMonto: ${monto} MXN\nConcepto: Renovación automática\nReferencia: {factura}\n\nSi no autorizaste este cargo, cancélalo aquí: http://{dominio}/cancelar\n\nTienes 48 horas para disputar.\n\nEquipo de Pagos",
+                "AVISO DE COBRO\n\nFactura pendiente de pago:\n• Número: {factura}\n• Monto: ${monto} MXN\n• Estado: VENCIDA\n\nPagar ahora para evitar recargos: http://{dominio}/pagar-factura\n\nInterés por mora: 5% mensual\n\nCobranza",
+            ),
+        ),
+        # Phishing de reembolso fiscal
+        'tax_refund': (
+            (
+                "Reembolso de impuestos aprobado: ${monto_fiscal} MXN",
+                "Tienes un reembolso fiscal pendiente",
+                "Devolución de impuestos - ${monto_fiscal}",
+                "Solicitud de reembolso procesada exitosamente",
+                "Crédito fiscal disponible: ${monto_fiscal} MXN",
+            ),
+            (
+                "Estimado contribuyente,\n\nSu declaración anual ha sido procesada y tiene derecho a un reembolso de ${monto_fiscal} MXN.\n\nPara recibir su reembolso, confirme sus datos bancarios: http://{dominio}/reembolso\n\nEl proceso toma 48 horas una vez confirmados los datos.\n\nServicio de Administración Tributaria Ficticia",
+                "REEMBOLSO APROBADO\n\nFelicidades, califica para un reembolso fiscal de ${monto_fiscal} MXN.\n\nFolio: {folio}\n\nReclamar reembolso: http://{dominio}/reclamar-reembolso\n\nEste derecho expira en 30 días.\n\nHacienda Nacional Ficticia",
+                "Notificación de Reembolso\n\nDebe recibir un crédito fiscal de ${monto_fiscal} MXN por su declaración del año anterior.\n\nActualice su información para el depósito: http://{dominio}/actualizar-info\n\nSi no responde en 15 días, el reembolso se cancelará.\n\nDepartamento de Devoluciones",
+            ),
+        ),
+        # Phishing de problema de entrega
+        'delivery_problem': (
+            (
+                "Problema con tu entrega - Paquete #{paquete}",
+                "Tu paquete no pudo ser entregado",
+                "Acción requerida: Envío {paquete}",
+                "Confirmación de dirección necesaria",
+                "Paquete retenido en aduana - {paquete}",
+            ),
+            (
+                "Hola,\n\nNo pudimos entregar tu paquete por dirección incorrecta.\n\nNúmero de rastreo: {paquete}\nIntentos de entrega: 2\n\nActualiza tu dirección aquí: http://{dominio}/actualizar-direccion\n\nSi no actualizas en 48 horas, el paquete será devuelto.\n\nServicio de Paquetería Ficticia",
+                "PAQUETE RETENIDO\n\nTu envío {paquete} está retenido en nuestra bodega por falta de información.\n\nPara liberarlo, paga la tarifa de almacenamiento: $150 MXN\n\nPagar y recibir: http://{dominio}/liberar-paquete\n\nDespués de 7 días será descartado.\n\nAlmacén de Paquetería",
+                "Notificación de Envío\n\nTu paquete {paquete} está en aduana. Se requiere el pago de impuestos de importación.\n\nMonto: $250 MXN\nPlazo: 5 días\n\nPagar impuestos: http://{dominio}/pagar-impuestos\n\nAduana Nacional Ficticia",
+            ),
+        ),
+        # Phishing de oferta demasiado buena
+        'too_good_offer': (
+            (
+                "¡OFERTA EXCLUSIVA! {descuento} de descuento SOLO HOY",
+                "ÚLTIMA OPORTUNIDAD: {descuento} OFF en todo",
+                "¡Increíble! {descuento} de descuento por tiempo limitado",
+                "Black Friday anticipado: {descuento} de descuento",
+                "REGALO ESPECIAL: {descuento} en tu próxima compra",
+            ),
+            (
+                "¡¡¡OFERTA IRREPETIBLE!!!\n\n{descuento} de descuento en TODOS los productos.\n\nSOLO POR HOY\nSOLO PARA TI\n\nEntra ahora: http://{dominio}/oferta\n\nNo te lo pierdas. Esta oferta termina a medianoche.\n\nTienda Virtual Ficticia",
+                "Has sido seleccionado para nuestra MEGA VENTA VIP\n\nDescuento exclusivo: {descuento}\nTiempo limitado: 3 horas\n\nACCEDE AHORA: http://{dominio}/vip-sale\n\nSolo para clientes especiales como tú.\n\nVentas Especiales",
+                "¡LIQUIDACIÓN TOTAL!\n\nTodo debe irse. {descuento} de descuento en absolutamente todo.\n\nMás un REGALO SORPRESA para los primeros 100 compradores.\n\nComprar ahora: http://{dominio}/liquidacion\n\n¡No esperes! Se están agotando.\n\nOutlet Online",
+            ),
+        ),
+    }
+
+    LEGITIMATE_TEMPLATES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+        # Confirmación de pedido legítima
+        'order_confirmation': (
+            (
+                "Confirmación de pedido #{orden}",
+                "Tu pedido ha sido recibido - Orden {orden}",
+                "Pedido confirmado: {orden}",
+                "Recibimos tu orden #{orden}",
+            ),
+            (
+                "Hola,\n\nGracias por tu compra. Tu pedido ha sido confirmado.\n\nDetalles del pedido:\n• Número de orden: {orden}\n• Total: ${monto} MXN\n• Fecha estimada de entrega: {dia_5d}\n\nPuedes rastrear tu pedido en tu cuenta.\n\nGracias por tu preferencia,\nEquipo de Ventas",
+                "Estimado cliente,\n\nTu pedido {orden} ha sido procesado exitosamente.\n\nResumen:\n- Monto total: ${monto} MXN\n- Estado: En preparación\n- Envío estimado: 3-5 días hábiles\n\nTe notificaremos cuando tu pedido sea enviado.\n\nSaludos cordiales,\nTienda Online",
+            ),
+        ),
+        # Boletín informativo legítimo
+        'newsletter': (
+            (
+                "Boletín mensual - Novedades y actualizaciones",
+                "Nuestro boletín de este mes",
+                "Newsletter: Lo más destacado de la semana",
+                "Actualizaciones y noticias de interés",
+            ),
+            (
+                "Hola,\n\nBienvenido a nuestro boletín mensual. Este mes compartimos:\n\n1. Nuevas funcionalidades en nuestra plataforma\n2. Artículos destacados sobre tecnología\n3. Próximos eventos y webinars\n4. Ofertas especiales para suscriptores\n\nGracias por ser parte de nuestra comunidad.\n\nUn saludo,\nEquipo Editorial",
+                "Estimado suscriptor,\n\nEn esta edición encontrarás:\n\n• Guías prácticas sobre seguridad digital\n• Consejos para mejorar tu productividad\n• Reseñas de herramientas útiles\n• Eventos comunitarios del mes\n\nEsperamos que esta información sea de tu interés.\n\nSaludos,\nEquipo de Contenido",
+            ),
+        ),
+        # Email personal legítimo
+        'personal_email': (
+            (
+                "Reunión de mañana",
+                "Documentos que solicitaste",
+                "Confirmación para el evento",
+                "Consulta sobre el proyecto",
+                "Seguimiento de nuestra conversación",
+            ),
+            (
+                "Hola,\n\nTe escribo para confirmar nuestra reunión de mañana a las 10:00 AM. ¿Te parece bien en la sala de conferencias?\n\nPor favor avísame si necesitas cambiar el horario.\n\nSaludos,\n{nombre}",
+                "Hola,\n\nTe adjunto los documentos que me pediste la semana pasada. Revísalos y avísame si necesitas algo más.\n\nCualquier duda, estoy disponible.\n\nSaludos cordiales,\n{nombre}",
+                "Buenos días,\n\nTe confirmo mi asistencia al evento del próximo viernes. ¿Necesitas que lleve algo en particular?\n\nQuedo atento.\n\nSaludos,\n{nombre}",
+            ),
+        ),
+        # Recibo legítimo
+        'receipt': (
+            (
+                "Recibo de pago - {referencia}",
+                "Comprobante de transacción {referencia}",
+                "Tu recibo de ${monto} MXN",
+            ),
+            (
+                "Estimado cliente,\n\nSe ha procesado tu pago exitosamente.\n\nDetalles de la transacción:\n• Referencia: {referencia}\n• Monto: ${monto} MXN\n• Fecha: {fecha_hoy}\n• Método de pago: Tarjeta terminada en {tarjeta}\n\nEste es tu comprobante oficial.\n\nGracias por tu pago,\nDepartamento de Contabilidad",
+                "Hola,\n\nTu pago ha sido recibido correctamente.\n\nResumen:\n- Referencia: {referencia}\n- Importe: ${monto} MXN\n- Estado: Aprobado\n\nPuedes descargar tu factura desde tu cuenta.\n\nSaludos,\nEquipo de Pagos",
+            ),
+        ),
+        # Recordatorio de reunión legítimo
+        'meeting_reminder': (
+            (
+                "Recordatorio: Reunión de mañana a las 14:00",
+                "Próxima reunión - Confirma tu asistencia",
+                "Reunión programada para el jueves",
+            ),
+            (
+                "Hola equipo,\n\nLes recuerdo nuestra reunión programada para mañana:\n\nFecha: {dia_1d}\nHora: 14:00 hrs\nLugar: Sala de conferencias B\nTema: Revisión de avances del proyecto\n\nPor favor confirmen su asistencia.\n\nSaludos,\n{nombre}",
+                "Estimados colegas,\n\nEsta es una confirmación de nuestra reunión:\n\n• Cuándo: Jueves 15:30 hrs\n• Dónde: Sala virtual (enlace en el calendario)\n• Duración: 1 hora\n• Agenda: Planificación del siguiente sprint\n\nNos vemos ahí.\n\nSaludos,\n{nombre}",
+            ),
+        ),
+        # Actualización de proyecto legítima
+        'project_update': (
+            (
+                "Actualización del proyecto - Fase 2 completada",
+                "Avances del proyecto esta semana",
+                "Estado del proyecto: En progreso",
+            ),
+            (
+                "Hola equipo,\n\nLes comparto el avance del proyecto:\n\n✓ Fase 1: Completada\n✓ Fase 2: Completada esta semana\n• Fase 3: En progreso (75%)\n• Fase 4: Pendiente\n\nProyección: Terminamos en 2 semanas si mantenemos el ritmo.\n\n¿Alguna pregunta o bloqueador?\n\nSaludos,\n{nombre}\nLíder de Proyecto",
+                "Buenas tardes,\n\nResumen semanal del proyecto:\n\nLogros:\n- Implementadas 5 nuevas funcionalidades\n- Resueltos 12 bugs\n- Documentación actualizada\n\nPendientes:\n- Revisión de código\n- Pruebas de integración\n\nNos vemos en la próxima reunión.\n\nSaludos,\n{nombre}",
+            ),
+        ),
+        # Mensaje de bienvenida legítimo
+        'welcome_message': (
+            (
+                "¡Bienvenido a nuestra plataforma!",
+                "Gracias por registrarte",
+                "Tu cuenta ha sido creada exitosamente",
+            ),
+            (
+                "¡Hola!\n\nBienvenido a nuestra plataforma. Estamos encantados de tenerte con nosotros.\n\nPara comenzar:\n1. Completa tu perfil\n2. Explora nuestras funcionalidades\n3. Únete a nuestra comunidad\n\nSi tienes alguna pregunta, nuestro equipo de soporte está disponible.\n\n¡Esperamos que disfrutes la experiencia!\n\nSaludos,\nEquipo de Bienvenida",
+                "Estimado usuario,\n\nGracias por unirte a nosotros. Tu registro se ha completado correctamente.\n\nTu nombre de usuario: {usuario}\n\nPuedes iniciar sesión en cualquier momento desde nuestra página principal.\n\nBienvenido a bordo,\nEquipo de Registro",
+            ),
+        ),
+        # Recordatorio de renovación legítimo
+        'subscription_renewal': (
+            (
+                "Tu suscripción se renovará pronto",
+                "Recordatorio: Renovación de suscripción",
+                "Próxima renovación de tu plan",
+            ),
+            (
+                "Hola,\n\nTe informamos que tu suscripción se renovará automáticamente el {dia_30d}.\n\nPlan actual: Premium\nCosto: $299 MXN/mes\nMétodo de pago: Tarjeta terminada en {tarjeta}\n\nSi deseas modificar o cancelar tu suscripción, puedes hacerlo desde la configuración de tu cuenta en cualquier momento.\n\nGracias por tu preferencia,\nEquipo de Suscripciones",
+                "Estimado suscriptor,\n\nTu plan se renovará en 7 días. Aquí los detalles:\n\n• Plan: Profesional\n• Renovación: {fecha_7d}\n• Importe: $499 MXN\n\nNo necesitas hacer nada. La renovación es automática.\n\nPuedes gestionar tu suscripción desde tu cuenta.\n\nSaludos,\nAdministración",
+            ),
+        ),
+        # Respuesta de soporte legítima
+        'support_response': (
+            (
+                "Re: Tu solicitud de soporte #{ticket}",
+                "Respuesta a tu consulta - Ticket {ticket}",
+                "Caso resuelto: {ticket}",
+            ),
+            (
+                "Hola,\n\nGracias por contactarnos. Hemos revisado tu consulta (Ticket: {ticket}).\n\nRespuesta:\nHemos identificado el problema y lo hemos solucionado. Por favor intenta nuevamente y verifica que todo funcione correctamente.\n\nSi el problema persiste, responde a este correo y con gusto te ayudaremos.\n\nSaludos cordiales,\nEquipo de Soporte Técnico",
+                "Estimado usuario,\n\nTu ticket {ticket} ha sido atendido.\n\nSolución aplicada:\nSe actualizó tu configuración y se verificó el funcionamiento. Todo debería estar operando normalmente.\n\nPor favor confirma que el problema se ha resuelto.\n\n¿Podemos cerrar este caso?\n\nAtentamente,\nSoporte al Cliente",
+            ),
+        ),
+        # Contenido educativo legítimo
+        'educational_content': (
+            (
+                "Consejos de seguridad para proteger tu información",
+                "Guía: Cómo identificar correos sospechosos",
+                "Tips para mejorar tu productividad digital",
+                "Buenas prácticas de seguridad en línea",
+            ),
+            (
+                "Hola,\n\nEn este boletín compartimos consejos importantes de seguridad:\n\n1. Usa contraseñas únicas y seguras\n2. Activa la autenticación de dos factores\n3. Mantén tu software actualizado\n4. Desconfía de enlaces y archivos sospechosos\n5. Verifica siempre la dirección del remitente\n\nLa seguridad es responsabilidad de todos.\n\nMás información en nuestro blog.\n\nSaludos,\nEquipo de Seguridad",
+                "Estimado usuario,\n\n¿Cómo identificar correos de phishing?\n\nSeñales de alerta:\n• Urgencia excesiva\n• Errores ortográficos\n• Remitentes desconocidos\n• Enlaces sospechosos\n• Solicitudes de información sensible\n\nSi recibes un correo sospechoso, repórtalo y elimínalo.\n\nTu seguridad es nuestra prioridad.\n\nSaludos,\nCentro de Educación Digital",
+            ),
+        ),
+    }
+
+    # Plantillas por índice de tipo con sus longitudes precalculadas
+    _PHISH_TABLES = _index_templates(PHISHING_TYPES, PHISHING_TEMPLATES)
+    _LEGIT_TABLES = _index_templates(LEGITIMATE_TYPES, LEGITIMATE_TEMPLATES)
+
+    # Todos los remitentes posibles (prefijo x dominio), internados y compartidos por
+    # todos los correos: se eligen por índice en lugar de formatearlos cada vez
+    _PHISH_SENDERS = _build_senders(PHISHING_DOMAINS, SENDER_PREFIXES)
+    _LEGIT_SENDERS = _build_senders(LEGITIMATE_DOMAINS, SENDER_PREFIXES)
 
-            f"Notificación de Reembolso\n\nDebe recibir un crédito fiscal de ${monto} MXN por su declaración del año anterior.\n\nActualice su información para el depósito: http://{random.choice(self.phishing_domains)}/actualizar-info\n\nSi no responde en 15 días, el reembolso se cancelará.\n\nDepartamento de Devoluciones",
-        ]
+    def __init__(self, seed: int = 42):
+        """
+        Inicializar el generador.
 
-        return random.choice(subjects), random.choice(bodies)
+        Args:
+            seed: Semilla para reproducibilidad
+        """
+        self.seed = seed
+        # Generador propio (no el global del módulo): cada worker queda sembrado por separado
+        self._rnd = random.Random(seed)
+        # Sorteos por lote (tipo, dominio, remitente, errores) en una sola llamada
+        self.np_rng = np.random.default_rng(seed)
 
-    def _generate_delivery_problem_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de problema de entrega."""
-        paquete = random.choice(self.numeros_referencia)
+        # Estadísticas del último dataset, calculadas al generarlo (sin recorrer el DataFrame)
+        self.last_stats = None
 
-        subjects = [
-            f"Problema con tu entrega - Paquete #{paquete}",
-            "Tu paquete no pudo ser entregado",
-            f"Acción requerida: Envío {paquete}",
-            "Confirmación de dirección necesaria",
-            f"Paquete retenido en aduana - {paquete}"
-        ]
+        # Configurar logging
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
 
-        bodies = [
-            f"Hola,\n\nNo pudimos entregar tu paquete por dirección incorrecta.\n\nNúmero de rastreo: {paquete}\nIntentos de entrega: 2\n\nActualiza tu dirección aquí: http://{random.choice(self.phishing_domains)}/actualizar-direccion\n\nSi no actualizas en 48 horas, el paquete será devuelto.\n\nServicio de Paquetería Ficticia",
+        # Números de orden/cuenta/referencia
+        self.generate_random_numbers()
 
-            f"PAQUETE RETENIDO\n\nTu envío {paquete} está retenido en nuestra bodega por falta de información.\n\nPara liberarlo, paga la tarifa de almacenamiento: $150 MXN\n\nPagar y recibir: http://{random.choice(self.phishing_domains)}/liberar-paquete\n\nDespués de 7 días será descartado.\n\nAlmacén de Paquetería",
+        # Fechas de las plantillas, ya formateadas
+        self.refresh_dates()
+
+        # Cómo obtener cada campo de las plantillas (solo se llama si la plantilla lo usa).
+        # Cada campo consume valores sorteados en bloque en lugar de un random.choice por uso
+        cuenta = self._draws(self.numeros_cuenta).__next__
+        referencia = self._draws(self.numeros_referencia).__next__
+        usuario = self._draws(self.NOMBRES_LOWER).__next__
+        sufijo = self._draws(self.SUFIJOS_USUARIO).__next__
+        self.field_factories = {
+            'dominio': self._draws(self.PHISHING_DOMAINS).__next__,
+            'monto': self._draws(self.MONTOS).__next__,
+            'monto_fiscal': self._draws(self.MONTOS_REEMBOLSO).__next__,
+            'premio': self._draws(self.PREMIOS).__next__,
+            'descuento': self._draws(self.DESCUENTOS).__next__,
+            'orden': self._draws(self.numeros_orden).__next__,
+            'cuenta': cuenta,
+            'tarjeta': cuenta,
+            'referencia': referencia,
+            'factura': referencia,
+            'paquete': referencia,
+            'ticket': referencia,
+            'folio': referencia,
+            'nombre': self._draws(self.NOMBRES_COMPLETOS).__next__,
+            'ganador': self._draws(self.NOMBRES_UPPER).__next__,
+            'usuario': lambda: f"{usuario()}{sufijo()}",
+            **{key: (lambda key=key: self.dates[key]) for key in self.dates},
+        }
 
-            f"Notificación de Envío\n\nTu paquete {paquete} está en aduana. Se requiere el pago de impuestos de importación.\n\nMonto: $250 MXN\nPlazo: 5 días\n\nPagar impuestos: http://{random.choice(self.phishing_domains)}/pagar-impuestos\n\nAduana Nacional Ficticia",
-        ]
+    def refresh_dates(self):
+        """Formatear una sola vez las fechas que usan las plantillas (por lote)."""
+        now = datetime.now()
+        self.dates = {
+            'fecha_hoy': now.strftime('%d/%m/%Y'),
+            'fecha_3d': (now + timedelta(days=3)).strftime('%d/%m/%Y'),
+            'fecha_7d': (now + timedelta(days=7)).strftime('%d/%m/%Y'),
+            'dia_1d': (now + timedelta(days=1)).strftime('%d de %B'),
+            'dia_5d': (now + timedelta(days=5)).strftime('%d de %B'),
+            'dia_30d': (now + timedelta(days=30)).strftime('%d de %B'),
+        }
 
-        return random.choice(subjects), random.choice(bodies)
+    def generate_random_numbers(self):
+        """Generar números aleatorios para usar en correos."""
+        # Sorteo en bloque y conversión a texto dentro de NumPy
+        self.numeros_orden = self.np_rng.integers(100000, 1000000, 100).astype(str).tolist()
+        self.numeros_cuenta = np.char.add('****', self.np_rng.integers(1000, 10000, 50).astype(str)).tolist()
+        self.numeros_referencia = np.char.add('REF-', self.np_rng.integers(10000, 100000, 100).astype(str)).tolist()
 
-    def _generate_too_good_offer_phishing(self) -> Tuple[str, str]:
-        """Generar phishing de oferta demasiado buena."""
-        descuento = random.choice(['70%', '80%', '90%', '95%'])
+    def get_random_name(self) -> str:
+        """Obtener nombre completo aleatorio."""
+        return self._rnd.choice(self.NOMBRES_COMPLETOS)
 
-        subjects = [
-            f"¡OFERTA EXCLUSIVA! {descuento} de descuento SOLO HOY",
-            f"ÚLTIMA OPORTUNIDAD: {descuento} OFF en todo",
-            f"¡Increíble! {descuento} de descuento por tiempo limitado",
-            f"Black Friday anticipado: {descuento} de descuento",
-            f"REGALO ESPECIAL: {descuento} en tu próxima compra"
-        ]
+    def get_random_email(self, phishing: bool) -> str:
+        """Remitente aleatorio de la clase indicada (de los ya construidos)."""
+        senders = self._PHISH_SENDERS if phishing else self._LEGIT_SENDERS
+        return senders[self.np_rng.integers(len(senders))]
 
-        bodies = [
-            f"¡¡¡OFERTA IRREPETIBLE!!!\n\n{descuento} de descuento en TODOS los productos.\n\nSOLO POR HOY\nSOLO PARA TI\n\nEntra ahora: http://{random.choice(self.phishing_domains)}/oferta\n\nNo te lo pierdas. Esta oferta termina a medianoche.\n\nTienda Virtual Ficticia",
+    def _draws(self, values) -> Iterator[str]:
+        """Secuencia infinita de valores de `values`, sorteados de FIELD_DRAW_CHUNK en FIELD_DRAW_CHUNK."""
+        while True:
+            for i in self.np_rng.integers(0, len(values), FIELD_DRAW_CHUNK).tolist():
+                yield values[i]
 
-            f"Has sido seleccionado para nuestra MEGA VENTA VIP\n\nDescuento exclusivo: {descuento}\nTiempo limitado: 3 horas\n\nACCEDE AHORA: http://{random.choice(self.phishing_domains)}/vip-sale\n\nSolo para clientes especiales como tú.\n\nVentas Especiales",
+    def _sample_indices(self, table, n: int) -> np.ndarray:
+        """Índices aleatorios de `table` para un lote de n correos."""
+        return self.np_rng.integers(0, len(table), n)
 
-            f"¡LIQUIDACIÓN TOTAL!\n\nTodo debe irse. {descuento} de descuento en absolutamente todo.\n\nMás un REGALO SORPRESA para los primeros 100 compradores.\n\nComprar ahora: http://{random.choice(self.phishing_domains)}/liquidacion\n\n¡No esperes! Se están agotando.\n\nOutlet Online",
-        ]
+    def _draw_templates(self, tables: Tuple, n: int) -> Tuple[np.ndarray, List[str], List[str]]:
+        """
+        Tipo, asunto y cuerpo de cada correo del lote a partir de un solo sorteo.
 
-        return random.choice(subjects), random.choice(bodies)
+        Cada número uniforme se descompone en base mixta (tipo, asunto, cuerpo), así
+        que los tipos siguen siendo equiprobables aunque tengan distinto número de
+        plantillas.
+        """
+        subjects, bodies, subj_lens, body_lens = tables
+        u = self.np_rng.random(n) * len(subjects)
+        types_idx = u.astype(np.intp)
+        u = (u - types_idx) * subj_lens[types_idx]
+        subj_idx = u.astype(np.intp)
+        body_idx = ((u - subj_idx) * body_lens[types_idx]).astype(np.intp)
+        types = types_idx.tolist()
+        return (types_idx,
+                [subjects[t][i] for t, i in zip(types, subj_idx.tolist())],
+                [bodies[t][i] for t, i in zip(types, body_idx.tolist())])
+
+    def _render(self, subject: str, body: str) -> Tuple[str, str]:
+        """Rellenar asunto y cuerpo de un correo (mismos valores en ambos)."""
+        fields = _LazyFields(self.field_factories)
+        return subject.format_map(fields), body.format_map(fields)
 
-    def generate_legitimate_email(self) -> Dict[str, str]:
-        """Generar un correo legítimo sintético."""
+    def add_typos(self, text: str, probability: float = 0.15) -> str:
+        """
+        Añadir errores ortográficos ocasionales.
 
-        # Seleccionar tipo de correo legítimo
-        email_type = random.choice([
-            'order_confirmation',
-            'newsletter',
-            'personal_email',
-            'receipt',
-            'meeting_reminder',
-            'project_update',
-            'welcome_message',
-            'subscription_renewal',
-            'support_response',
-            'educational_content'
-        ])
-
-        domain = random.choice(self.legitimate_domains)
-        sender = self.get_random_email(domain)
-
-        # Generar contenido según tipo
-        if email_type == 'order_confirmation':
-            subject, body = self._generate_order_confirmation()
-        elif email_type == 'newsletter':
-            subject, body = self._generate_newsletter()
-        elif email_type == 'personal_email':
-            subject, body = self._generate_personal_email()
-        elif email_type == 'receipt':
-            subject, body = self._generate_receipt()
-        elif email_type == 'meeting_reminder':
-            subject, body = self._generate_meeting_reminder()
-        elif email_type == 'project_update':
-            subject, body = self._generate_project_update()
-        elif email_type == 'welcome_message':
-            subject, body = self._generate_welcome_message()
-        elif email_type == 'subscription_renewal':
-            subject, body = self._generate_subscription_renewal()
-        elif email_type == 'support_response':
-            subject, body = self._generate_support_response()
-        else:  # educational_content
-            subject, body = self._generate_educational_content()
+        Args:
+            text: Texto original
+            probability: Probabilidad de error por palabra afectada
 
-        # Los correos legítimos generalmente NO tienen errores ortográficos
-        # Solo un 5% podría tener algún pequeño error
-        if random.random() < 0.05:
-            body = self.add_typos(body, probability=0.05)
+        Returns:
+            Texto con posibles errores
+        """
+        if self._rnd.random() > self.TYPO_TEXT_RATE:  # Solo 30% de correos tendrán errores
+            return text
+        return self._apply_typos(text, probability)
+
+    def _apply_typos(self, text: str, probability: float) -> str:
+        """Cambiar cada aparición de TYPO_RE con la probabilidad dada (sin el filtro del 30%)."""
+        rand = self._rnd.random
+        # Una sola pasada del regex; cada aparición se cambia con la probabilidad dada
+        return self.TYPO_RE.sub(
+            lambda m: self.TYPO_REPLACEMENTS[m.group(0)] if rand() < probability else m.group(0),
+            text
+        )
 
-        # Crear email completo
-        full_text = f"{subject}\n\n{body}"
+    def generate_phishing_email(self) -> Dict[str, str]:
+        """Generar un correo de phishing sintético."""
+        return self._single_email(self.generate_phishing_emails(1))
 
+    def _single_email(self, columns: EmailColumns) -> Dict[str, str]:
+        """Primer correo de un bloque de columnas, como diccionario con su texto completo."""
+        subject, body = columns['subject'][0], columns['body'][0]
         return {
-            'text': full_text,
+            'text': f"{subject}\n\n{body}",
             'subject': subject,
             'body': body,
-            'from': sender,
-            'label': 'legitimate',
-            'type': email_type
+            'from': columns['from'][0],
+            'label': self.LABELS[columns['label'][0]],
+            'type': self.TYPE_NAMES[columns['type'][0]]
         }
 
-    def _generate_order_confirmation(self) -> Tuple[str, str]:
-        """Generar confirmación de pedido legítima."""
-        orden = random.choice(self.numeros_orden)
-        monto = random.choice(self.montos)
-
-        subjects = [
-            f"Confirmación de pedido #{orden}",
-            f"Tu pedido ha sido recibido - Orden {orden}",
-            f"Pedido confirmado: {orden}",
-            f"Recibimos tu orden #{orden}",
-        ]
-
-        bodies = [
-            f"Hola,\n\nGracias por tu compra. Tu pedido ha sido confirmado.\n\nDetalles del pedido:\n• Número de orden: {orden}\n• Total: ${monto} MXN\n• Fecha estimada de entrega: {(datetime.now() + timedelta(days=5)).strftime('%d de %B')}\n\nPuedes rastrear tu pedido en tu cuenta.\n\nGracias por tu preferencia,\nEquipo de Ventas",
-
-            f"Estimado cliente,\n\nTu pedido {orden} ha sido procesado exitosamente.\n\nResumen:\n- Monto total: ${monto} MXN\n- Estado: En preparación\n- Envío estimado: 3-5 días hábiles\n\nTe notificaremos cuando tu pedido sea enviado.\n\nSaludos cordiales,\nTienda Online",
-        ]
-
-        return random.choice(subjects), random.choice(bodies)
-
-    def _generate_newsletter(self) -> Tuple[str, str]:
-        """Generar boletín informativo legítimo."""
-        subjects = [
-            "Boletín mensual - Novedades y actualizaciones",
-            "Nuestro boletín de este mes",
-            "Newsletter: Lo más destacado de la semana",
-            "Actualizaciones y noticias de interés",
-        ]
-
-        bodies = [
-            f"Hola,\n\nBienvenido a nuestro boletín mensual. Este mes compartimos:\n\n1. Nuevas funcionalidades en nuestra plataforma\n2. Artículos destacados sobre tecnología\n3. Próximos eventos y webinars\n4. Ofertas especiales para suscriptores\n\nGracias por ser parte de nuestra comunidad.\n\nUn saludo,\nEquipo Editorial",
-
-            f"Estimado suscriptor,\n\nEn esta edición encontrarás:\n\n• Guías prácticas sobre seguridad digital\n• Consejos para mejorar tu productividad\n• Reseñas de herramientas útiles\n• Eventos comunitarios del mes\n\nEsperamos que esta información sea de tu interés.\n\nSaludos,\nEquipo de Contenido",
-        ]
-
-        return random.choice(subjects), random.choice(bodies)
-
-    def _generate_personal_email(self) -> Tuple[str, str]:
-        """Generar email personal legítimo."""
-        nombre = self.get_random_name()
-
-        subjects = [
-            "Reunión de mañana",
-            "Documentos que solicitaste",
-            "Confirmación para el evento",
-            "Consulta sobre el proyecto",
-            "Seguimiento de nuestra conversación",
-        ]
-
-        bodies = [
-            f"Hola,\n\nTe escribo para confirmar nuestra reunión de mañana a las 10:00 AM. ¿Te parece bien en la sala de conferencias?\n\nPor favor avísame si necesitas cambiar el horario.\n\nSaludos,\n{nombre}",
-
-            f"Hola,\n\nTe adjunto los documentos que me pediste la semana pasada. Revísalos y avísame si necesitas algo más.\n\nCualquier duda, estoy disponible.\n\nSaludos cordiales,\n{nombre}",
-
-            f"Buenos días,\n\nTe confirmo mi asistencia al evento del próximo viernes. ¿Necesitas que lleve algo en particular?\n\nQuedo atento.\n\nSaludos,\n{nombre}",
-        ]
-
-        return random.choice(subjects), random.choice(bodies)
-
-    def _generate_receipt(self) -> Tuple[str, str]:
-        """Generar recibo legítimo."""
-        referencia = random.choice(self.numeros_referencia)
-        monto = random.choice(self.montos)
-
-        subjects = [
-            f"Recibo de pago - {referencia}",
-            f"Comprobante de transacción {referencia}",
-            f"Tu recibo de ${monto} MXN",
-        ]
-
-        bodies = [
-            f"Estimado cliente,\n\nSe ha procesado tu pago exitosamente.\n\nDetalles de la transacción:\n• Referencia: {referencia}\n• Monto: ${monto} MXN\n• Fecha: {datetime.now().strftime('%d/%m/%Y')}\n• Método de pago: Tarjeta terminada en {random.choice(self.numeros_cuenta)}\n\nEste es tu comprobante oficial.\n\nGracias por tu pago,\nDepartamento de Contabilidad",
-
-            f"Hola,\n\nTu pago ha sido recibido correctamente.\n\nResumen:\n- Referencia: {referencia}\n- Importe: ${monto} MXN\n- Estado: Aprobado\n\nPuedes descargar tu factura desde tu cuenta.\n\nSaludos,\nEquipo de Pagos",
-        ]
-
-        return random.choice(subjects), random.choice(bodies)
-
-    def _generate_meeting_reminder(self) -> Tuple[str, str]:
-        """Generar recordatorio de reunión legítimo."""
-        nombre = self.get_random_name()
-
-        subjects = [
-            "Recordatorio: Reunión de mañana a las 14:00",
-            "Próxima reunión - Confirma tu asistencia",
-            "Reunión programada para el jueves",
-        ]
-
-        bodies = [
-            f"Hola equipo,\n\nLes recuerdo nuestra reunión programada para mañana:\n\nFecha: {(datetime.now() + timedelta(days=1)).strftime('%d de %B')}\nHora: 14:00 hrs\nLugar: Sala de conferencias B\nTema: Revisión de avances del proyecto\n\nPor favor confirmen su asistencia.\n\nSaludos,\n{nombre}",
-
-            f"Estimados colegas,\n\nEsta es una confirmación de nuestra reunión:\n\n• Cuándo: Jueves 15:30 hrs\n• Dónde: Sala virtual (enlace en el calendario)\n• Duración: 1 hora\n• Agenda: Planificación del siguiente sprint\n\nNos vemos ahí.\n\nSaludos,\n{nombre}",
-        ]
-
-        return random.choice(subjects), random.choice(bodies)
-
-    def _generate_project_update(self) -> Tuple[str, str]:
-        """Generar actualización de proyecto legítima."""
-        nombre = self.get_random_name()
-
-        subjects = [
-            "Actualización del proyecto - Fase 2 completada",
-            "Avances del proyecto esta semana",
-            "Estado del proyecto: En progreso",
-        ]
-
-        bodies = [
-            f"Hola equipo,\n\nLes comparto el avance del proyecto:\n\n✓ Fase 1: Completada\n✓ Fase 2: Completada esta semana\n• Fase 3: En progreso (75%)\n• Fase 4: Pendiente\n\nProyección: Terminamos en 2 semanas si mantenemos el ritmo.\n\n¿Alguna pregunta o bloqueador?\n\nSaludos,\n{nombre}\nLíder de Proyecto",
-
-            f"Buenas tardes,\n\nResumen semanal del proyecto:\n\nLogros:\n- Implementadas 5 nuevas funcionalidades\n- Resueltos 12 bugs\n- Documentación actualizada\n\nPendientes:\n- Revisión de código\n- Pruebas de integración\n\nNos vemos en la próxima reunión.\n\nSaludos,\n{nombre}",
-        ]
-
-        return random.choice(subjects), random.choice(bodies)
-
-    def _generate_welcome_message(self) -> Tuple[str, str]:
-        """Generar mensaje de bienvenida legítimo."""
-        subjects = [
-            "¡Bienvenido a nuestra plataforma!",
-            "Gracias por registrarte",
-            "Tu cuenta ha sido creada exitosamente",
-        ]
-
-        bodies = [
-            f"¡Hola!\n\nBienvenido a nuestra plataforma. Estamos encantados de tenerte con nosotros.\n\nPara comenzar:\n1. Completa tu perfil\n2. Explora nuestras funcionalidades\n3. Únete a nuestra comunidad\n\nSi tienes alguna pregunta, nuestro equipo de soporte está disponible.\n\n¡Esperamos que disfrutes la experiencia!\n\nSaludos,\nEquipo de Bienvenida",
-
-            f"Estimado usuario,\n\nGracias por unirte a nosotros. Tu registro se ha completado correctamente.\n\nTu nombre de usuario: {random.choice(self.nombres).lower()}{random.randint(100, 999)}\n\nPuedes iniciar sesión en cualquier momento desde nuestra página principal.\n\nBienvenido a bordo,\nEquipo de Registro",
-        ]
+    def generate_phishing_emails(self, n: int) -> EmailColumns:
+        """
+        Generar un lote de correos de phishing sintéticos.
 
-        return random.choice(subjects), random.choice(bodies)
+        Args:
+            n: Número de correos
 
-    def _generate_subscription_renewal(self) -> Tuple[str, str]:
-        """Generar recordatorio de renovación legítimo."""
-        subjects = [
-            "Tu suscripción se renovará pronto",
-            "Recordatorio: Renovación de suscripción",
-            "Próxima renovación de tu plan",
-        ]
+        Returns:
+            Correos generados por columnas (sin 'text', que se une al montar la tabla)
+        """
+        # Las fechas se formatean una vez por lote
+        self.refresh_dates()
+
+        # Sorteos de todo el lote de una vez
+        types_idx, subjects, bodies = self._draw_templates(self._PHISH_TABLES, n)
+        sender_idx = self._sample_indices(self._PHISH_SENDERS, n)
+        # 40% con errores; dentro de esos, asunto y cuerpo pasan el filtro de add_typos
+        # por separado. Todas las monedas del lote en un solo sorteo
+        coins = self.np_rng.random((n, 3))
+        typo = coins[:, 0] < 0.4
+        subj_typo = (typo & (coins[:, 1] < self.TYPO_TEXT_RATE)).tolist()
+        body_typo = (typo & (coins[:, 2] < self.TYPO_TEXT_RATE)).tolist()
+        senders = self._PHISH_SENDERS
+
+        # Se rellenan las columnas directamente, sin un diccionario por correo
+        for i, (st, bt, subject, body) in enumerate(zip(subj_typo, body_typo, subjects, bodies)):
+            subject, body = self._render(subject, body)
+
+            # Errores ortográficos según las monedas del lote
+            if st:
+                subject = self._apply_typos(subject, 0.15)
+            if bt:
+                body = self._apply_typos(body, 0.15)
+
+            subjects[i] = subject
+            bodies[i] = body
 
-        bodies = [
-            f"Hola,\n\nTe informamos que tu suscripción se renovará automáticamente el {(datetime.now() + timedelta(days=30)).strftime('%d de %B')}.\n\nPlan actual: Premium\nCosto: $299 MXN/mes\nMétodo de pago: Tarjeta terminada en {random.choice(self.numeros_cuenta)}\n\nSi deseas modificar o cancelar tu suscripción, puedes hacerlo desde la configuración de tu cuenta en cualquier momento.\n\nGracias por tu preferencia,\nEquipo de Suscripciones",
+        return {
+            'subject': subjects,
+            'body': bodies,
+            'from': [senders[s] for s in sender_idx.tolist()],
+            'label': np.ones(n, dtype=np.int8),
+            'type': types_idx.astype(np.int8)
+        }
 
-            f"Estimado suscriptor,\n\nTu plan se renovará en 7 días. Aquí los detalles:\n\n• Plan: Profesional\n• Renovación: {(datetime.now() + timedelta(days=7)).strftime('%d/%m/%Y')}\n• Importe: $499 MXN\n\nNo necesitas hacer nada. La renovación es automática.\n\nPuedes gestionar tu suscripción desde tu cuenta.\n\nSaludos,\nAdministración",
-        ]
+    def generate_legitimate_email(self) -> Dict[str, str]:
+        """Generar un correo legítimo sintético."""
+        return self._single_email(self.generate_legitimate_emails(1))
 
-        return random.choice(subjects), random.choice(bodies)
+    def generate_legitimate_emails(self, n: int) -> EmailColumns:
+        """
+        Generar un lote de correos legítimos sintéticos.
 
-    def _generate_support_response(self) -> Tuple[str, str]:
-        """Generar respuesta de soporte legítima."""
-        ticket = random.choice(self.numeros_referencia)
+        Args:
+            n: Número de correos
 
-        subjects = [
-            f"Re: Tu solicitud de soporte #{ticket}",
-            f"Respuesta a tu consulta - Ticket {ticket}",
-            f"Caso resuelto: {ticket}",
-        ]
+        Returns:
+            Correos generados por columnas (sin 'text', que se une al montar la tabla)
+        """
+        # Las fechas se formatean una vez por lote
+        self.refresh_dates()
+        types_idx, subjects, bodies = self._draw_templates(self._LEGIT_TABLES, n)
+        legit_offset = len(self.PHISHING_TYPES)
+        sender_idx = self._sample_indices(self._LEGIT_SENDERS, n)
+        # Los correos legítimos generalmente NO tienen errores ortográficos
+        # Solo un 5% podría tener algún pequeño error
+        coins = self.np_rng.random((n, 2))
+        body_typo = ((coins[:, 0] < 0.05) & (coins[:, 1] < self.TYPO_TEXT_RATE)).tolist()
+        senders = self._LEGIT_SENDERS
 
-        bodies = [
-            f"Hola,\n\nGracias por contactarnos. Hemos revisado tu consulta (Ticket: {ticket}).\n\nRespuesta:\nHemos identificado el problema y lo hemos solucionado. Por favor intenta nuevamente y verifica que todo funcione correctamente.\n\nSi el problema persiste, responde a este correo y con gusto te ayudaremos.\n\nSaludos cordiales,\nEquipo de Soporte Técnico",
+        for i, (bt, subject, body) in enumerate(zip(body_typo, subjects, bodies)):
+            subject, body = self._render(subject, body)
 
-            f"Estimado usuario,\n\nTu ticket {ticket} ha sido atendido.\n\nSolución aplicada:\nSe actualizó tu configuración y se verificó el funcionamiento. Todo debería estar operando normalmente.\n\nPor favor confirma que el problema se ha resuelto.\n\n¿Podemos cerrar este caso?\n\nAtentamente,\nSoporte al Cliente",
-        ]
+            if bt:
+                body = self._apply_typos(body, 0.05)
 
-        return random.choice(subjects), random.choice(bodies)
+            subjects[i] = subject
+            bodies[i] = body
 
-    def _generate_educational_content(self) -> Tuple[str, str]:
-        """Generar contenido educativo legítimo."""
-        subjects = [
-            "Consejos de seguridad para proteger tu información",
-            "Guía: Cómo identificar correos sospechosos",
-            "Tips para mejorar tu productividad digital",
-            "Buenas prácticas de seguridad en línea",
-        ]
+        return {
+            'subject': subjects,
+            'body': bodies,
+            'from': [senders[s] for s in sender_idx.tolist()],
+            'label': np.zeros(n, dtype=np.int8),
+            'type': (types_idx + legit_offset).astype(np.int8)
+        }
 
-        bodies = [
-            f"Hola,\n\nEn este boletín compartimos consejos importantes de seguridad:\n\n1. Usa contraseñas únicas y seguras\n2. Activa la autenticación de dos factores\n3. Mantén tu software actualizado\n4. Desconfía de enlaces y archivos sospechosos\n5. Verifica siempre la dirección del remitente\n\nLa seguridad es responsabilidad de todos.\n\nMás información en nuestro blog.\n\nSaludos,\nEquipo de Seguridad",
+    @classmethod
+    def generate_batch(cls, num_phishing: int, num_legitimate: int, seed: int) -> EmailColumns:
+        """
+        Generar un bloque de correos con un generador propio (uno por bloque).
 
-            f"Estimado usuario,\n\n¿Cómo identificar correos de phishing?\n\nSeñales de alerta:\n• Urgencia excesiva\n• Errores ortográficos\n• Remitentes desconocidos\n• Enlaces sospechosos\n• Solicitudes de información sensible\n\nSi recibes un correo sospechoso, repórtalo y elimínalo.\n\nTu seguridad es nuestra prioridad.\n\nSaludos,\nCentro de Educación Digital",
-        ]
+        Args:
+            num_phishing: Correos de phishing del bloque
+            num_legitimate: Correos legítimos del bloque
+            seed: Semilla del bloque
 
-        return random.choice(subjects), random.choice(bodies)
+        Returns:
+            Correos generados por columnas
+        """
+        generator = cls(seed=seed)
+        return _concat_columns([generator.generate_phishing_emails(num_phishing),
+                                generator.generate_legitimate_emails(num_legitimate)])
 
     def generate_dataset(self,
                          total_emails: int = 1000,
-                         phishing_ratio: float = 0.5) -> pd.DataFrame:
+                         phishing_ratio: float = 0.5,
+                         workers: int = 1) -> pd.DataFrame:
         """
         Generar dataset completo de correos sintéticos.
 
         Args:
             total_emails: Número total de correos a generar
             phishing_ratio: Proporción de correos de phishing (0.0 a 1.0)
+            workers: Procesos en paralelo (1 = en este proceso, 0 = todos los núcleos)
 
         Returns:
             DataFrame con correos generados
@@ -679,31 +806,71 @@ class SyntheticEmailGenerator:
         num_phishing = int(total_emails * phishing_ratio)
         num_legitimate = total_emails - num_phishing
 
-        emails = []
+        if workers != 1:
+            emails = self._generate_parallel(num_phishing, num_legitimate, workers or os.cpu_count() or 1)
+            return self._finalize_dataset(emails)
 
         # Generar correos de phishing
         self.logger.info(f"Generando {num_phishing} correos de phishing...")
-        for i in range(num_phishing):
-            if i % 100 == 0 and i > 0:
-                self.logger.info(f"  Progreso phishing: {i}/{num_phishing}")
-            emails.append(self.generate_phishing_email())
+        phishing = self.generate_phishing_emails(num_phishing)
 
         # Generar correos legítimos
         self.logger.info(f"Generando {num_legitimate} correos legítimos...")
-        for i in range(num_legitimate):
-            if i % 100 == 0 and i > 0:
-                self.logger.info(f"  Progreso legítimos: {i}/{num_legitimate}")
-            emails.append(self.generate_legitimate_email())
-
-        # Crear DataFrame
-        df = pd.DataFrame(emails)
+        legitimate = self.generate_legitimate_emails(num_legitimate)
 
-        # Mezclar el dataset
-        df = df.sample(frac=1, random_state=42).reset_index(drop=True)
+        return self._finalize_dataset(_concat_columns([phishing, legitimate]))
 
+    def _generate_parallel(self, num_phishing: int, num_legitimate: int,
+                           workers: int) -> EmailColumns:
+        """
+        Repartir la generación en bloques independientes entre varios procesos.
+        Bloques de tamaño fijo con semilla self.seed + índice: el resultado no
+        depende del número de procesos.
+        """
+        total = num_phishing + num_legitimate
+        chunks = []
+        for start in range(0, total, PARALLEL_CHUNK_SIZE):
+            end = min(start + PARALLEL_CHUNK_SIZE, total)
+            # Los primeros num_phishing correos del total son de phishing
+            n_phish = max(0, min(end, num_phishing) - start)
+            chunks.append((n_phish, end - start - n_phish, self.seed + len(chunks) + 1))
+
+        workers = min(workers, len(chunks))
+        self.logger.info(f"Generando en {len(chunks)} bloques con {workers} procesos...")
+        if workers <= 1:
+            # Un solo bloque: mismos correos, sin el coste de arrancar procesos
+            return _concat_columns(list(map(_generate_chunk, chunks)))
+        parts: List[EmailColumns] = []
+        log_every = max(1, len(chunks) // PROGRESS_LOG_STEPS)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for i, part in enumerate(executor.map(_generate_chunk, chunks), 1):
+                parts.append(part)
+                if i % log_every == 0 or i == len(chunks):
+                    self.logger.info(f"  Progreso: bloque {i}/{len(chunks)}")
+        return _concat_columns(parts)
+
+    def _finalize_dataset(self, columns: EmailColumns) -> pd.DataFrame:
+        """Mezclar los correos, crear el DataFrame y registrar el resumen."""
+        # Se mezclan las columnas (referencias) antes de construir el DataFrame, en lugar
+        # de reordenar después todo el DataFrame con sample(frac=1)
+        columns = self._shuffle_columns(columns)
+        # Las estadísticas salen de los códigos y longitudes ya generados, sin recorrer el DataFrame
+        stats = self._stats_from_columns(columns)
+
+        # Crear DataFrame; label y type llegan como códigos y pasan a categóricas.
+        # Con pyarrow se construye por columnas con tipos ya fijados (sin inferencia de pandas)
+        if pa is not None:
+            df = self._columns_to_table(columns).to_pandas()
+        else:
+            df = pd.DataFrame(columns)
+            df.insert(0, 'text', df['subject'].str.cat(df['body'], sep='\n\n'))
+            df['label'] = pd.Categorical.from_codes(df['label'], self.LABELS)
+            df['type'] = pd.Categorical.from_codes(df['type'], self.TYPE_NAMES)
+
+        self.last_stats = stats
         self.logger.info(f"✅ Dataset generado: {len(df)} correos")
-        self.logger.info(f"   Phishing: {len(df[df['label'] == 'phishing'])}")
-        self.logger.info(f"   Legítimos: {len(df[df['label'] == 'legitimate'])}")
+        self.logger.info(f"   Phishing: {stats['phishing_count']}")
+        self.logger.info(f"   Legítimos: {stats['legitimate_count']}")
 
         return df
 
@@ -713,7 +880,7 @@ class SyntheticEmailGenerator:
 
         Args:
             df: DataFrame a guardar
-            output_file: Ruta del archivo de salida (opcional)
+            output_file: Ruta del archivo de salida (opcional; .csv.gz se comprime)
 
         Returns:
             Ruta del archivo guardado
@@ -725,15 +892,111 @@ class SyntheticEmailGenerator:
         # Asegurar que el directorio existe
         Path(output_file).parent.mkdir(parents=True, exist_ok=True)
 
-        # Guardar solo las columnas necesarias para el entrenamiento
-        df_export = df[['text', 'label']].copy()
-        df_export.to_csv(output_file, index=False, encoding='utf-8')
+        # Guardar solo las columnas necesarias para el entrenamiento; csv.writer directo
+        # sobre las columnas (mismo formato que to_csv, sin su conversión celda a celda)
+        with _open_csv(output_file) as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(('text', 'label'))
+            writer.writerows(zip(df['text'].tolist(), df['label'].astype(str).tolist()))
 
         self.logger.info(f"[Guardado] Dataset guardado en: {output_file}")
-        self.logger.info(f"   Tamaño del archivo: {Path(output_file).stat().st_size / 1024:.2f} KB")
+        self.logger.info(f"   Tamaño del archivo: {os.path.getsize(output_file) / 1024:.2f} KB")
+
+        return output_file
+
+    def stream_to_parquet(self,
+                          output_file: str,
+                          total_emails: int = 1000,
+                          phishing_ratio: float = 0.5,
+                          batch_size: int = STREAM_BATCH_SIZE) -> str:
+        """
+        Generar y escribir el dataset por lotes en Parquet, sin tenerlo entero en memoria.
+
+        Args:
+            output_file: Ruta del archivo .parquet
+            total_emails: Número total de correos a generar
+            phishing_ratio: Proporción de correos de phishing (0.0 a 1.0)
+            batch_size: Correos por lote (memoria máxima en uso)
+
+        Returns:
+            Ruta del archivo guardado
+        """
+        if pa is None:
+            raise RuntimeError("Para exportar a Parquet hace falta instalar pyarrow")
 
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+
+        with pq.ParquetWriter(output_file, EMAIL_SCHEMA, compression='zstd') as writer:
+            for columns in self._iter_batches(total_emails, phishing_ratio, batch_size):
+                writer.write_table(self._columns_to_table(columns))
+
+        self.logger.info(f"[Guardado] Dataset guardado en: {output_file}")
         return output_file
 
+    def stream_to_csv(self,
+                      output_file: str,
+                      total_emails: int = 1000,
+                      phishing_ratio: float = 0.5,
+                      batch_size: int = STREAM_BATCH_SIZE) -> str:
+        """
+        Generar y escribir el dataset por lotes en CSV (text, label), sin DataFrame.
+
+        Args:
+            output_file: Ruta del archivo .csv (o .csv.gz)
+            total_emails: Número total de correos a generar
+            phishing_ratio: Proporción de correos de phishing (0.0 a 1.0)
+            batch_size: Correos por lote (memoria máxima en uso)
+
+        Returns:
+            Ruta del archivo guardado
+        """
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+
+        with _open_csv(output_file) as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(('text', 'label'))
+            for columns in self._iter_batches(total_emails, phishing_ratio, batch_size):
+                writer.writerows(zip(
+                    [f"{subject}\n\n{body}" for subject, body in zip(columns['subject'], columns['body'])],
+                    map(self.LABELS.__getitem__, columns['label'].tolist())
+                ))
+
+        self.logger.info(f"[Guardado] Dataset guardado en: {output_file}")
+        return output_file
+
+    def _iter_batches(self, total_emails: int, phishing_ratio: float,
+                      batch_size: int) -> Iterator[EmailColumns]:
+        """Lotes mezclados de correos, cada uno con su parte proporcional de phishing."""
+        num_phishing = int(total_emails * phishing_ratio)
+        log_every = max(1, -(-total_emails // batch_size) // PROGRESS_LOG_STEPS)
+        for i, start in enumerate(range(0, total_emails, batch_size), 1):
+            end = min(start + batch_size, total_emails)
+            n_phish = int(end * num_phishing / total_emails) - int(start * num_phishing / total_emails)
+            yield self._shuffle_columns(_concat_columns([
+                self.generate_phishing_emails(n_phish),
+                self.generate_legitimate_emails(end - start - n_phish)
+            ]))
+            if i % log_every == 0 or end == total_emails:
+                self.logger.info(f"  Progreso: {end}/{total_emails}")
+
+    def _shuffle_columns(self, columns: EmailColumns) -> EmailColumns:
+        """Aplicar la misma permutación aleatoria a todas las columnas."""
+        perm = self.np_rng.permutation(len(columns['label']))
+        order = perm.tolist()
+        return {key: (values[perm] if isinstance(values, np.ndarray) else [values[i] for i in order])
+                for key, values in columns.items()}
+
+    def _columns_to_table(self, columns: EmailColumns) -> "pa.Table":
+        """Columnas de correos -> tabla Arrow; label y type van como diccionario sobre sus códigos."""
+        subject = pa.array(columns['subject'], pa.large_string())
+        body = pa.array(columns['body'], pa.large_string())
+        # El texto completo se une aquí, vectorizado, en lugar de guardarlo en cada correo
+        text = pc.binary_join_element_wise(subject, body, pa.scalar('\n\n', pa.large_string()))
+        arrays = {'text': text, 'subject': subject, 'body': body, 'from': columns['from']}
+        for key, names in (('label', self.LABELS), ('type', self.TYPE_NAMES)):
+            arrays[key] = pa.DictionaryArray.from_arrays(pa.array(columns[key], pa.int8()), pa.array(names))
+        return pa.table(arrays, schema=EMAIL_SCHEMA)
+
     def generate_statistics(self, df: pd.DataFrame) -> Dict[str, any]:
         """
         Generar estadísticas del dataset generado.
@@ -744,19 +1007,47 @@ class SyntheticEmailGenerator:
         Returns:
             Diccionario con estadísticas
         """
-        stats = {
-            'total_emails': len(df),
-            'phishing_count': len(df[df['label'] == 'phishing']),
-            'legitimate_count': len(df[df['label'] == 'legitimate']),
-            'phishing_ratio': len(df[df['label'] == 'phishing']) / len(df),
-            'avg_text_length': df['text'].str.len().mean(),
-            'min_text_length': df['text'].str.len().min(),
-            'max_text_length': df['text'].str.len().max(),
-            'phishing_types': df[df['label'] == 'phishing']['type'].value_counts().to_dict(),
-            'legitimate_types': df[df['label'] == 'legitimate']['type'].value_counts().to_dict()
-        }
+        # Una pasada por columna; los nombres de tipo ya indican si son phishing o legítimos
+        label_counts = df['label'].value_counts()
+        return self._build_stats(
+            int(label_counts.get('phishing', 0)),
+            int(label_counts.get('legitimate', 0)),
+            df['text'].str.len().to_numpy(),
+            df['type'].value_counts().to_dict()
+        )
 
-        return stats
+    def _stats_from_columns(self, columns: EmailColumns) -> Dict[str, any]:
+        """Estadísticas a partir de las columnas generadas (códigos y longitudes)."""
+        n = len(columns['label'])
+        label_counts = np.bincount(columns['label'], minlength=len(self.LABELS))
+        type_counts = np.bincount(columns['type'], minlength=len(self.TYPE_NAMES))
+        # len(text) = asunto + "\n\n" + cuerpo
+        text_len = (np.fromiter(map(len, columns['subject']), np.int64, n)
+                     + np.fromiter(map(len, columns['body']), np.int64, n) + 2)
+        return self._build_stats(
+            int(label_counts[self.LABELS.index('phishing')]),
+            int(label_counts[self.LABELS.index('legitimate')]),
+            text_len,
+            dict(zip(self.TYPE_NAMES, type_counts.tolist()))
+        )
+
+    def _build_stats(self, phishing_count: int, legitimate_count: int,
+                     text_len: np.ndarray, type_counts: Dict[str, int]) -> Dict[str, any]:
+        """Diccionario de estadísticas a partir de los conteos ya calculados."""
+        total = phishing_count + legitimate_count
+        # De más a menos frecuente, sin los tipos que no aparecen
+        type_counts = sorted(((t, c) for t, c in type_counts.items() if c > 0), key=lambda tc: -tc[1])
+        return {
+            'total_emails': total,
+            'phishing_count': phishing_count,
+            'legitimate_count': legitimate_count,
+            'phishing_ratio': phishing_count / total,
+            'avg_text_length': text_len.mean(),
+            'min_text_length': int(text_len.min()),
+            'max_text_length': int(text_len.max()),
+            'phishing_types': {t: c for t, c in type_counts if t in self.PHISHING_TYPES},
+            'legitimate_types': {t: c for t, c in type_counts if t in self.LEGITIMATE_TYPES}
+        }
 
     def print_statistics(self, stats: Dict):
         """Imprimir estadísticas del dataset."""
@@ -783,6 +1074,12 @@ class SyntheticEmailGenerator:
         print("\n" + "=" * 60)
 
 
+def _generate_chunk(chunk: Tuple[int, int, int]) -> EmailColumns:
+    """Trabajo de un proceso: (phishing, legítimos, semilla) -> correos."""
+    num_phishing, num_legitimate, seed = chunk
+    return SyntheticEmailGenerator.generate_batch(num_phishing, num_legitimate, seed)
+
+
 def main():
     """Función principal."""
     # Configurar argumentos
@@ -805,7 +1102,13 @@ def main():
         '-o', '--output',
         type=str,
         default=None,
-        help='Archivo de salida (default: data/processed/synthetic_emails_TIMESTAMP.csv)'
+        help='Archivo de salida; con extensión .parquet se escribe en streaming y '
+             'con .csv.gz se comprime (default: data/processed/synthetic_emails_TIMESTAMP.csv)'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Escribir el CSV por lotes, sin DataFrame completo ni estadísticas'
     )
     parser.add_argument(
         '-s', '--seed',
@@ -813,6 +1116,12 @@ def main():
         default=42,
         help='Semilla para reproducibilidad (default: 42)'
     )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=1,
+        help='Procesos para generar en paralelo (0 = todos los núcleos, default: 1)'
+    )
 
     args = parser.parse_args()
 
@@ -833,23 +1142,39 @@ def main():
     print(f"   • Correos de phishing: {int(args.num_emails * args.phishing_ratio):,}")
     print(f"   • Correos legítimos: {int(args.num_emails * (1 - args.phishing_ratio)):,}")
     print(f"   • Semilla: {args.seed}")
+    print(f"   • Procesos: {args.workers or os.cpu_count()}")
 
     try:
         # Crear generador
         generator = SyntheticEmailGenerator(seed=args.seed)
 
+        # Parquet (o CSV con --stream): generación y escritura por lotes, sin DataFrame completo
+        is_parquet = bool(args.output) and args.output.endswith('.parquet')
+        if is_parquet or args.stream:
+            print(f"\n[Progreso] Generando correos en streaming...")
+            stream = generator.stream_to_parquet if is_parquet else generator.stream_to_csv
+            output_file = stream(
+                args.output or f"data/processed/synthetic_emails_{datetime.now():%Y%m%d_%H%M%S}.csv",
+                total_emails=args.num_emails,
+                phishing_ratio=args.phishing_ratio
+            )
+            print(f"\n✅ ¡Generación completada exitosamente!")
+            print(f"[Archivo] Archivo generado: {output_file}")
+            return 0
+
         # Generar dataset
         print(f"\n[Progreso] Generando correos...")
         df = generator.generate_dataset(
             total_emails=args.num_emails,
-            phishing_ratio=args.phishing_ratio
+            phishing_ratio=args.phishing_ratio,
+            workers=args.workers
         )
 
         # Guardar CSV
         output_file = generator.save_to_csv(df, args.output)
 
-        # Generar y mostrar estadísticas
-        stats = generator.generate_statistics(df)
+        # Mostrar estadísticas (ya calculadas al generar; df no se ha modificado)
+        stats = generator.last_stats
         generator.print_statistics(stats)
 
         print(f"\n✅ ¡Generación completada exitosamente!")
@@ -862,16 +1187,22 @@ def main():
         print("-" * 60)
 
         # Mostrar un phishing
-        phishing_sample = df[df['label'] == 'phishing'].iloc[0]
-        print(f"\n[Alerta] EJEMPLO DE PHISHING:")
-        print(f"Asunto: {phishing_sample['subject']}")
-        print(f"Texto: {phishing_sample['text'][:200]}...")
+        # Primera fila de cada clase, sin construir el DataFrame filtrado; idxmax
+        # devuelve la primera fila aunque la clase no exista (-r 0.0 / -r 1.0)
+        is_phishing = df['label'].eq('phishing')
+        if is_phishing.any():
+            phishing_sample = df.loc[is_phishing.idxmax()]
+            print(f"\n[Alerta] EJEMPLO DE PHISHING:")
+            print(f"Asunto: {phishing_sample['subject']}")
+            print(f"Texto: {phishing_sample['text'][:200]}...")
 
         # Mostrar un legítimo
-        legit_sample = df[df['label'] == 'legitimate'].iloc[0]
-        print(f"\n✅ EJEMPLO DE LEGÍTIMO:")
-        print(f"Asunto: {legit_sample['subject']}")
-        print(f"Texto: {legit_sample['text'][:200]}...")
+        is_legit = df['label'].eq('legitimate')
+        if is_legit.any():
+            legit_sample = df.loc[is_legit.idxmax()]
+            print(f"\n✅ EJEMPLO DE LEGÍTIMO:")
+            print(f"Asunto: {legit_sample['subject']}")
+            print(f"Texto: {legit_sample['text'][:200]}...")
 
         print("\n" + "=" * 60)
 
@@ -1,25 +1,53 @@
 # -*- coding: utf-8 -*-
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.model_selection import StratifiedShuffleSplit, StratifiedKFold
+from sklearn.model_selection import cross_validate as sk_cross_validate
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
+from sklearn.utils.class_weight import compute_sample_weight
 from sklearn.metrics import (
     classification_report, confusion_matrix, accuracy_score,
     roc_auc_score, average_precision_score, precision_recall_curve,
     roc_curve
 )
+import copy
 import joblib
+import os
 import re
-import matplotlib.pyplot as plt
 from datetime import datetime
 import warnings
 
+try:
+    import pyarrow.csv as pacsv
+except ImportError:  # sin pyarrow se usa el parser C de pandas
+    pacsv = None
+
 warnings.filterwarnings('ignore')
 
+# Filas leídas para detectar las columnas antes de la carga completa
+COLUMN_SNIFF_ROWS = 100
+
+# Textos que pandas.read_csv trata como nulos por defecto; el lector de pyarrow los
+# recibe explícitamente para cargar las mismas filas que el respaldo de pandas
+CSV_NULL_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+# Nombres de columna reconocidos directamente (en minúsculas, por prioridad)
+TEXT_COLUMN_NAMES = ('text', 'email')
+LABEL_COLUMN_NAMES = ('label', 'class')
+
 
 class PhishingDetectorTrainer:
+    # Patrones del preprocesado, compilados una sola vez
+    _URL_RE = re.compile(r'http\S+|www\.\S+')
+    _EMAIL_RE = re.compile(r'\S+@\S+')
+    _CARD_RE = re.compile(r'\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b')
+    _NONCHAR_RE = re.compile(r'[^a-záéíóúñü\s\.\,\!\?]')
+
     def __init__(self, csv_path):
         """
         Inicializa el entrenador del modelo de detección de phishing.
@@ -35,22 +63,33 @@ class PhishingDetectorTrainer:
         self.y_test = None
         self.texts = None
         self.labels = None
+        self._processed_texts = None
+        self._y_probs_test = None
         self.optimal_threshold = 0.5
 
     def load_data(self):
         """Carga y prepara los datos del CSV."""
         print("[Datos] Cargando datos...")
-        df = pd.read_csv(self.csv_path)
-
-        print(f"✓ Dataset cargado: {len(df)} registros")
-        print(f"✓ Columnas: {list(df.columns)}")
-
-        # Detectar automáticamente las columnas
-        text_col = None
-        label_col = None
-
-        for col in df.columns:
-            if df[col].dtype == 'object' and text_col is None:
+        # Una recarga invalida los textos preprocesados y la división anterior
+        self._processed_texts = None
+        self._y_probs_test = None
+        self.X_train = self.X_test = self.y_train = self.y_test = None
+        # Muestra pequeña para detectar las columnas; luego solo se leen esas dos
+        sample = pd.read_csv(self.csv_path, nrows=COLUMN_SNIFF_ROWS)
+
+        # Detectar automáticamente las columnas: primero por nombre
+        columns = {str(col).lower(): col for col in sample.columns}
+        text_col = next((columns[name] for name in TEXT_COLUMN_NAMES if name in columns), None)
+        label_col = next((columns[name] for name in LABEL_COLUMN_NAMES
+                          if name in columns and columns[name] != text_col), None)
+
+        # Si no: la primera columna de texto (object o str) es el texto y la siguiente, la etiqueta
+        for col in sample.columns:
+            if text_col is not None and label_col is not None:
+                break
+            if col == text_col or col == label_col:
+                continue
+            if text_col is None and pd.api.types.is_string_dtype(sample[col].dtype):
                 text_col = col
             elif label_col is None:
                 label_col = col
@@ -59,22 +98,25 @@ class PhishingDetectorTrainer:
             raise ValueError(
                 "No se pudieron detectar las columnas. Asegúrate de que el CSV tenga una columna de texto y una de etiquetas.")
 
+        df = self._read_columns([text_col, label_col])
+
+        print(f"✓ Dataset cargado: {len(df)} registros")
+        print(f"✓ Columnas: {list(sample.columns)}")
         print(f"✓ Columna de texto: '{text_col}'")
         print(f"✓ Columna de etiquetas: '{label_col}'")
 
+        # Verificar valores nulos (antes de astype(str), que con dtype object los convierte en 'nan')
+        null_texts = df[text_col].isnull()
+        if null_texts.any():
+            print("⚠️  Advertencia: Se encontraron valores nulos en los textos. Se eliminarán.")
+            df = df[~null_texts]
+
         # Extraer textos y etiquetas
         self.texts = df[text_col].astype(str)
 
         # Normalizar etiquetas
         labels = df[label_col].astype(str).str.lower()
-        self.labels = labels.map(lambda x: 1 if x in ['phishing', '1', '1.0'] else 0)
-
-        # Verificar valores nulos
-        if self.texts.isnull().any():
-            print("⚠️  Advertencia: Se encontraron valores nulos en los textos. Se eliminarán.")
-            valid_idx = ~self.texts.isnull()
-            self.texts = self.texts[valid_idx]
-            self.labels = self.labels[valid_idx]
+        self.labels = labels.isin(('phishing', '1', '1.0')).astype(np.int8)
 
         # Distribución de clases
         phishing_count = self.labels.sum()
@@ -87,10 +129,32 @@ class PhishingDetectorTrainer:
 
         # Advertir sobre desbalance
         if phishing_pct < 20 or phishing_pct > 80:
-            print(f"   ⚠️  Desbalance detectado. Se aplicará class_weight='balanced'")
+            print(f"   ⚠️  Desbalance detectado. Se aplicarán pesos por clase 'balanced'")
 
         return self.texts, self.labels
 
+    def _read_columns(self, columns):
+        """
+        Lee solo las columnas indicadas del CSV, con el lector multihilo de pyarrow si está
+        disponible. Se usa pyarrow.csv directamente porque engine='pyarrow' de pandas no
+        admite saltos de línea dentro de campos entre comillas (los textos de los correos).
+
+        Args:
+            columns: Lista de columnas a cargar
+        """
+        if pacsv is not None:
+            table = pacsv.read_csv(
+                self.csv_path,
+                parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=columns,
+                    null_values=CSV_NULL_VALUES,
+                    strings_can_be_null=True
+                )
+            )
+            return table.to_pandas()
+        return pd.read_csv(self.csv_path, usecols=columns)
+
     def preprocess_text(self, text):
         """
         Preprocesa el texto para mejorar la extracción de características.
@@ -99,62 +163,113 @@ class PhishingDetectorTrainer:
             text: Texto a preprocesar
         """
         text = text.lower()
-        text = re.sub(r'http\S+|www\.\S+', ' url ', text)
-        text = re.sub(r'\S+@\S+', ' email ', text)
-        text = re.sub(r'\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b', ' tarjeta ', text)
-        text = re.sub(r'[^a-záéíóúñü\s\.\,\!\?]', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = self._URL_RE.sub(' url ', text)
+        text = self._EMAIL_RE.sub(' email ', text)
+        text = self._CARD_RE.sub(' tarjeta ', text)
+        text = self._NONCHAR_RE.sub(' ', text)
+        # split() corta por los mismos espacios Unicode que \s y ya descarta los extremos
+        text = ' '.join(text.split())
         return text
 
+    def _preprocess_series(self, texts):
+        """
+        Preprocesado de preprocess_text aplicado a toda una serie con el accesor .str
+        (un paso por patrón sobre toda la columna en lugar de una llamada por fila).
+
+        Args:
+            texts: Serie de textos a preprocesar
+        """
+        # Con dtype object se usa str.lower/re de Python, igual que en preprocess_text
+        # (el lower de Arrow difiere en algunos caracteres Unicode)
+        s = texts.astype(object).str.lower()
+        s = s.str.replace(self._URL_RE, ' url ', regex=True)
+        s = s.str.replace(self._EMAIL_RE, ' email ', regex=True)
+        s = s.str.replace(self._CARD_RE, ' tarjeta ', regex=True)
+        s = s.str.replace(self._NONCHAR_RE, ' ', regex=True)
+        return s.str.split().str.join(' ')
+
+    def _get_processed(self):
+        """Textos preprocesados, calculados una sola vez por carga de datos."""
+        if self._processed_texts is None:
+            self._processed_texts = self._preprocess_series(self.texts)
+        return self._processed_texts
+
     def split_data(self, test_size=0.2, random_state=42):
         """Divide los datos en conjuntos de entrenamiento y prueba."""
         print(f"\n[Métricas] Dividiendo datos (test size: {test_size * 100}%)...")
 
         # Preprocesar textos
-        processed_texts = self.texts.apply(self.preprocess_text)
-
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            processed_texts,
-            self.labels,
-            test_size=test_size,
-            random_state=random_state,
-            stratify=self.labels
-        )
+        processed_texts = self._get_processed()
+
+        # Índices estratificados una sola vez; las series se seleccionan por posición
+        splitter = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+        train_idx, test_idx = next(splitter.split(np.zeros(len(self.labels)), self.labels))
+
+        self.X_train = processed_texts.iloc[train_idx]
+        self.X_test = processed_texts.iloc[test_idx]
+        self.y_train = self.labels.iloc[train_idx]
+        self.y_test = self.labels.iloc[test_idx]
+        self._y_probs_test = None
 
         print(f"✓ Entrenamiento: {len(self.X_train)} muestras")
         print(f"✓ Prueba: {len(self.X_test)} muestras")
 
-    def create_pipeline(self, max_features=5000, ngram_range=(1, 2), C=1.0):
+    def create_pipeline(self, max_features=5000, ngram_range=(1, 2), C=1.0,
+                        use_hashing=True, n_features=2 ** 18, solver='liblinear'):
         """
         Crea el pipeline completo con TF-IDF + Logistic Regression.
 
         Args:
-            max_features: Número máximo de características
+            max_features: Número máximo de características (solo vocabulario TF-IDF)
             ngram_range: Rango de n-gramas
             C: Parámetro de regularización (menor = más regularización)
+            use_hashing: Usar HashingVectorizer + TfidfTransformer (sin vocabulario en memoria
+                ni en el .pkl) en lugar de TfidfVectorizer
+            n_features: Tamaño del espacio de hashing
+            solver: Solver de la regresión logística ('liblinear' trabaja por coordenadas
+                sobre la matriz dispersa; 'saga' y 'lbfgs' también son válidos)
         """
-        self.pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer(
-                max_features=max_features,
-                ngram_range=ngram_range,
-                min_df=2,
-                max_df=0.95,
-                sublinear_tf=True
-            )),
+        if use_hashing:
+            vectorizer_steps = [
+                ('hasher', HashingVectorizer(
+                    n_features=n_features,
+                    ngram_range=ngram_range,
+                    alternate_sign=False,
+                    norm=None,
+                    dtype=np.float32
+                )),
+                ('tfidf', TfidfTransformer(sublinear_tf=True))
+            ]
+        else:
+            vectorizer_steps = [
+                ('tfidf', TfidfVectorizer(
+                    max_features=max_features,
+                    ngram_range=ngram_range,
+                    min_df=2,
+                    max_df=0.95,
+                    sublinear_tf=True
+                ))
+            ]
+
+        self.pipeline = Pipeline(vectorizer_steps + [
             ('classifier', LogisticRegression(
                 max_iter=1000,
-                class_weight='balanced',
+                class_weight=None,  # el balanceo llega como sample_weight en fit
                 random_state=42,
-                solver='lbfgs',
+                solver=solver,
                 C=C
             ))
         ])
 
         print(f"\n[Pipeline] Pipeline creado:")
-        print(f"   • Vectorizador: TF-IDF")
-        print(f"   • Max features: {max_features}")
+        if use_hashing:
+            print(f"   • Vectorizador: Hashing + TF-IDF")
+            print(f"   • Espacio de hashing: {n_features}")
+        else:
+            print(f"   • Vectorizador: TF-IDF")
+            print(f"   • Max features: {max_features}")
         print(f"   • N-grams: {ngram_range}")
-        print(f"   • Clasificador: Logistic Regression (balanced)")
+        print(f"   • Clasificador: Logistic Regression (balanced, solver={solver})")
         print(f"   • Regularización C: {C}")
 
     def cross_validate(self, n_splits=5):
@@ -168,8 +283,19 @@ class PhishingDetectorTrainer:
 
         cv = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
 
-        # Preparar datos
-        processed_texts = self.texts.apply(self.preprocess_text)
+        # Preparar datos: si ya se dividió, la validación usa solo el conjunto de
+        # entrenamiento y el de prueba queda fuera hasta la evaluación final
+        if self.X_train is not None:
+            processed_texts, labels = self.X_train, self.y_train
+        else:
+            processed_texts, labels = self._get_processed(), self.labels
+
+        # El hashing no aprende nada de los datos: se aplica una sola vez a todo el conjunto
+        # y en cada fold solo se reajustan TF-IDF y clasificador (sin fuga de estadísticas)
+        X, estimator = processed_texts, self.pipeline
+        if 'hasher' in self.pipeline.named_steps:
+            X = self.pipeline.named_steps['hasher'].transform(processed_texts)
+            estimator = self.pipeline[1:]
 
         # Evaluar con diferentes métricas
         scoring_metrics = {
@@ -180,17 +306,24 @@ class PhishingDetectorTrainer:
             'roc_auc': 'roc_auc'
         }
 
-        results = {}
-        for metric_name, metric in scoring_metrics.items():
-            scores = cross_val_score(
-                self.pipeline,
-                processed_texts,
-                self.labels,
+        # Un worker por fold como máximo. liblinear libera el GIL durante el ajuste,
+        # así que con él se usan hilos y la matriz no se copia a otros procesos
+        n_jobs = min(n_splits, os.cpu_count() or 1)
+        classifier = self.pipeline.named_steps['classifier']
+        backend = 'threading' if classifier.solver == 'liblinear' else 'loky'
+
+        # Un solo ajuste por fold, evaluado con todas las métricas
+        with joblib.parallel_backend(backend, n_jobs=n_jobs):
+            scores = sk_cross_validate(
+                estimator,
+                X,
+                labels,
                 cv=cv,
-                scoring=metric,
-                n_jobs=-1
+                scoring=scoring_metrics,
+                n_jobs=n_jobs,
+                params={'classifier__sample_weight': self._balanced_weights(labels)}
             )
-            results[metric_name] = scores
+        results = {metric_name: scores[f'test_{metric_name}'] for metric_name in scoring_metrics}
 
         print(f"\n[Métricas] Resultados de Validación Cruzada:")
         print("-" * 60)
@@ -199,25 +332,44 @@ class PhishingDetectorTrainer:
 
         return results
 
+    @staticmethod
+    def _balanced_weights(y):
+        """Pesos por muestra equivalentes a class_weight='balanced', calculados una vez."""
+        return compute_sample_weight('balanced', y).astype(np.float32)
+
     def train_model(self):
         """Entrena el pipeline completo."""
         print(f"\n[Modelo] Entrenando modelo...")
 
-        self.pipeline.fit(self.X_train, self.y_train)
+        self.pipeline.fit(
+            self.X_train,
+            self.y_train,
+            classifier__sample_weight=self._balanced_weights(self.y_train)
+        )
+        self._y_probs_test = None
         print("✓ Pipeline entrenado exitosamente")
 
+    def _get_test_probs(self):
+        """Probabilidades de phishing sobre X_test, calculadas una vez por entrenamiento."""
+        if self._y_probs_test is None:
+            self._y_probs_test = self.pipeline.predict_proba(self.X_test)[:, 1]
+        return self._y_probs_test
+
     def find_optimal_threshold(self):
         """
         Encuentra el umbral óptimo que maximiza F1-Score.
         """
         print(f"\n[Objetivo] Buscando umbral óptimo...")
 
-        y_probs = self.pipeline.predict_proba(self.X_test)[:, 1]
+        y_probs = self._get_test_probs()
         precision, recall, thresholds = precision_recall_curve(self.y_test, y_probs)
 
         # Calcular F1 para cada umbral
-        f1_scores = 2 * (precision * recall) / (precision + recall + 1e-10)
-        optimal_idx = np.argmax(f1_scores)
+        # (los puntos con precision + recall = 0 quedan con F1 = 0, sin épsilon)
+        denom = precision + recall
+        f1_scores = np.zeros_like(precision)
+        np.divide(2 * precision * recall, denom, out=f1_scores, where=denom > 0)
+        optimal_idx = int(np.argmax(f1_scores))
 
         self.optimal_threshold = thresholds[optimal_idx] if optimal_idx < len(thresholds) else 0.5
 
@@ -238,11 +390,13 @@ class PhishingDetectorTrainer:
         print("\n[Evaluación] Evaluando modelo...")
 
         # Predicciones
-        y_probs = self.pipeline.predict_proba(self.X_test)[:, 1]
+        y_probs = self._get_test_probs()
 
         if use_optimal_threshold:
             threshold = self.optimal_threshold
-            y_pred = (y_probs >= threshold).astype(int)
+            # Comparación escrita directamente en un buffer int8 (sin bool + int64 intermedios)
+            y_pred = np.empty(y_probs.shape, dtype=np.int8)
+            np.greater_equal(y_probs, threshold, out=y_pred)
             print(f"   • Usando umbral: {threshold:.4f}")
         else:
             threshold = 0.5
@@ -311,23 +465,32 @@ class PhishingDetectorTrainer:
         print("-" * 60)
 
         # Extraer componentes del pipeline
-        vectorizer = self.pipeline.named_steps['tfidf']
+        vectorizer = self.pipeline.steps[0][1]
         classifier = self.pipeline.named_steps['classifier']
 
-        feature_names = vectorizer.get_feature_names_out()
+        # Con hashing no hay vocabulario: se muestra el índice de la característica
+        if hasattr(vectorizer, 'get_feature_names_out'):
+            feature_names = vectorizer.get_feature_names_out()
+            label = lambda idx: f"'{feature_names[idx]}'"
+        else:
+            label = lambda idx: f"[hash {idx}]"
         coef = classifier.coef_[0]
+        n = min(n, len(coef))
 
+        # Selección parcial de los n extremos y orden solo de esos n
         # Phishing indicators
-        top_phishing_idx = np.argsort(coef)[-n:][::-1]
+        top_phishing_idx = np.argpartition(coef, -n)[-n:]
+        top_phishing_idx = top_phishing_idx[np.argsort(coef[top_phishing_idx])[::-1]]
         print("\n[Indicadores] Indicadores de PHISHING:")
         for idx in top_phishing_idx:
-            print(f"   • '{feature_names[idx]}': {coef[idx]:.4f}")
+            print(f"   • {label(idx)}: {coef[idx]:.4f}")
 
         # Legitimate indicators
-        top_legitimate_idx = np.argsort(coef)[:n]
+        top_legitimate_idx = np.argpartition(coef, n - 1)[:n]
+        top_legitimate_idx = top_legitimate_idx[np.argsort(coef[top_legitimate_idx])]
         print("\n✅ Indicadores de LEGÍTIMO:")
         for idx in top_legitimate_idx:
-            print(f"   • '{feature_names[idx]}': {coef[idx]:.4f}")
+            print(f"   • {label(idx)}: {coef[idx]:.4f}")
 
     def plot_metrics(self, save_path=None):
         """
@@ -337,7 +500,13 @@ class PhishingDetectorTrainer:
             save_path: Ruta para guardar las gráficas (opcional)
         """
         try:
-            y_probs = self.pipeline.predict_proba(self.X_test)[:, 1]
+            # Import diferido; si solo se guarda a archivo se usa Agg y no se abre ningún GUI
+            import matplotlib
+            if save_path:
+                matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+
+            y_probs = self._get_test_probs()
 
             fig, axes = plt.subplots(1, 2, figsize=(14, 5))
 
@@ -393,12 +562,21 @@ class PhishingDetectorTrainer:
         """
         print(f"\n[Guardado] Guardando pipeline completo...")
 
+        # Copia con coeficientes e IDF en float32 (la mitad de bytes en el .pkl y en
+        # predicción); el pipeline del entrenador conserva la precisión original
+        pipeline = copy.deepcopy(self.pipeline)
+        classifier = pipeline.named_steps['classifier']
+        classifier.coef_ = classifier.coef_.astype(np.float32)
+        classifier.intercept_ = classifier.intercept_.astype(np.float32)
+        tfidf = pipeline.named_steps['tfidf']
+        tfidf.idf_ = tfidf.idf_.astype(np.float32)
+
         # Incluir el umbral óptimo en el pipeline
         pipeline_data = {
-            'pipeline': self.pipeline,
+            'pipeline': pipeline,
             'optimal_threshold': self.optimal_threshold,
             'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'feature_count': len(self.pipeline.named_steps['tfidf'].get_feature_names_out())
+            'feature_count': len(self.pipeline.named_steps['classifier'].coef_[0])
         }
 
         joblib.dump(pipeline_data, filepath)